@@ -1,441 +1,3088 @@
+import collections
+import contextlib
+import csv
 import datetime
-import requests
+import io
+import itertools
+import json
+import mmap
 import os
-import argparse
 import re
-import json
-from dateutil.easter import easter
-from dateutil.relativedelta import relativedelta as rd, FR
-from holidays.constants import JAN, MAY, AUG, OCT, NOV, DEC
-from holidays.holiday_base import HolidayBase
+import struct
+import sys
+import threading
+import time
+import types
+
+# Dependencias pesadas que solo usan algunas rutas (API en linea, lotes con numpy, Arrow/Parquet);
+# se importan al primer uso con _importar_requests, _importar_numpy y _importar_pyarrow para que el
+# arranque sea rapido. HolidayEcuador (que hereda de holidays.HolidayBase) tambien
+# se define al primer uso.
+np = None
+pa = None
+requests = None
+
+# Meses (los mismos valores de holidays.constants)
+JAN, MAY, AUG, OCT, NOV, DEC = 1, 5, 8, 10, 11, 12
+
+class _AcumuladorFeriados(dict):
+    """Diccionario {fecha: nombre} que une los nombres repetidos igual que HolidayBase.__setitem__"""
+
+    def __setitem__(self, fecha, nombre):
+        anterior = self.get(fecha)
+        if anterior is not None:
+            if anterior.find(nombre) < 0 and nombre.find(anterior) < 0:
+                nombre = "%s, %s" % (nombre, anterior)
+            else:
+                nombre = anterior
+        dict.__setitem__(self, fecha, nombre)
+
+def _pascua(año):
+    """
+    Calcula el Domingo de Pascua occidental (mismo algoritmo que dateutil.easter.easter)
+     Parámetros
+     ----------
+     año: int
+     Devoluciones
+     -------
+     datetime.date del Domingo de Pascua
+    """
+    g = año % 19
+    c = año // 100
+    h = (c - c // 4 - (8 * c + 13) // 25 + 19 * g + 15) % 30
+    i = h - (h // 28) * (1 - (h // 28) * (29 // (h + 1)) * ((21 - g) // 11))
+    j = (año + año // 4 + i + 2 - c + c // 4) % 7
+    p = i - j
+    return datetime.date(año, 3 + (p + 26) // 30, 1 + (p + 27 + (p + 6) // 40) % 31)
+
+def _viernes_siguiente(fecha):
+    """Devuelve el viernes de la misma semana o el siguiente (como relativedelta(weekday=FR))"""
+    return fecha + datetime.timedelta(days=(4 - fecha.weekday()) % 7)
+
+# ISO 3166-2 de las 24 provincias del Ecuador
+# https://es.wikipedia.org/wiki/ISO_3166-2:EC
+_PROVINCIAS = (
+    'EC-A',   # Azuay
+    'EC-B',   # Bolivar
+    'EC-F',   # Cañar
+    'EC-C',   # Carchi
+    'EC-H',   # Chimborazo
+    'EC-X',   # Cotopaxi
+    'EC-O',   # El Oro
+    'EC-E',   # Esmeraldas
+    'EC-W',   # Galapagos
+    'EC-G',   # Guayas
+    'EC-I',   # Imbabura
+    'EC-L',   # Loja
+    'EC-R',   # Los Rios
+    'EC-M',   # Manabi
+    'EC-S',   # Morona Santiago
+    'EC-N',   # Napo
+    'EC-D',   # Orellana
+    'EC-Y',   # Pastaza
+    'EC-P',   # Pichincha
+    'EC-SE',  # Santa Elena
+    'EC-SD',  # Santo Domingo de los Tsachilas
+    'EC-U',   # Sucumbios
+    'EC-T',   # Tungurahua
+    'EC-Z',   # Zamora Chinchipe
+)
+
+# Politicas de traslado: dias que se mueve el feriado segun el dia de la semana
+# (lunes=0 ... domingo=6) de su fecha de referencia.
+# (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906))
+# Si el feriado cae en sabado o martes el descanso obligatorio ira al viernes o lunes
+# inmediato anterior, si cae en domingo al lunes siguiente y si cae en miercoles o jueves
+# se movera al viernes de esa semana
+_TRASLADO_LOSEP = (0, -1, 2, 1, 0, -1, 1)
+# Para festivos nacionales y/o locales que coincidan en dias corridos (Difuntos el 2 y
+# Independencia de Cuenca el 3 de noviembre) el traslado depende del dia del 3 de noviembre
+_TRASLADO_DIFUNTOS = (2, 0, 0, 2, 0, 0, -1)
+_TRASLADO_CUENCA = (0, 0, -2, 0, 0, -2, 1)
+
+# Regla declarativa de un feriado:
+#  nombre: nombre del feriado
+#  mes, dia: fecha fija (o None si depende de la Pascua)
+#  pascua: dias desde el Domingo de Pascua (o None si es de fecha fija)
+#  traslado: politica de traslado (o None si no se traslada)
+#  referencia: (mes, dia) cuyo dia de la semana decide el traslado (por defecto la propia fecha)
+#  desde: primer año en que se aplica el traslado (por defecto todos)
+#  provincias: codigos ISO 3166-2 donde aplica (None para los feriados nacionales)
+_ReglaFeriado = collections.namedtuple(
+    '_ReglaFeriado', 'nombre mes dia pascua traslado referencia desde provincias',
+    defaults=(None, None, None, None, None, None, None))
 
-class HolidayEcuador(HolidayBase):
+# Tabla de feriados; el orden es el orden en que se agregan (importa al unir nombres repetidos)
+_REGLAS_FERIADOS = (
+    _ReglaFeriado("A�o Nuevo [New Year's Day]", JAN, 1),
+    _ReglaFeriado("Navidad [Christmas]", DEC, 25),
+    # Semana Santa
+    _ReglaFeriado("Semana Santa (Viernes Santo) [Good Friday)]", pascua=-2),
+    _ReglaFeriado("D�a de Pascuas [Easter Day]", pascua=0),
+    # Carnaval (46 dias de cuaresma)
+    _ReglaFeriado("Lunes de carnaval [Carnival of Monday)]", pascua=-48),
+    _ReglaFeriado("Martes de carnaval [Tuesday of Carnival)]", pascua=-47),
+    _ReglaFeriado("D�a Nacional del Trabajo [Labour Day]", MAY, 1, traslado=_TRASLADO_LOSEP, desde=2016),
+    _ReglaFeriado("Batalla del Pichincha [Pichincha Battle]", MAY, 24, traslado=_TRASLADO_LOSEP, desde=2016),
+    _ReglaFeriado("Primer Grito de la Independencia [First Cry of Independence]", AUG, 10,
+                  traslado=_TRASLADO_LOSEP, desde=2016),
+    _ReglaFeriado("Independencia de Guayaquil [Guayaquil's Independence]", OCT, 9,
+                  traslado=_TRASLADO_LOSEP, desde=2016),
+    _ReglaFeriado("D�a de los difuntos [Day of the Dead]", NOV, 2, traslado=_TRASLADO_DIFUNTOS, referencia=(NOV, 3)),
+    _ReglaFeriado("Independencia de Cuenca [Independence of Cuenca]", NOV, 3, traslado=_TRASLADO_CUENCA),
+    # Feriados provinciales
+    _ReglaFeriado("Fundaci�n de Quito [Foundation of Quito]", DEC, 6, traslado=_TRASLADO_LOSEP, desde=2016,
+                  provincias=('EC-P',)),
+)
+
+class _MotorFeriados:
     """
-    Una clase para representar un feriado en Ecuador por provincia (HolidayEcuador)
-     Su objetivo es determinar si un
-     fecha especifica es unas vacaciones lo mas rapido y flexible posible.
-     https://www.turismo.gob.ec/wp-content/uploads/2020/03/CALENDARIO-DE-FERIADOS.pdf
+    Evalua una tabla de reglas de feriados para todas las provincias en una sola pasada
+     Los feriados nacionales se calculan una vez por año y cada provincia solo agrega sus
+     reglas propias; las provincias sin reglas propias comparten el mismo diccionario.
      ...
-     Atributos (Hereda la clase HolidayBase)
+     Atributos
      ----------
-     prueba: calle
-         codigo de provincia segun ISO3166-2
+     provincias: tupla de calle
+         codigos de provincia segun ISO3166-2
      Metodos
      -------
-     __init__(self, plate, date, time, online=False):
-         Construye todos los atributos necesarios para el objeto HolidayEcuador.
-     _poblar(uno mismo, año):
-         Devoluciones si una fecha es feriado o no
-    """     
-    # ISO 3166-2 codes for the principal subdivisions, 
-    # called provinces
-    # https://es.wikipedia.org/wiki/ISO_3166-2:EC
-    PROVINCIA = ["EC-P"]  # TODO add more provinces
-
-    def __init__(self, **kwargs):
-        """
-       Contructor con metodos necesario para los dias festivos de Ecuador.
-        """         
-        self.pais = "ECUADOR"
-        self.prov = kwargs.pop("provincia", "ON")
-        HolidayBase.__init__(self, **kwargs)
-
-    def _populate(self, año):
-        """
-        Comprueba si una fecha es feriado o no
-        
-         Par�metros
+     calcular(self, año):
+         Calcula los feriados del año de todas las provincias
+    """
+
+    def __init__(self, reglas, provincias):
+        """
+        Compila la tabla de reglas
+         Parámetros
+         ----------
+         reglas: iterable de _ReglaFeriado
+         provincias: iterable de calle
+             codigos de provincia segun ISO3166-2
+        """
+        self.provincias = tuple(provincias)
+        self._nacionales = []
+        self._provinciales = {}
+        for regla in reglas:
+            compilada = self.__compilar(regla)
+            if regla.provincias is None:
+                self._nacionales.append(compilada)
+                continue
+            for provincia in regla.provincias:
+                if provincia not in self.provincias:
+                    self.provincias += (provincia,)
+                self._provinciales.setdefault(provincia, []).append(compilada)
+
+    @staticmethod
+    def __compilar(regla):
+        """Convierte una regla en (nombre, mes, dia, pascua, traslado, referencia, desde) con los desplazamientos ya calculados"""
+        if (regla.pascua is None) == (regla.mes is None or regla.dia is None):
+            raise ValueError('La regla {!r} debe tener una fecha fija o un desplazamiento desde la Pascua'.format(regla.nombre))
+        if regla.traslado is not None and len(regla.traslado) != 7:
+            raise ValueError('La politica de traslado de {!r} debe tener 7 dias'.format(regla.nombre))
+        return (regla.nombre, regla.mes, regla.dia,
+                None if regla.pascua is None else datetime.timedelta(days=regla.pascua),
+                None if regla.traslado is None else tuple(datetime.timedelta(days=d) for d in regla.traslado),
+                regla.referencia, regla.desde or 0)
+
+    @staticmethod
+    def __agregar(feriados, reglas, año, pascua):
+        """Agrega al acumulador los feriados del año de una lista de reglas compiladas"""
+        for nombre, mes, dia, desde_pascua, traslado, referencia, desde in reglas:
+            fecha = pascua + desde_pascua if desde_pascua is not None else datetime.date(año, mes, dia)
+            if traslado is not None and año >= desde:
+                base = fecha if referencia is None else datetime.date(año, *referencia)
+                fecha += traslado[base.weekday()]
+            feriados[fecha] = nombre
+
+    def calcular(self, año):
+        """
+        Calcula los feriados de un año para todas las provincias
+         Parámetros
          ----------
-         a�o: calle
-             a�o de una fecha
+         año: int
          Devoluciones
          -------
-         Devuelve verdadero si una fecha es un d�a festivo, de lo contrario, se muestra como verdadero.
-        """                    
-        # Año Nuevo 
-        self[datetime.date(año, JAN, 1)] = "A�o Nuevo [New Year's Day]"
-        
-        # Navidad
-        self[datetime.date(año, DEC, 25)] = "Navidad [Christmas]"
-        
-        # Semana Sata
-        self[easter(año) + rd(weekday=FR(-1))] = "Semana Santa (Viernes Santo) [Good Friday)]"
-        self[easter(año)] = "D�a de Pascuas [Easter Day]"
-        
-        # Carnaval
-        total_lent_days = 46
-        self[easter(año) - datetime.timedelta(days=total_lent_days+2)] = "Lunes de carnaval [Carnival of Monday)]"
-        self[easter(año) - datetime.timedelta(days=total_lent_days+1)] = "Martes de carnaval [Tuesday of Carnival)]"
-        
-        # Dia del trabajador
-        nombre = "D�a Nacional del Trabajo [Labour Day]"
-        # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) Si el feriado cae en s�bado o martes
-        # el descanso obligatorio ir� al viernes o lunes inmediato anterior
-        # respectivamente
-        if año > 2015 and datetime.date(año, MAY, 1).weekday() in (5,1):
-            self[datetime.date(año, MAY, 1) - datetime.timedelta(days=1)] = nombre
-        # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) si el feriado cae en domingo
-        # el descanso obligatorio sera para el lunes siguiente
-        elif año > 2015 and datetime.date(año, MAY, 1).weekday() == 6:
-            self[datetime.date(año, MAY, 1) + datetime.timedelta(days=1)] = nombre
-        # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) Feriados que sean en mi�rcoles o jueves
-        # se mover� al viernes de esa semana
-        elif año > 2015 and  datetime.date(año, MAY, 1).weekday() in (2,3):
-            self[datetime.date(año, MAY, 1) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, MAY, 1)] = nombre
-        
-        # Batalla de Pichincha, son las mismas raglas del dia del trabajador
-        nombre = "Batalla del Pichincha [Pichincha Battle]"
-        if año > 2015 and datetime.date(año, MAY, 24).weekday() in (5,1):
-            self[datetime.date(año, MAY, 24).weekday() - datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and datetime.date(año, MAY, 24).weekday() == 6:
-            self[datetime.date(año, MAY, 24) + datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and  datetime.date(año, MAY, 24).weekday() in (2,3):
-            self[datetime.date(año, MAY, 24) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, MAY, 24)] = nombre
-        
-        # Primer grito de Independencia, son las mismas raglas del dia del trabajador
-        nombre = "Primer Grito de la Independencia [First Cry of Independence]"
-        if año > 2015 and datetime.date(año, AUG, 10).weekday() in (5,1):
-            self[datetime.date(año, AUG, 10)- datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and datetime.date(año, AUG, 10).weekday() == 6:
-            self[datetime.date(año, AUG, 10) + datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and  datetime.date(año, AUG, 10).weekday() in (2,3):
-            self[datetime.date(año, AUG, 10) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, AUG, 10)] = nombre       
+         Devuelve un diccionario {provincia: {fecha: nombre}}; la clave None tiene
+         solo los feriados nacionales
+        """
+        pascua = _pascua(año)
+        nacionales = _AcumuladorFeriados()
+        self.__agregar(nacionales, self._nacionales, año, pascua)
+        resultado = {None: dict(nacionales)}
+        for provincia in self.provincias:
+            reglas = self._provinciales.get(provincia)
+            if not reglas:
+                resultado[provincia] = resultado[None]
+                continue
+            feriados = _AcumuladorFeriados(nacionales)
+            self.__agregar(feriados, reglas, año, pascua)
+            resultado[provincia] = dict(feriados)
+        return resultado
+
+# Motor compilado con la tabla de feriados del Ecuador
+_motor_feriados = _MotorFeriados(_REGLAS_FERIADOS, _PROVINCIAS)
+
+def _calcular_feriados(año, prov):
+    """
+    Calcula los feriados de un año para una provincia
+    
+     Parámetros
+     ----------
+     año: int
+         año de una fecha
+     prov: calle
+         codigo de provincia segun ISO3166-2 (un codigo desconocido o None da solo los nacionales)
+     Devoluciones
+     -------
+     Devuelve un diccionario {fecha: nombre} con los dias festivos del año
+    """
+    por_provincia = _motor_feriados.calcular(año)
+    return dict(por_provincia.get(prov, por_provincia[None]))
+
+def _definir_holiday_ecuador():
+    """Define HolidayEcuador importando holidays solo cuando se usa por primera vez"""
+    from holidays.holiday_base import HolidayBase
+
+    class HolidayEcuador(HolidayBase):
+        """
+        Una clase para representar un feriado en Ecuador por provincia (HolidayEcuador)
+         Su objetivo es determinar si un
+         fecha especifica es unas vacaciones lo mas rapido y flexible posible.
+         https://www.turismo.gob.ec/wp-content/uploads/2020/03/CALENDARIO-DE-FERIADOS.pdf
+         ...
+         Atributos (Hereda la clase HolidayBase)
+         ----------
+         prueba: calle
+             codigo de provincia segun ISO3166-2
+         Metodos
+         -------
+         __init__(self, plate, date, time, online=False):
+             Construye todos los atributos necesarios para el objeto HolidayEcuador.
+         _poblar(uno mismo, año):
+             Agrega los feriados del año desde la cache compartida (cache_feriados)
+         _calcular(año, prov):
+             Calcula los feriados de un año para una provincia (tabla _REGLAS_FERIADOS)
+        """     
+        # ISO 3166-2 codes for the principal subdivisions, 
+        # called provinces
+        # https://es.wikipedia.org/wiki/ISO_3166-2:EC
+        PROVINCIA = list(_PROVINCIAS)
+
+        def __init__(self, **kwargs):
+            """
+           Contructor con metodos necesario para los dias festivos de Ecuador.
+            """         
+            self.pais = "ECUADOR"
+            # Acepta 'provincia' y tambien 'prov' (el nombre que usa HolidayBase)
+            self.prov = kwargs.pop("provincia", None) or kwargs.pop("prov", None)
+            HolidayBase.__init__(self, **kwargs)
+
+        def _populate(self, año):
+            """
+            Agrega los feriados del año tomandolos de la cache compartida
         
-        # Independencia de Guayaquil, son las mismas raglas del dia del trabajador
-        nombre = "Independencia de Guayaquil [Guayaquil's Independence]"
-        if año > 2015 and datetime.date(año, OCT, 9).weekday() in (5,1):
-            self[datetime.date(año, OCT, 9) - datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and datetime.date(año, OCT, 9).weekday() == 6:
-            self[datetime.date(año, OCT, 9) + datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and  datetime.date(año, MAY, 1).weekday() in (2,3):
-            self[datetime.date(año, OCT, 9) + rd(weekday=FR)] = nombre
+             Parámetros
+             ----------
+             año: int
+                 año de una fecha
+            """
+            with instrumentacion.medir('poblar'):
+                for fecha, nombre in cache_feriados.obtener(año, self.prov).items():
+                    self[fecha] = nombre
+
+        # Motor de reglas sin dependencias (ver _REGLAS_FERIADOS y _MotorFeriados)
+        _calcular = staticmethod(_calcular_feriados)
+
+    HolidayEcuador.__qualname__ = 'HolidayEcuador'
+    return HolidayEcuador
+
+def __getattr__(nombre):
+    """Define al primer acceso los nombres que dependen de paquetes pesados (PEP 562)"""
+    global HolidayEcuador
+    if nombre == 'HolidayEcuador':
+        HolidayEcuador = _definir_holiday_ecuador()
+        return HolidayEcuador
+    if nombre == 'CuotaAgotada':
+        _importar_requests()
+        return globals()['CuotaAgotada']
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, nombre))
+
+def _importar_requests():
+    """Importa requests (y define CuotaAgotada) la primera vez que se necesita"""
+    global requests, CuotaAgotada
+    if requests is None:
+        import requests as modulo
+        import requests.adapters
+
+        class CuotaAgotada(modulo.RequestException):
+            """Se lanza cuando se agota la cuota mensual de la API de dias festivos"""
+
+        CuotaAgotada.__qualname__ = 'CuotaAgotada'
+        requests = modulo
+    return requests
+
+def _importar_numpy():
+    """Importa numpy la primera vez que se necesita"""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+def _importar_pyarrow():
+    """Importa pyarrow (dependencia opcional para Arrow/Parquet) la primera vez que se necesita"""
+    global pa
+    if pa is None:
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError('La lectura y escritura Arrow/Parquet requiere pyarrow: pip install pyarrow') from None
+        pa = pyarrow
+    return pa
+
+class Instrumentacion:
+    """
+    Una clase para medir, bajo demanda, donde se va el tiempo de las consultas.
+     Lleva temporizadores por etapa (cantidad, tiempo total y maximo), contadores
+     (aciertos y fallos de la cache de feriados, solicitudes y errores de la API,
+     errores de analisis) y medidores (cuota restante de la API). Mientras no esta
+     activa, cada punto de medicion solo comprueba el atributo activa.
+     ...
+     Etapas
+     ------
+     analisis: validacion de placa, fecha y hora al construir PicoPlaca
+     predecir: PicoPlaca.predecir completo
+     feriados_calculo: calculo de los feriados de un año (fallo de cache_feriados)
+     poblar: HolidayEcuador._populate
+     feriados_lote: resolucion de feriados de predecir_lote y predecir_arrow
+     api_solicitud: solicitud HTTP a la API de dias festivos
+     Atributos
+     ----------
+     activa: booleano
+         si es False no se registra nada
+     Metodos
+     -------
+     registrar(self, etapa, segundos):
+         Suma una medicion a una etapa
+     contar(self, contador, cantidad=1):
+         Incrementa un contador
+     fijar(self, medidor, valor):
+         Fija el valor de un medidor
+     medir(self, etapa):
+         Administrador de contexto que mide un bloque como una etapa
+     perfilar(self, salida=None, orden='cumulative', limite=25):
+         Administrador de contexto que activa la instrumentacion y cProfile durante un bloque
+     instantanea(self):
+         Devuelve un diccionario serializable a JSON con todas las mediciones
+     prometheus(self, prefijo='picoplaca'):
+         Devuelve las mediciones en el formato de texto de Prometheus
+     reiniciar(self):
+         Borra todas las mediciones
+    """
+
+    def __init__(self, activa=False):
+        """
+        Construye una instrumentacion sin mediciones
+         Parámetros
+         ----------
+         activa: booleano, opcional
+             (el valor predeterminado es False)
+        """
+        self.activa = activa
+        self._candado = threading.Lock()
+        self._etapas = {}
+        self._contadores = collections.Counter()
+        self._medidores = {}
+
+    def registrar(self, etapa, segundos):
+        """Suma una medicion de segundos a la etapa"""
+        with self._candado:
+            datos = self._etapas.get(etapa)
+            if datos is None:
+                self._etapas[etapa] = [1, segundos, segundos]
+            else:
+                datos[0] += 1
+                datos[1] += segundos
+                if segundos > datos[2]:
+                    datos[2] = segundos
+
+    def contar(self, contador, cantidad=1):
+        """Incrementa un contador"""
+        with self._candado:
+            self._contadores[contador] += cantidad
+
+    def fijar(self, medidor, valor):
+        """Fija el valor actual de un medidor"""
+        self._medidores[medidor] = valor
+
+    @contextlib.contextmanager
+    def medir(self, etapa):
+        """
+        Mide el bloque como una etapa (no registra nada si no esta activa)
+         Parámetros
+         ----------
+         etapa: calle
+        """
+        if not self.activa:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    @contextlib.contextmanager
+    def perfilar(self, salida=None, orden='cumulative', limite=25):
+        """
+        Activa la instrumentacion y cProfile mientras dura el bloque
+         Parámetros
+         ----------
+         salida: objeto de archivo de texto, opcional
+             si se indica, se escribe alli el resumen de pstats al terminar
+         orden: calle, opcional
+             criterio de orden de pstats (el valor predeterminado es 'cumulative')
+         limite: int, opcional
+             funciones que se muestran (el valor predeterminado es 25)
+         Devoluciones
+         -------
+         Entrega el cProfile.Profile para inspeccionarlo o guardarlo con dump_stats
+        """
+        import cProfile
+        import pstats
+        activa = self.activa
+        self.activa = True
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield perfil
+        finally:
+            perfil.disable()
+            self.activa = activa
+            if salida is not None:
+                pstats.Stats(perfil, stream=salida).sort_stats(orden).print_stats(limite)
+
+    def instantanea(self):
+        """
+        Devuelve las mediciones actuales
+         Devoluciones
+         -------
+         Diccionario {'activa', 'etapas': {etapa: {'cantidad', 'total_s', 'promedio_s', 'maximo_s'}},
+         'contadores': {...}, 'medidores': {...}}
+        """
+        with self._candado:
+            etapas = {etapa: {'cantidad': cantidad, 'total_s': total, 'promedio_s': total / cantidad,
+                              'maximo_s': maximo}
+                      for etapa, (cantidad, total, maximo) in self._etapas.items()}
+            return {'activa': self.activa, 'etapas': etapas, 'contadores': dict(self._contadores),
+                    'medidores': dict(self._medidores)}
+
+    def prometheus(self, prefijo='picoplaca'):
+        """
+        Devuelve las mediciones en el formato de texto de Prometheus (version 0.0.4)
+         Parámetros
+         ----------
+         prefijo: calle, opcional
+             prefijo de los nombres de las metricas (el valor predeterminado es 'picoplaca')
+        """
+        datos = self.instantanea()
+        lineas = ['# HELP {}_etapa_segundos Tiempo por etapa'.format(prefijo),
+                  '# TYPE {}_etapa_segundos summary'.format(prefijo)]
+        for etapa, valores in sorted(datos['etapas'].items()):
+            lineas.append('{}_etapa_segundos_count{{etapa="{}"}} {}'.format(prefijo, etapa, valores['cantidad']))
+            lineas.append('{}_etapa_segundos_sum{{etapa="{}"}} {!r}'.format(prefijo, etapa, valores['total_s']))
+        lineas += ['# HELP {}_etapa_segundos_maximo Tiempo maximo por etapa'.format(prefijo),
+                   '# TYPE {}_etapa_segundos_maximo gauge'.format(prefijo)]
+        for etapa, valores in sorted(datos['etapas'].items()):
+            lineas.append('{}_etapa_segundos_maximo{{etapa="{}"}} {!r}'.format(prefijo, etapa, valores['maximo_s']))
+        for contador, valor in sorted(datos['contadores'].items()):
+            lineas += ['# TYPE {}_{}_total counter'.format(prefijo, contador),
+                       '{}_{}_total {}'.format(prefijo, contador, valor)]
+        for medidor, valor in sorted(datos['medidores'].items()):
+            lineas += ['# TYPE {}_{} gauge'.format(prefijo, medidor),
+                       '{}_{} {}'.format(prefijo, medidor, valor)]
+        return '\n'.join(lineas) + '\n'
+
+    def reiniciar(self):
+        """Borra todas las mediciones"""
+        with self._candado:
+            self._etapas.clear()
+            self._contadores.clear()
+            self._medidores.clear()
+
+# Instrumentacion compartida por todo el proceso; se activa con instrumentacion.activa = True,
+# con perfilar() o con la variable de entorno VACACIONES_METRICAS=1
+instrumentacion = Instrumentacion(os.environ.get('VACACIONES_METRICAS', '') not in ('', '0'))
+
+class CacheFeriados:
+    """
+    Una clase para compartir los feriados ya calculados entre todas las instancias
+     de HolidayEcuador y PicoPlaca del proceso.
+     Guarda por (año, provincia) un diccionario congelado {fecha: nombre} y descarta
+     el menos usado recientemente cuando se supera la capacidad. Al calcular un año
+     se guardan a la vez todas las provincias (las que solo tienen feriados nacionales
+     comparten el mismo diccionario).
+     ...
+     Atributos
+     ----------
+     capacidad: int
+         numero maximo de pares (año, provincia) guardados
+     Metodos
+     -------
+     obtener(self, año, provincia):
+         Devuelve los feriados congelados del año, calculandolos solo si no estan en la cache
+     precalentar(self, años, provincias):
+         Calcula por adelantado los feriados de los años y provincias indicados
+     limpiar(self):
+         Vacia la cache
+    """
+
+    def __init__(self, capacidad=4096):
+        """
+        Construye una cache vacia
+         Parámetros
+         ----------
+         capacidad: int, opcional
+             numero maximo de pares (año, provincia) guardados (el valor predeterminado es 4096)
+        """
+        if capacidad < 1:
+            raise ValueError('La capacidad de la cache debe ser mayor que cero')
+        self.capacidad = capacidad
+        self._feriados = collections.OrderedDict()
+        self._candado = threading.Lock()
+
+    def __len__(self):
+        return len(self._feriados)
+
+    def obtener(self, año, provincia):
+        """
+        Devuelve los feriados de un año para una provincia
+         Parámetros
+         ----------
+         año: int
+         provincia: calle
+             codigo de provincia segun ISO3166-2
+         Devoluciones
+         -------
+         Devuelve un mapeo de solo lectura {fecha: nombre}
+        """
+        clave = (año, provincia)
+        with self._candado:
+            feriados = self._feriados.get(clave)
+            if feriados is not None:
+                self._feriados.move_to_end(clave)
+                if instrumentacion.activa:
+                    instrumentacion.contar('feriados_cache_aciertos')
+                return feriados
+            congelados = {}
+            if instrumentacion.activa:
+                instrumentacion.contar('feriados_cache_fallos')
+                inicio = time.perf_counter()
+                por_provincia = _motor_feriados.calcular(año)
+                instrumentacion.registrar('feriados_calculo', time.perf_counter() - inicio)
+            else:
+                por_provincia = _motor_feriados.calcular(año)
+            for p in (None,) + _motor_feriados.provincias:
+                feriados = por_provincia[p]
+                if id(feriados) not in congelados:
+                    congelados[id(feriados)] = types.MappingProxyType(feriados)
+                self._feriados[(año, p)] = congelados[id(feriados)]
+            feriados = self._feriados.setdefault(clave, congelados[id(por_provincia[None])])
+            self._feriados.move_to_end(clave)
+            while len(self._feriados) > self.capacidad:
+                self._feriados.popitem(last=False)
+            return feriados
+
+    def precalentar(self, años, provincias=None):
+        """
+        Calcula por adelantado los feriados de varios años
+         Parámetros
+         ----------
+         años: iterable de int
+         provincias: iterable de calle, opcional
+             codigos de provincia (por defecto la provincia que consulta PicoPlaca)
+        """
+        if provincias is None:
+            provincias = [_PROVINCIA_PICOPLACA]
+        for provincia in provincias:
+            for año in años:
+                self.obtener(año, provincia)
+
+    def limpiar(self):
+        """Vacia la cache"""
+        with self._candado:
+            self._feriados.clear()
+
+# Cache de feriados compartida por todo el proceso
+cache_feriados = CacheFeriados()
+
+# Provincia con la que PicoPlaca consulta los feriados (Quito, Pichincha)
+_PROVINCIA_PICOPLACA = "EC-P"
+
+def precalentar(años, provincias=None):
+    """
+    Calcula por adelantado en la cache compartida los feriados de los años indicados
+     Parámetros
+     ----------
+     años: iterable de int
+     provincias: iterable de calle, opcional
+         codigos de provincia (por defecto la provincia que consulta PicoPlaca)
+    """
+    cache_feriados.precalentar(años, provincias)
+
+class IndiceFeriados:
+    """
+    Una clase para representar un indice compacto de feriados por provincia.
+     Guarda un bit por dia (indexado por dias desde 1970-01-01) para un rango de años,
+     de modo que saber si una fecha es feriado es una sola prueba de bit.
+     Se construye una vez a partir de _motor_feriados, se guarda en un archivo
+     binario pequeño y se carga con mmap.
+     ...
+     Atributos
+     ----------
+     año_inicio: int
+         primer año cubierto por el indice
+     año_fin: int
+         ultimo año cubierto por el indice
+     provincias: tupla de calle
+         codigos de provincia segun ISO3166-2 incluidos en el indice
+     Metodos
+     -------
+     construir(cls, año_inicio, año_fin, provincias=None):
+         Calcula el indice para el rango de años indicado
+     cargar(cls, ruta):
+         Abre un indice guardado usando mmap
+     guardar(self, ruta):
+         Escribe el indice en un archivo binario
+     cubre(self, año, provincia):
+         Devuelve True si el indice tiene datos para el año y la provincia
+     contiene(self, dias, provincia):
+         Devuelve True si el dia (dias desde 1970-01-01) es feriado
+     contiene_lote(self, dias, provincia):
+         Igual que contiene para un arreglo de numpy
+    """
+    # Formato: firma, version, año_inicio, año_fin, numero de provincias,
+    # luego 8 bytes ASCII por provincia y a continuacion un mapa de bits por provincia
+    _FIRMA = b'PYPFER01'
+    _CABECERA = struct.Struct('<8sHhhH')
+    _ANCHO_PROVINCIA = 8
+
+    def __init__(self, año_inicio, año_fin, provincias, datos, mapa=None):
+        """
+        Construye el indice a partir de un buffer ya calculado (usar construir o cargar)
+        """
+        self.año_inicio = año_inicio
+        self.año_fin = año_fin
+        self.provincias = tuple(provincias)
+        self._base = _dias_desde_epoca(año_inicio, 1, 1)
+        self._num_dias = _dias_desde_epoca(año_fin + 1, 1, 1) - self._base
+        self._bytes_por_provincia = (self._num_dias + 7) // 8
+        self._datos = datos
+        self._mapa = mapa
+        self._desplazamiento = {p: i * self._bytes_por_provincia for i, p in enumerate(self.provincias)}
+
+    @classmethod
+    def construir(cls, año_inicio, año_fin, provincias=None):
+        """
+        Calcula el indice de feriados
+         Parámetros
+         ----------
+         año_inicio: int
+         año_fin: int
+         provincias: iterable de calle, opcional
+             codigos de provincia (por defecto la provincia que consulta PicoPlaca)
+         Devoluciones
+         -------
+         Devuelve un IndiceFeriados en memoria
+        """
+        if año_fin < año_inicio:
+            raise ValueError('El año final del indice debe ser mayor o igual al año inicial')
+        if provincias is None:
+            provincias = [_PROVINCIA_PICOPLACA]
+        provincias = list(provincias)
+        base = _dias_desde_epoca(año_inicio, 1, 1)
+        tamaño = (_dias_desde_epoca(año_fin + 1, 1, 1) - base + 7) // 8
+        datos = bytearray(tamaño * len(provincias))
+        for año in range(año_inicio, año_fin + 1):
+            por_provincia = _motor_feriados.calcular(año)
+            for i, provincia in enumerate(provincias):
+                for fecha in por_provincia.get(provincia, por_provincia[None]):
+                    bit = fecha.toordinal() - _ORDINAL_EPOCA - base
+                    datos[i * tamaño + (bit >> 3)] |= 1 << (bit & 7)
+        return cls(año_inicio, año_fin, provincias, datos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Abre un indice guardado con guardar() usando mmap (solo lectura)
+         Parámetros
+         ----------
+         ruta: calle
+         Devoluciones
+         -------
+         Devuelve un IndiceFeriados respaldado por el archivo
+         aumenta
+         ------
+         ValueError
+             Si el archivo no es un indice de feriados valido
+        """
+        with open(ruta, 'rb') as archivo:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            firma, _, año_inicio, año_fin, num = cls._CABECERA.unpack_from(mapa, 0)
+            if firma != cls._FIRMA:
+                raise ValueError
+            inicio = cls._CABECERA.size
+            fin = inicio + num * cls._ANCHO_PROVINCIA
+            provincias = [mapa[i:i + cls._ANCHO_PROVINCIA].rstrip(b'\0').decode('ascii')
+                          for i in range(inicio, fin, cls._ANCHO_PROVINCIA)]
+            tamaño = (_dias_desde_epoca(año_fin + 1, 1, 1) - _dias_desde_epoca(año_inicio, 1, 1) + 7) // 8
+            if año_fin < año_inicio or len(mapa) - fin != tamaño * num:
+                raise ValueError
+        except (ValueError, struct.error):
+            mapa.close()
+            raise ValueError('El archivo {} no es un indice de feriados valido'.format(ruta)) from None
+        return cls(año_inicio, año_fin, provincias, memoryview(mapa)[fin:], mapa)
+
+    def guardar(self, ruta):
+        """
+        Escribe el indice en un archivo binario
+         Parámetros
+         ----------
+         ruta: calle
+        """
+        with open(ruta, 'wb') as archivo:
+            archivo.write(self._CABECERA.pack(
+                self._FIRMA, 1, self.año_inicio, self.año_fin, len(self.provincias)))
+            for provincia in self.provincias:
+                archivo.write(provincia.encode('ascii').ljust(self._ANCHO_PROVINCIA, b'\0'))
+            archivo.write(self._datos)
+
+    def cerrar(self):
+        """Libera el mmap del archivo (si el indice fue cargado)"""
+        if self._mapa is not None:
+            self._datos.release()
+            self._mapa.close()
+            self._mapa = None
+
+    def cubre(self, año, provincia):
+        """Devuelve True si el indice tiene datos para el año y la provincia"""
+        return self.año_inicio <= año <= self.año_fin and provincia in self._desplazamiento
+
+    def contiene(self, dias, provincia):
+        """
+        Comprueba si un dia es feriado
+         Parámetros
+         ----------
+         dias: int
+             dias desde 1970-01-01 (debe estar dentro del rango cubierto)
+         provincia: calle
+         Devoluciones
+         -------
+         Devuelve True si el dia es feriado en la provincia, de lo contrario, False
+        """
+        bit = dias - self._base
+        return bool(self._datos[self._desplazamiento[provincia] + (bit >> 3)] >> (bit & 7) & 1)
+
+    def contiene_lote(self, dias, provincia):
+        """
+        Igual que contiene para un arreglo de numpy de dias desde 1970-01-01
+         Devoluciones
+         -------
+         numpy.ndarray de bool
+        """
+        _importar_numpy()
+        mapa = np.frombuffer(self._datos, dtype=np.uint8, count=self._bytes_por_provincia,
+                             offset=self._desplazamiento[provincia])
+        bit = np.asarray(dias, dtype=np.int64) - self._base
+        return ((mapa[bit >> 3] >> (bit & 7).astype(np.uint8)) & 1).astype(bool)
+
+# Indice de feriados activo; si la variable de entorno VACACIONES_INDICE apunta a un
+# archivo creado con IndiceFeriados.guardar se carga al importar el modulo
+indice_feriados = None
+
+def activar_indice(indice):
+    """
+    Activa un indice de feriados para las consultas sin conexion de PicoPlaca
+     Parámetros
+     ----------
+     indice: IndiceFeriados, calle o None
+         indice ya construido, ruta a un archivo de indice o None para desactivarlo
+    """
+    global indice_feriados
+    if isinstance(indice, (str, os.PathLike)):
+        indice = IndiceFeriados.cargar(indice)
+    indice_feriados = indice
+
+class _CubetaFichas:
+    """
+    Limitador de tasa de cubeta de fichas (token bucket), seguro entre hilos.
+     reservar() aparta una ficha y devuelve cuantos segundos hay que esperar para usarla.
+    """
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._fichas = capacidad
+        self._ultimo = time.monotonic()
+        self._candado = threading.Lock()
+
+    def reservar(self):
+        with self._candado:
+            ahora = time.monotonic()
+            self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            self._fichas -= 1
+            return 0.0 if self._fichas >= 0 else -self._fichas / self.tasa
+
+class ProveedorFeriadosEnLinea:
+    """
+    Una clase para consultar la API de dias festivos abstractapi de forma eficiente.
+     Reutiliza las conexiones HTTP (requests.Session), guarda cada resultado por fecha
+     en memoria y opcionalmente en disco con un tiempo de vida, une las consultas
+     concurrentes de una misma fecha en una sola peticion y respeta los limites de la
+     version gratuita (1 solicitud por segundo, 1000 por mes).
+     ...
+     Atributos
+     ----------
+     clave: calle
+         clave de la API (por defecto la variable de entorno VACACIONES_API_KEY)
+     url: calle
+         direccion de la API (se puede apuntar a un servidor local)
+     pais: calle
+         codigo de pais ISO 3166-1
+     ttl: float
+         segundos que se conserva un resultado en cache
+     cuota_mensual: int
+         numero maximo de solicitudes por mes calendario
+     por_año: booleano
+         si es True, una sola solicitud trae todos los feriados de un año
+     respaldo_sin_conexion: booleano
+         si es True, se responde con HolidayEcuador cuando la API no esta disponible
+     Metodos
+     -------
+     es_feriado(self, fecha):
+         Corrutina que devuelve True si la fecha (AAAA-MM-DD) es feriado
+     es_feriado_lote(self, fechas):
+         Corrutina que consulta varias fechas de forma concurrente
+     consultar(self, fecha):
+         Version bloqueante de es_feriado
+     cerrar(self):
+         Cierra las conexiones y guarda la cache en disco
+    """
+    URL = 'https://holidays.abstractapi.com/v1/'
+
+    def __init__(self, clave=None, url=URL, pais='EC', ruta_cache=None, ttl=30 * 24 * 3600,
+                 tasa=1.0, cuota_mensual=1000, conexiones=4, tiempo_espera=10.0,
+                 por_año=True, respaldo_sin_conexion=True, intervalo_guardado=1.0):
+        """
+        Construye el proveedor
+         Parámetros
+         ----------
+         clave: calle, opcional
+             clave de la API (por defecto la variable de entorno VACACIONES_API_KEY)
+         url: calle, opcional
+             direccion de la API
+         pais: calle, opcional
+             codigo de pais ISO 3166-1 (el valor predeterminado es EC)
+         ruta_cache: calle, opcional
+             archivo JSON donde se guardan los resultados y la cuota usada (por defecto solo en memoria)
+         ttl: float, opcional
+             segundos que se conserva un resultado (el valor predeterminado es 30 dias)
+         tasa: float, opcional
+             solicitudes por segundo permitidas (el valor predeterminado es 1)
+         cuota_mensual: int, opcional
+             solicitudes por mes permitidas (el valor predeterminado es 1000)
+         conexiones: int, opcional
+             tamaño del grupo de conexiones HTTP
+         tiempo_espera: float, opcional
+             segundos maximos de espera por respuesta
+         por_año: booleano, opcional
+             si por_año == True, se piden todos los feriados del año en una sola solicitud
+             y las demas fechas de ese año se responden localmente (el valor predeterminado es True)
+         respaldo_sin_conexion: booleano, opcional
+             si es True, se usa la tabla HolidayEcuador cuando se agota la cuota o la API
+             no responde (el valor predeterminado es True)
+         intervalo_guardado: float, opcional
+             segundos minimos entre escrituras de ruta_cache; los resultados de ese lapso se
+             escriben juntos en la siguiente escritura o al cerrar (el valor predeterminado es 1)
+        """
+        import concurrent.futures
+        _importar_requests()
+        self.clave = clave if clave is not None else os.environ.get('VACACIONES_API_KEY')
+        self.url = url
+        self.pais = pais
+        self.ruta_cache = ruta_cache
+        self.ttl = ttl
+        self.cuota_mensual = cuota_mensual
+        self.tiempo_espera = tiempo_espera
+        self.por_año = por_año
+        self.respaldo_sin_conexion = respaldo_sin_conexion
+        self.intervalo_guardado = intervalo_guardado
+        self._cubeta = _CubetaFichas(tasa, 1)
+        self._sesion = requests.Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=conexiones, pool_maxsize=conexiones)
+        self._sesion.mount('http://', adaptador)
+        self._sesion.mount('https://', adaptador)
+        self._ejecutor = concurrent.futures.ThreadPoolExecutor(max_workers=conexiones)
+        self._candado = threading.Lock()
+        self._candado_archivo = threading.Lock()
+        # Una solicitud en vuelo por clave (concurrent.futures.Future), compartida por consultar y es_feriado
+        self._pendientes = {}
+        self._tareas = set()
+        self._resultados = {}
+        self._uso = {}
+        self._sin_guardar = False
+        self._ultimo_guardado = float('-inf')
+        if ruta_cache and os.path.exists(ruta_cache):
+            with open(ruta_cache, encoding='utf-8') as archivo:
+                guardado = json.load(archivo)
+            self._resultados = {f: tuple(v) for f, v in guardado.get('feriados', {}).items()}
+            self._uso = guardado.get('cuota', {})
+        if ruta_cache:
+            # Los resultados que aun esperan el intervalo de guardado se escriben al salir
+            import atexit
+            atexit.register(self._escribir_cache)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.cerrar()
+
+    @property
+    def cuota_restante(self):
+        """Solicitudes que quedan en el mes calendario actual"""
+        with self._candado:
+            return self.cuota_mensual - self._uso.get(self.__mes(), 0)
+
+    def __mes(self):
+        return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m')
+
+    def __en_cache(self, clave):
+        """Devuelve el resultado guardado (de una fecha o de un año) o None si no existe o ya expiro"""
+        with self._candado:
+            guardado = self._resultados.get(clave)
+        if guardado is not None and guardado[0] > time.time():
+            if instrumentacion.activa:
+                instrumentacion.contar('api_cache_aciertos')
+            return guardado[1]
+        return None
+
+    def __guardar(self, clave, valor):
+        """Guarda un resultado en memoria; devuelve True si ya toca escribir la cache en disco"""
+        with self._candado:
+            self._resultados[clave] = (time.time() + self.ttl, valor)
+            self._sin_guardar = bool(self.ruta_cache)
+            return self._sin_guardar and time.monotonic() - self._ultimo_guardado >= self.intervalo_guardado
+
+    def _escribir_cache(self):
+        """Escribe en ruta_cache, de una sola vez, los resultados pendientes (archivo temporal y os.replace)"""
+        with self._candado_archivo:
+            with self._candado:
+                if not self._sin_guardar:
+                    return
+                contenido = {'feriados': dict(self._resultados), 'cuota': dict(self._uso)}
+                self._sin_guardar = False
+                self._ultimo_guardado = time.monotonic()
+            temporal = '{}.{}.tmp'.format(self.ruta_cache, os.getpid())
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(contenido, archivo)
+            os.replace(temporal, self.ruta_cache)
+
+    def __en_vuelo(self, clave):
+        """Devuelve (futuro, nuevo): la solicitud en vuelo de la clave, creandola si no existe"""
+        import concurrent.futures
+        with self._candado:
+            futuro = self._pendientes.get(clave)
+            if futuro is not None:
+                return futuro, False
+            futuro = self._pendientes[clave] = concurrent.futures.Future()
+            return futuro, True
+
+    def __terminar(self, clave, futuro, valor=None, error=None):
+        """Publica el resultado (o el error) de una solicitud a todos los que la esperan"""
+        with self._candado:
+            self._pendientes.pop(clave, None)
+        if error is not None:
+            futuro.set_exception(error)
         else:
-            self[datetime.date(año, OCT, 9)] = nombre        
-        
-        # Dia de Difuntos
-        nombredd = "D�a de los difuntos [Day of the Dead]" 
-        # Independencia de Cuenca
-        nombreic = "Independencia de Cuenca [Independence of Cuenca]"
-        #(Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016/R.O # 906))
-        #Para festivos nacionales y/o locales que coincidan en d�as corridos,
-        #se aplicar�n las siguientes reglas:
-        if (datetime.date(año, NOV, 2).weekday() == 5 and  datetime.date(año, NOV, 3).weekday() == 6):
-            self[datetime.date(año, NOV, 2) - datetime.timedelta(days=1)] = nombredd
-            self[datetime.date(año, NOV, 3) + datetime.timedelta(days=1)] = nombreic     
-        elif (datetime.date(año, NOV, 3).weekday() == 2):
-            self[datetime.date(año, NOV, 2)] = nombredd
-            self[datetime.date(año, NOV, 3) - datetime.timedelta(days=2)] = nombreic
-        elif (datetime.date(año, NOV, 3).weekday() == 3):
-            self[datetime.date(año, NOV, 3)] = nombreic
-            self[datetime.date(año, NOV, 2) + datetime.timedelta(days=2)] = nombredd
-        elif (datetime.date(año, NOV, 3).weekday() == 5):
-            self[datetime.date(año, NOV, 2)] =  nombredd
-            self[datetime.date(año, NOV, 3) - datetime.timedelta(days=2)] = nombreic
-        elif (datetime.date(año, NOV, 3).weekday() == 0):
-            self[datetime.date(año, NOV, 3)] = nombreic
-            self[datetime.date(año, NOV, 2) + datetime.timedelta(days=2)] = nombredd
+            futuro.set_result(valor)
+
+    def __reservar(self):
+        """Descuenta una solicitud de la cuota mensual y devuelve la espera del limitador de tasa"""
+        with self._candado:
+            mes = self.__mes()
+            if self._uso.get(mes, 0) >= self.cuota_mensual:
+                raise CuotaAgotada('Se agoto la cuota mensual de {} solicitudes de la API de dias festivos'.format(
+                    self.cuota_mensual))
+            self._uso[mes] = self._uso.get(mes, 0) + 1
+        return self._cubeta.reservar()
+
+    def _pedir(self, params):
+        """
+        Realiza una solicitud HTTP bloqueante a la API
+         Devoluciones
+         -------
+         Devuelve la lista de dias festivos (JSON) de la respuesta
+        """
+        params = dict(params, api_key=self.clave, country=self.pais)
+        if instrumentacion.activa:
+            instrumentacion.contar('api_solicitudes')
+            inicio = time.perf_counter()
+            try:
+                response = self._sesion.get(self.url, params=params, timeout=self.tiempo_espera)
+            except requests.RequestException:
+                instrumentacion.contar('api_errores')
+                raise
+            finally:
+                instrumentacion.registrar('api_solicitud', time.perf_counter() - inicio)
+                instrumentacion.fijar('api_cuota_restante', self.cuota_restante)
+            if response.status_code >= 400:
+                instrumentacion.contar('api_errores')
         else:
-            self[datetime.date(año, NOV, 2)] = nombredd
-            self[datetime.date(año, NOV, 3)] = nombreic  
-            
-        # Fundaci�n de Quito, aplica solo para la provincia de Pichincha,
-        # las reglas son las mismas que el d�a del trabajo
-        nombre = "Fundaci�n de Quito [Foundation of Quito]"        
-        if self.prov in ("EC-P"):
-            if año > 2015 and datetime.date(año, DEC, 6).weekday() in (5,1):
-                self[datetime.date(año, DEC, 6) - datetime.timedelta(days=1)] = nombre
-            elif año > 2015 and datetime.date(año, DEC, 6).weekday() == 6:
-                self[(datetime.date(año, DEC, 6).weekday()) + datetime.timedelta(days=1)] =nombre
-            elif año > 2015 and  datetime.date(año, DEC, 6).weekday() in (2,3):
-                self[datetime.date(año, DEC, 6) + rd(weekday=FR)] = nombre
+            response = self._sesion.get(self.url, params=params, timeout=self.tiempo_espera)
+        if (response.status_code == 401):
+            # Esto significa que falta una clave API
+            raise requests.HTTPError(
+                'Falta la clave API. Guarde su clave en la variable de entorno HOLIDAYS API_KEY')
+        if response.status_code == 429:
+            raise CuotaAgotada('La API de dias festivos rechazo la solicitud por limite de uso', response=response)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _es_feriado(dias_festivos):
+        """Devuelve True si la respuesta contiene algun feriado real"""
+        # Arreglar el Jueves Santo incorrectamente denotado como feriado
+        return any(f.get('name', f.get('nombre')) != 'Maundy Thursday' for f in dias_festivos)
+
+    @staticmethod
+    def _fechas_feriado(dias_festivos):
+        """Devuelve las fechas AAAA-MM-DD de la respuesta que son feriados reales"""
+        fechas = set()
+        for f in dias_festivos:
+            # Arreglar el Jueves Santo incorrectamente denotado como feriado
+            if f.get('name', f.get('nombre')) == 'Maundy Thursday':
+                continue
+            if 'date_year' in f:
+                y, m, d = f['date_year'], f['date_month'], f['date_day']
             else:
-                self[datetime.date(año, DEC, 6)] = nombre
+                m, d, y = f['date'].split('/')
+            fechas.add('{:04d}-{:02d}-{:02d}'.format(int(y), int(m), int(d)))
+        return sorted(fechas)
 
-class PicoPlaca:
+    def __clave(self, fecha):
+        """Clave de cache y de consulta: el año completo o la fecha, segun el modo"""
+        return fecha[:4] if self.por_año else fecha
+
+    def __pedir_clave(self, clave):
+        if self.por_año:
+            return self._fechas_feriado(self._pedir({'year': clave}))
+        y, m, d = clave.split('-')
+        return self._es_feriado(self._pedir({'year': y, 'month': m, 'day': d}))
+
+    def __responder(self, fecha, valor):
+        return fecha in valor if self.por_año else valor
+
+    def __sin_conexion(self, fecha, error):
+        """Responde con la tabla HolidayEcuador cuando la API no esta disponible"""
+        if not self.respaldo_sin_conexion or (
+                isinstance(error, requests.HTTPError) and not isinstance(error, CuotaAgotada)
+                and (error.response is None or error.response.status_code < 500)):
+            raise error
+        y, m, d = fecha.split('-')
+        return datetime.date(int(y), int(m), int(d)) in cache_feriados.obtener(int(y), _PROVINCIA_PICOPLACA)
+
+    def consultar(self, fecha):
+        """
+        Comprueba de forma bloqueante si la fecha es un dia festivo
+         Parámetros
+         ----------
+         fecha: calle
+             Está siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
+         Devoluciones
+         -------
+         Devuelve True si la fecha es un dia festivo en el pais, de lo contrario, False
+         Las llamadas concurrentes (desde hilos o junto con es_feriado) para la misma fecha
+         o el mismo año comparten una sola solicitud HTTP; no se debe llamar desde el hilo
+         del bucle de eventos, use es_feriado.
+        """
+        clave = self.__clave(fecha)
+        valor = self.__en_cache(clave)
+        if valor is None:
+            futuro, nuevo = self.__en_vuelo(clave)
+            if nuevo:
+                try:
+                    time.sleep(self.__reservar())
+                    valor = self.__pedir_clave(clave)
+                except Exception as error:
+                    self.__terminar(clave, futuro, error=error)
+                else:
+                    if self.__guardar(clave, valor):
+                        self._escribir_cache()
+                    self.__terminar(clave, futuro, valor)
+            try:
+                valor = futuro.result()
+            except requests.RequestException as error:
+                return self.__sin_conexion(fecha, error)
+        return self.__responder(fecha, valor)
+
+    async def es_feriado(self, fecha):
+        """
+        Comprueba si la fecha es un dia festivo; las llamadas concurrentes para la misma
+         fecha (o el mismo año), tambien las de consultar en otros hilos, comparten una sola
+         solicitud HTTP
+         Parámetros
+         ----------
+         fecha: calle
+             Está siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
+         Devoluciones
+         -------
+         Devuelve True si la fecha es un dia festivo en el pais, de lo contrario, False
+        """
+        import asyncio
+        clave = self.__clave(fecha)
+        valor = self.__en_cache(clave)
+        if valor is None:
+            futuro, nuevo = self.__en_vuelo(clave)
+            if nuevo:
+                tarea = asyncio.get_running_loop().create_task(self.__resolver(clave, futuro))
+                self._tareas.add(tarea)
+                tarea.add_done_callback(self._tareas.discard)
+            try:
+                # shield: si se cancela quien espera, la solicitud sigue para los demas
+                valor = await asyncio.shield(asyncio.wrap_future(futuro))
+            except requests.RequestException as error:
+                return self.__sin_conexion(fecha, error)
+        return self.__responder(fecha, valor)
+
+    async def __resolver(self, clave, futuro):
+        """Resuelve una clave sin bloquear el bucle: la solicitud y la escritura en disco van a hilos"""
+        import asyncio
+        bucle = asyncio.get_running_loop()
+        try:
+            await asyncio.sleep(self.__reservar())
+            valor = await bucle.run_in_executor(self._ejecutor, self.__pedir_clave, clave)
+        except BaseException as error:
+            self.__terminar(clave, futuro, error=error)
+            if not isinstance(error, Exception):
+                raise
+            return
+        escribir = self.__guardar(clave, valor)
+        self.__terminar(clave, futuro, valor)
+        if escribir:
+            await bucle.run_in_executor(self._ejecutor, self._escribir_cache)
+
+    async def es_feriado_lote(self, fechas):
+        """
+        Consulta varias fechas de forma concurrente
+         Devoluciones
+         -------
+         Devuelve una lista de bool en el mismo orden que fechas
+        """
+        import asyncio
+        return list(await asyncio.gather(*(self.es_feriado(f) for f in fechas)))
+
+    def cerrar(self):
+        """Escribe los resultados pendientes en ruta_cache y cierra las conexiones HTTP y el grupo de hilos"""
+        if self.ruta_cache:
+            self._escribir_cache()
+        self._ejecutor.shutdown(wait=False)
+        self._sesion.close()
+
+# Proveedor en linea que usa PicoPlaca cuando enlinea == True (se crea al primer uso)
+_proveedor_en_linea = None
+_candado_proveedor = threading.Lock()
+
+def proveedor_en_linea():
+    """Devuelve el proveedor en linea compartido, creandolo si todavia no existe"""
+    global _proveedor_en_linea
+    with _candado_proveedor:
+        if _proveedor_en_linea is None:
+            _proveedor_en_linea = ProveedorFeriadosEnLinea(ruta_cache=os.environ.get('VACACIONES_CACHE'))
+        return _proveedor_en_linea
+
+def activar_proveedor_en_linea(proveedor):
+    """
+    Reemplaza el proveedor en linea compartido que usa PicoPlaca
+     Parámetros
+     ----------
+     proveedor: ProveedorFeriadosEnLinea o None
+         None hace que se cree uno nuevo con la configuracion por defecto al siguiente uso
+    """
+    global _proveedor_en_linea
+    with _candado_proveedor:
+        _proveedor_en_linea = proveedor
+
+# Motivos del veredicto de predecir_arrow, en el orden en que predecir() aplica las reglas
+MOTIVOS = ('feriado', 'exenta', 'fuera_de_pico', 'digito_permitido', 'restringido')
+(_MOTIVO_FERIADO, _MOTIVO_EXENTA, _MOTIVO_FUERA_DE_PICO,
+ _MOTIVO_DIGITO_PERMITIDO, _MOTIVO_RESTRINGIDO) = range(len(MOTIVOS))
+
+# Patrones de validacion compilados una sola vez
+_PATRON_PLACA = re.compile('^[A-Z]{2,3}-[0-9]{4}$')
+_PATRON_FECHA = re.compile('^[0-9]{4}-[0-9]{2}-[0-9]{2}$')
+_PATRON_HORA = re.compile('^([01][0-9]|2[0-3]):([0-5][0-9]|)$')
+_DIAS_MES = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+def _analizar_placa(valor):
+    """
+    Valida una placa y extrae los datos que usan las reglas
+     Parámetros
+     ----------
+     valor: cadena
+     Devoluciones
+     -------
+     Tupla (exenta por la segunda letra o por tener solo dos letras, ultimo digito o None)
+     aumenta
+     ------
+     ValorError
+         Si la cadena de valor no tiene el formato XX-YYYY o XXX-YYYY
+    """
+    if not _PATRON_PLACA.match(valor):
+        raise ValueError(
+            'La placa debe tener el siguiente formato: XX-YYYY o XXX-YYYY, donde X es una letra may�scula e Y es un d�gito')
+    ultimo = valor[-1]
+    return (valor[1] in 'AUZEXM' or valor[2] == '-',
+            ord(ultimo) - 48 if '0' <= ultimo <= '9' else None)
+
+def _es_feriado_sin_conexion(año, mes, dia, dias):
+    """
+    Comprueba con el indice activo o la cache compartida si una fecha es feriado para PicoPlaca
+     Parámetros
+     ----------
+     año, mes, dia: int
+     dias: int
+         dias desde 1970-01-01 de la misma fecha
+    """
+    indice = indice_feriados
+    if indice is not None and indice.cubre(año, _PROVINCIA_PICOPLACA):
+        return indice.contiene(dias, _PROVINCIA_PICOPLACA)
+    ecu_holidays = cache_feriados.obtener(año, _PROVINCIA_PICOPLACA)
+    return datetime.date(año, mes, dia) in ecu_holidays
+
+class PicoPlaca:
+    """
+    Una clase para representar un vehiculo.
+    medida de restriccion (Pico y Placa)
+    - ORDENANZA METROPOLITANA No. 0305
+    http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+    ...
+    Atributos
+    ----------
+    placa : calle
+        El registro o patente de un veh�culo es una combinaci�n de caracteres alfab�ticos o num�ricos
+        caracteres que identifican e individualizan el veh�culo respecto de los dem�s;
+        
+        El formato utilizado es
+        XX-YYYY o XXX-YYYY,
+        donde X es una letra may�scula e Y es un d�gito.
+    fecha: calle
+        Fecha en la que el veh�culo pretende transitar
+        esta siguiendo el
+        Formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
+    tiempo: calle
+        tiempo en que el veh�culo pretende transitar
+        esta siguiendo el formato
+        HH:MM: por ejemplo, 08:35, 19:30
+    en l�nea: booleano, opcional
+        si en l�nea == Verdadero, se utilizar� la API de d�as festivos abstractos
+    M�todos
+    -------
+    __init__(self, plate, date, time, online=False):
+        Construye todos los atributos necesarios.
+        para el objeto PicoPlaca.
+    plato (uno mismo):
+        Obtiene el valor del atributo de placa
+    placa (auto, valor):
+        Establece el valor del atributo de la placa
+    fecha (uno mismo):
+        Obtiene el valor del atributo de fecha
+    fecha (auto, valor):
+        Establece el valor del atributo de fecha
+    tiempo (uno mismo):
+        Obtiene el valor del atributo de tiempo
+    tiempo (uno mismo, valor):
+        Establece el valor del atributo de tiempo
+    __encontar_dia(yo):
+        Devuelve el d�a a partir de la fecha: por ejemplo, mi�rcoles
+    __is_forbidden_time(self):
+        Devuelve True si el tiempo proporcionado est� dentro de las horas pico prohibidas, de lo contrario, False
+    __es_vacaciones:
+        Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un d�a festivo en Ecuador, de lo contrario, False
+    predecir (auto):
+        Devuelve True si el veh�culo con la placa especificada puede estar en la carretera en la fecha y hora especificadas, de lo contrario, False
+    predecir_lote(cls, placas, fechas, horas, enlinea=False):
+        Devuelve un arreglo de bool con el resultado de predecir para cada fila, evaluado de forma vectorizada
+    tabla_restricciones(cls):
+        Devuelve la tabla compilada (dia de la semana, ultimo digito, minuto) de las reglas semanales
+    configurar_reglas(cls, restricciones=None, horas_pico=None):
+        Reemplaza las reglas de la ordenanza
+    intervalos_restringidos(cls, placa, desde, hasta):
+        Devuelve las ventanas en las que la placa no puede circular dentro de un rango
+    proxima_hora_permitida(cls, placa, momento, horizonte=366):
+        Devuelve el siguiente instante en el que la placa puede circular
+    """
+    __slots__ = ('_placa', '_fecha', '_hora', 'enlinea', '_datos_placa', '_datos_fecha', '_minuto')
+
+    #Days of the week
+    __dias = [
+            "Monday",
+            "Tuesday",
+            "Wednesday",
+            "Thursday",
+            "Friday",
+            "Saturday",
+            "Sunday"]
+
+    # Dictionary that holds the restrictions inf the form {day: forbidden last digit}
+    __restricciones = {
+            "Monday": [1, 2],
+            "Tuesday": [3, 4],
+            "Wednesday": [5, 6],
+            "Thursday": [7, 8],
+            "Friday": [9, 0],
+            "Saturday": [],
+            "Sunday": []}
+
+    # Horas pico prohibidas como minutos desde la medianoche (ambos extremos incluidos):
+    # 07:00 - 09:30 y 16:00 - 19:30
+    __horas_pico = ((7 * 60, 9 * 60 + 30), (16 * 60, 19 * 60 + 30))
+
+    # Tabla compilada de restricciones y las reglas con las que se construyo
+    __tabla = None
+    __tabla_origen = (None, None)
+
+    def __init__(self, placa, fecha, hora, enlinea=False):
+        """
+        Construye todos los atributos necesarios para el objeto PicoPlaca.
+        
+         Par�metros
+         ----------
+             placa : calle
+                 El registro o patente de un veh�culo es una combinaci�n de caracteres alfab�ticos o num�ricos
+                 caracteres que identifican e individualizan el veh�culo respecto de los dem�s;
+                 El formato utilizado es AA-YYYY o XXX-YYYY, donde X es una letra may�scula e Y es un d�gito.
+             fecha: calle
+                 Fecha en la que el veh�culo pretende transitar
+                 Sigue el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
+             tiempo: calle
+                 tiempo en que el veh�culo pretende transitar
+                 Sigue el formato HH:MM: por ejemplo, 08:35, 19:30
+             en l�nea: booleano, opcional
+                 si en l�nea == Verdadero, se usar� la API de d�as festivos abstractos (el valor predeterminado es Falso)               
+        """                
+        if instrumentacion.activa:
+            inicio = time.perf_counter()
+            try:
+                self.placa = placa
+                self.fecha = fecha
+                self.hora = hora
+            except ValueError:
+                instrumentacion.contar('errores_analisis')
+                raise
+            finally:
+                instrumentacion.registrar('analisis', time.perf_counter() - inicio)
+        else:
+            self.placa = placa
+            self.fecha = fecha
+            self.hora = hora
+        self.enlinea = enlinea
+
+    @property
+    def placa(self):
+        """Gets (Obtiene) el valor del atributo placa"""
+        return self._placa
+
+    @placa.setter
+    def placa(self, valor):
+        """
+        Sets(Establece) eval�a el atributo placa
+         Par�metros
+         ----------
+         valor: cadena
+        
+         aumenta
+         ------
+         ValorError
+             Si la cadena de valor no tiene el formato
+             XX-YYYY o XXX-YYYY,
+             donde X es una letra may�scula e Y es un d�gito
+        """
+        self._datos_placa = _analizar_placa(valor)
+        self._placa = valor
+
+    @property
+    def fecha(self):
+        """Gets(Obtiene) el valor del atributo de fecha"""
+        return self._fecha
+
+    @fecha.setter
+    def fecha(self, valor):
+        """
+        Sets(Establece) el valor del atributo de fecha
+         Par�metros
+         ----------
+         valor: cadena
+        
+         aumenta
+         ------
+         ValorError
+             Si la cadena de valor no tiene el formato AAAA-MM-DD (por ejemplo, 2021-04-02)
+        """
+        try:
+            if len(valor) != 10:
+                raise ValueError
+            if _PATRON_FECHA.match(valor):
+                año, mes, dia = int(valor[:4]), int(valor[5:7]), int(valor[8:])
+                if not (año >= 1 and 1 <= mes <= 12 and 1 <= dia <= _DIAS_MES[mes - 1] + (
+                        mes == 2 and año % 4 == 0 and (año % 100 != 0 or año % 400 == 0))):
+                    raise ValueError
+            else:
+                # Formas poco comunes (por ejemplo digitos no ASCII) que strptime tambien acepta
+                t = datetime.datetime.strptime(valor, "%Y-%m-%d")
+                año, mes, dia = t.year, t.month, t.day
+        except ValueError:
+            raise ValueError(
+                'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)') from None
+        # (año, mes, dia, dias desde 1970-01-01, dia de la semana con lunes = 0)
+        dias = _dias_desde_epoca(año, mes, dia)
+        self._datos_fecha = (año, mes, dia, dias, (dias + 3) % 7)
+        self._fecha = valor
+
+
+    @property
+    def hora(self):
+        """Gets (Obtiene) el valor del atributo de tiempo"""
+        return self._hora
+
+    @hora.setter
+    def hora(self, valor):
+        """
+        Sets(Establece) el valor del atributo de tiempo
+         Par�metros
+         ----------
+         valor: cadena
+        
+         aumenta
+         ------
+         ValorError
+             Si la cadena de valor no tiene el formato HH:MM (por ejemplo, 08:31, 14:22, 00:01)
+        """
+        if not _PATRON_HORA.match(valor):
+            raise ValueError(
+                'La hora debe tener el siguiente formato: HH:MM (por ejemplo, 08:31, 14:22, 00:01)')
+        # Minutos desde la medianoche; None para valores como 'HH:' que pasan la validacion
+        # pero no son una hora (predecir lanza entonces el mismo error de strptime)
+        self._minuto = int(valor[:2]) * 60 + int(valor[3:]) if len(valor) == 5 else None
+        self._hora = valor
+
+    def __encontrar_dia(self):
+        """
+        Encuentra el d�a a partir de la fecha ya analizada: por ejemplo, mi�rcoles
+         Devoluciones
+         -------
+         Devuelve el d�a a partir de la fecha como una cadena
+        """
+        return self.__dias[self._datos_fecha[4]]
+
+    def __es_tiempo_prohibido(self):
+        """
+        Comprueba si la hora ya analizada est� dentro de las horas pico prohibidas,
+         donde las horas pico son: 07:00 - 09:30 y 16:00 - 19:30
+         Devoluciones
+         -------
+         Devuelve True si el tiempo proporcionado est� dentro de las horas pico prohibidas, de lo contrario, False
+        """
+        minuto = self._minuto
+        if minuto is None:
+            t = datetime.datetime.strptime(self.hora, '%H:%M')
+            minuto = t.hour * 60 + t.minute
+        return any(inicio <= minuto <= fin for inicio, fin in self.__horas_pico)
+
+    def __es_vacaciones(self):
+        """
+        Comprueba si la fecha del objeto es un d�a festivo en Ecuador
+         si en l�nea == Verdadero, utilizar� una API REST, de lo contrario, generar� los d�as festivos del a�o examinado
+         Devoluciones
+         -------
+         Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un d�a festivo en Ecuador, de lo contrario, False
+        """
+        if self.enlinea:
+            # API de vacaciones abstractapi, versi�n gratuita: 1000 solicitudes por mes
+             # 1 solicitud por segundo
+             # el proveedor compartido reutiliza conexiones, guarda resultados y respeta esos limites
+            return proveedor_en_linea().consultar(self.fecha)
+        else:
+            return _es_feriado_sin_conexion(*self._datos_fecha[:4])
+
+    def predecir(self, feriado=None):
+        """
+        Comprueba si el veh�culo con la placa especificada puede estar en la carretera en la fecha y hora proporcionada seg�n las reglas de Pico y Placa:
+         http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+         Devoluciones
+         -------
+         Devoluciones
+         Verdadero si el veh�culo con
+         la placa especificada puede estar en el camino
+         en la fecha y hora especificadas, de lo contrario Falso
+         Parámetros
+         ----------
+         feriado: booleano, opcional
+             si la fecha es feriado, cuando ya se conoce (por ejemplo, consultado con
+             ProveedorFeriadosEnLinea.es_feriado); por defecto se consulta
+        """
+        if instrumentacion.activa:
+            inicio = time.perf_counter()
+            try:
+                return self.__predecir(feriado)
+            finally:
+                instrumentacion.registrar('predecir', time.perf_counter() - inicio)
+        return self.__predecir(feriado)
+
+    def __predecir(self, feriado=None):
+        """Aplica las reglas de predecir (sin instrumentacion)"""
+        # Comprobar si la fecha es un d�a festivo
+        if self.__es_vacaciones() if feriado is None else feriado:
+            return True
+
+        # Consultar veh�culos excluidos de la restricci�n seg�n la segunda letra de la placa o si se utilizan s�lo dos letras
+         #https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
+        exenta, ultimo = self._datos_placa
+        if exenta:
+            return True
+
+        minuto = self._minuto
+        if minuto is not None and ultimo is not None:
+            # Restriccion semanal compilada: horas pico y ultimo digito restringido ese dia
+            return not self.tabla_restricciones()[(self._datos_fecha[4] * 10 + ultimo) * 1440 + minuto]
+
+        # Valores poco comunes que pasan la validacion ('HH:' o una placa con salto de linea final)
+        # se evaluan paso a paso para conservar los mismos errores
+       # Compruebe si el tiempo proporcionado no est� en las horas pico prohibidas
+        if not self.__es_tiempo_prohibido():
+            return True
+
+        dia = self.__encontrar_dia() # Encuentra el d�a de la semana a partir de la fecha
+         # Verifique si el �ltimo d�gito de la placa no est� restringido en este d�a en particular
+        if ultimo is None:
+            ultimo = int(self.placa[-1])
+        if ultimo not in self.__restricciones[dia]:
+            return True
+
+        return False
+
+    @classmethod
+    def predecir_lote(cls, placas, fechas, horas, enlinea=False):
+        """
+        Evalua en bloque las reglas de Pico y Placa para muchas consultas a la vez.
+         Las placas, fechas y horas se analizan de forma vectorizada (digito final,
+         dia de la semana y minuto del dia) y el resultado coincide fila por fila
+         con predecir().
+
+         Parámetros
+         ----------
+         placas: secuencia de str o numpy.ndarray
+             Placas en formato XX-YYYY o XXX-YYYY
+         fechas: secuencia de str o numpy.ndarray
+             Fechas en formato ISO 8601 AAAA-MM-DD
+         horas: secuencia de str o numpy.ndarray
+             Horas en formato HH:MM
+         enlinea: booleano, opcional
+             si enlinea == True, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+         Devoluciones
+         -------
+         numpy.ndarray de bool con True en las filas cuyo vehiculo puede estar en la carretera
+         aumenta
+         ------
+         ValueError
+             Si alguna fila no tiene el formato esperado (mismos mensajes que los setters)
+        """
+        placas, fechas, horas, resultado, valida = cls._predecir_validas(placas, fechas, horas, enlinea)
+        # Las filas que no pasan el analisis vectorizado se evaluan con la ruta escalar,
+        # que produce exactamente el mismo resultado o el mismo ValueError
+        for i in np.flatnonzero(~valida).tolist():
+            resultado[i] = cls(placas[i], fechas[i], horas[i], enlinea).predecir()
+        return resultado
+
+    @classmethod
+    def _predecir_validas(cls, placas, fechas, horas, enlinea=False):
+        """
+        Parte vectorizada de predecir_lote: evalua solo las filas que pasan el analisis en bloque
+         Devoluciones
+         -------
+         Tupla (placas, fechas, horas como numpy.ndarray de str, resultado, valida); en las
+         filas donde valida es False el resultado no esta definido
+        """
+        _importar_numpy()
+        placas = np.asarray(placas, dtype=str)
+        fechas = np.asarray(fechas, dtype=str)
+        horas = np.asarray(horas, dtype=str)
+        if not (placas.ndim == fechas.ndim == horas.ndim == 1):
+            raise ValueError('placas, fechas y horas deben ser columnas de una dimension')
+        if not (len(placas) == len(fechas) == len(horas)):
+            raise ValueError('placas, fechas y horas deben tener la misma longitud')
+        if len(placas) == 0:
+            return placas, fechas, horas, np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+
+        placa_ok, ultimo, exento = _analizar_placas(*_matriz_codigos(placas, 8))
+        fecha_ok, año, dias = _analizar_fechas(*_matriz_codigos(fechas, 10))
+        dia_semana = (dias + 3) % 7  # 1970-01-01 fue jueves
+        hora_ok, minuto = _analizar_horas(*_matriz_codigos(horas, 5))
+
+        valida = placa_ok & fecha_ok & hora_ok
+        feriado = _feriados_lote(dias, año, valida, enlinea)
+
+        tabla = np.frombuffer(cls.tabla_restricciones(), dtype=bool).reshape(7, 10, 1440)
+        restringido = tabla[dia_semana.clip(0, 6), ultimo, minuto.clip(0, 1439)]
+        return placas, fechas, horas, feriado | exento | ~restringido, valida
+
+    @classmethod
+    def predecir_arrow(cls, placas, fechas, horas, enlinea=False):
+        """
+        Evalua las reglas de Pico y Placa directamente sobre columnas Arrow, sin crear
+         cadenas de Python ni objetos PicoPlaca. Las fechas date32 y las horas time32/time64
+         se leen de sus buffers sin copiarlos; las placas se analizan desde el buffer de datos
+         de la columna de texto.
+         Parámetros
+         ----------
+         placas: pyarrow.Array de texto
+             Placas en formato XX-YYYY o XXX-YYYY
+         fechas: pyarrow.Array date32, date64 o de texto AAAA-MM-DD
+         horas: pyarrow.Array time32, time64 o de texto HH:MM
+         enlinea: booleano, opcional
+             si enlinea == True, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+         Devoluciones
+         -------
+         Tupla (puede_circular, motivo): un pyarrow.BooleanArray y un pyarrow.DictionaryArray con
+         el motivo de cada veredicto (ver MOTIVOS), en el mismo orden que predecir(); ambos son
+         nulos en las filas con valores nulos o que no tienen el formato esperado
+         aumenta
+         ------
+         ValueError
+             Si las columnas no tienen la misma longitud o son de un tipo no soportado
+        """
+        _importar_numpy()
+        _importar_pyarrow()
+        codigos, longitudes, placa_nula = _codigos_arrow(placas, 8)
+        placa_ok, ultimo, exento = _analizar_placas(codigos, longitudes)
+        fecha_ok, año, dias = _columna_fechas(fechas)
+        hora_ok, minuto = _columna_horas(horas)
+        if not (len(placa_ok) == len(fecha_ok) == len(hora_ok)):
+            raise ValueError('placas, fechas y horas deben tener la misma longitud')
+        valida = placa_ok & ~placa_nula & fecha_ok & hora_ok
+        feriado = _feriados_lote(dias, año, valida, enlinea)
+
+        # Las mismas reglas que tabla_restricciones, separadas para conocer el motivo
+        pico = np.zeros(1440, dtype=bool)
+        for inicio, fin in cls.__horas_pico:
+            pico[inicio:fin + 1] = True
+        restringe = np.zeros((7, 10), dtype=bool)
+        for d, nombre in enumerate(cls.__dias):
+            restringe[d, cls.__restricciones[nombre]] = True
+
+        motivo = np.full(len(valida), _MOTIVO_RESTRINGIDO, dtype=np.int8)
+        motivo[~restringe[(dias + 3) % 7, ultimo]] = _MOTIVO_DIGITO_PERMITIDO
+        motivo[~pico[minuto.clip(0, 1439)]] = _MOTIVO_FUERA_DE_PICO
+        motivo[exento] = _MOTIVO_EXENTA
+        motivo[feriado] = _MOTIVO_FERIADO
+        nula = None if valida.all() else ~valida
+        return (pa.array(motivo != _MOTIVO_RESTRINGIDO, mask=nula),
+                pa.DictionaryArray.from_arrays(pa.array(motivo, mask=nula), pa.array(MOTIVOS)))
+
+    @classmethod
+    def __ventanas(cls, placa, desde, hasta):
+        """
+        Genera las ventanas restringidas de una placa entre desde y hasta, unidas cuando
+         son contiguas (incluso entre dias) y recortadas al rango
+         Devoluciones
+         -------
+         Generador de tuplas (inicio, fin) de datetime.datetime, fin excluido
+        """
+        exenta, ultimo = _analizar_placa(placa)
+        if exenta or desde >= hasta:
+            return
+        if ultimo is None:
+            ultimo = int(placa[-1])
+        # Horas pico como intervalos [inicio, fin) en minutos, ordenados y unidos
+        pico = []
+        for inicio, fin in sorted(cls.__horas_pico):
+            if pico and inicio <= pico[-1][1]:
+                pico[-1][1] = max(pico[-1][1], fin + 1)
+            else:
+                pico.append([inicio, fin + 1])
+        restringe = [ultimo in cls.__restricciones[nombre] for nombre in cls.__dias]
+        actual = None
+        dia = desde.date()
+        medianoche = datetime.datetime.combine(dia, datetime.time())
+        while medianoche < hasta:
+            if restringe[dia.weekday()] and not _es_feriado_sin_conexion(
+                    dia.year, dia.month, dia.day, dia.toordinal() - _ORDINAL_EPOCA):
+                for inicio, fin in pico:
+                    inicio = max(medianoche + datetime.timedelta(minutes=inicio), desde)
+                    fin = min(medianoche + datetime.timedelta(minutes=fin), hasta)
+                    if inicio >= fin:
+                        continue
+                    if actual is not None and actual[1] == inicio:
+                        actual = (actual[0], fin)
+                    else:
+                        if actual is not None:
+                            yield actual
+                        actual = (inicio, fin)
+            dia += datetime.timedelta(days=1)
+            medianoche += datetime.timedelta(days=1)
+        if actual is not None:
+            yield actual
+
+    @classmethod
+    def intervalos_restringidos(cls, placa, desde, hasta):
+        """
+        Calcula los intervalos en los que una placa no puede circular, segun __restricciones,
+         las horas pico y el calendario de HolidayEcuador (sin conexion)
+         Parámetros
+         ----------
+         placa: calle
+             placa en formato XX-YYYY o XXX-YYYY
+         desde: datetime.datetime
+             inicio del rango
+         hasta: datetime.datetime
+             fin del rango (excluido)
+         Devoluciones
+         -------
+         Lista de tuplas (inicio, fin) de datetime.datetime con fin excluido, a resolucion de minutos
+         aumenta
+         ------
+         ValueError
+             Si la placa no tiene el formato esperado
+        """
+        return list(cls.__ventanas(placa, desde, hasta))
+
+    @classmethod
+    def proxima_hora_permitida(cls, placa, momento, horizonte=366):
+        """
+        Calcula el primer instante, a partir de momento, en el que la placa puede circular
+         Parámetros
+         ----------
+         placa: calle
+             placa en formato XX-YYYY o XXX-YYYY
+         momento: datetime.datetime
+         horizonte: int, opcional
+             dias maximos de busqueda (el valor predeterminado es 366)
+         Devoluciones
+         -------
+         Devuelve momento si ya puede circular, el fin de la ventana restringida en curso si no,
+         o None si la placa esta restringida durante todo el horizonte
+        """
+        minuto = momento.replace(second=0, microsecond=0)
+        hasta = minuto + datetime.timedelta(days=horizonte)
+        for inicio, fin in cls.__ventanas(placa, minuto, hasta):
+            if inicio > minuto:
+                return momento
+            return None if fin >= hasta else fin
+        return momento
+
+    @classmethod
+    def tabla_restricciones(cls):
+        """
+        Devuelve la tabla compilada de restricciones semanales, reconstruyendola si las
+         reglas (__restricciones o __horas_pico) cambiaron desde la ultima vez
+         Devoluciones
+         -------
+         bytes de longitud 7 x 10 x 1440: el byte (dia de la semana * 10 + ultimo digito) * 1440 + minuto
+         vale 1 si el vehiculo no puede circular en ese minuto (sin contar feriados ni placas exentas)
+        """
+        if cls.__tabla_origen[0] is cls.__restricciones and cls.__tabla_origen[1] is cls.__horas_pico:
+            return cls.__tabla
+        pico = bytearray(1440)
+        for inicio, fin in cls.__horas_pico:
+            pico[inicio:fin + 1] = b'\x01' * (fin + 1 - inicio)
+        tabla = bytearray(7 * 10 * 1440)
+        for d, nombre in enumerate(cls.__dias):
+            for digito in cls.__restricciones[nombre]:
+                tabla[(d * 10 + digito) * 1440:(d * 10 + digito + 1) * 1440] = pico
+        cls.__tabla = bytes(tabla)
+        cls.__tabla_origen = (cls.__restricciones, cls.__horas_pico)
+        return cls.__tabla
+
+    @classmethod
+    def configurar_reglas(cls, restricciones=None, horas_pico=None):
+        """
+        Reemplaza las reglas de la ordenanza; la tabla compilada se reconstruye en la siguiente consulta
+         Parámetros
+         ----------
+         restricciones: dict, opcional
+             {dia en ingles (Monday..Sunday): lista de ultimos digitos restringidos}
+         horas_pico: iterable de (inicio, fin), opcional
+             intervalos en minutos desde la medianoche, ambos extremos incluidos
+         aumenta
+         ------
+         ValueError
+             Si los dias, digitos o intervalos no son validos
+        """
+        if restricciones is not None:
+            if set(restricciones) != set(cls.__dias) or any(
+                    d not in range(10) for digitos in restricciones.values() for d in digitos):
+                raise ValueError('Las restricciones deben indicar digitos 0-9 para cada dia de Monday a Sunday')
+            cls.__restricciones = {dia: list(digitos) for dia, digitos in restricciones.items()}
+        if horas_pico is not None:
+            horas_pico = tuple((int(inicio), int(fin)) for inicio, fin in horas_pico)
+            if any(not 0 <= inicio <= fin < 1440 for inicio, fin in horas_pico):
+                raise ValueError('Las horas pico deben ser intervalos (inicio, fin) en minutos entre 0 y 1439')
+            cls.__horas_pico = horas_pico
+
+# Ordinal proleptico gregoriano de 1970-01-01
+_ORDINAL_EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+def _matriz_codigos(valores, ancho):
+    """
+    Convierte una columna de cadenas en una matriz de puntos de codigo
+     Parámetros
+     ----------
+     valores: numpy.ndarray de str (puede ser una vista no contigua, como a[::2])
+     ancho: int
+         numero minimo de columnas de la matriz (se rellena con ceros)
+     Devoluciones
+     -------
+     Tupla (matriz n x ancho de uint32, longitudes de cada cadena)
+    """
+    _importar_numpy()
+    # La vista uint32 requiere un bloque contiguo de cadenas
+    valores = np.ascontiguousarray(valores, dtype=str)
+    n = len(valores)
+    codigos = valores.view(np.uint32).reshape(n, -1)
+    if codigos.shape[1] < ancho:
+        codigos = np.pad(codigos, ((0, 0), (0, ancho - codigos.shape[1])))
+    return codigos, np.char.str_len(valores)
+
+def _es_digito(c):
+    """Devuelve True donde el punto de codigo es un digito ASCII"""
+    return (c >= ord('0')) & (c <= ord('9'))
+
+def _es_mayuscula(c):
+    """Devuelve True donde el punto de codigo es una letra mayuscula ASCII"""
+    return (c >= ord('A')) & (c <= ord('Z'))
+
+def _dias_del_mes(año, mes):
+    """Devuelve el numero de dias de cada (año, mes) del calendario gregoriano"""
+    _importar_numpy()
+    bisiesto = (año % 4 == 0) & ((año % 100 != 0) | (año % 400 == 0))
+    tabla = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    return tabla[(mes - 1).clip(0, 11)] + (bisiesto & (mes == 2))
+
+def _dias_desde_epoca(año, mes, dia):
+    """Devuelve los dias transcurridos desde 1970-01-01 para cada (año, mes, dia) gregoriano"""
+    a = año - (mes <= 2)
+    era = a // 400
+    ade = a - era * 400
+    dda = (153 * ((mes + 9) % 12) + 2) // 5 + dia - 1
+    dde = ade * 365 + ade // 4 - ade // 100 + dda
+    return era * 146097 + dde - 719468
+
+# Dias desde 1970-01-01 del primer y el ultimo dia que admite datetime.date
+_DIAS_MINIMO = datetime.date.min.toordinal() - _ORDINAL_EPOCA
+_DIAS_MAXIMO = datetime.date.max.toordinal() - _ORDINAL_EPOCA
+
+def _analizar_placas(codigos, longitudes):
+    """
+    Valida en bloque placas XX-YYYY o XXX-YYYY
+     Parámetros
+     ----------
+     codigos: numpy.ndarray n x 8 de enteros
+         puntos de codigo de cada placa, rellenos con ceros
+     longitudes: numpy.ndarray de int
+     Devoluciones
+     -------
+     Tupla de numpy.ndarray (placa valida, ultimo digito, exenta), como _analizar_placa
+    """
+    tres = longitudes == 8
+    dos = longitudes == 7
+    digitos = np.where(tres[:, None], codigos[:, 4:8], codigos[:, 3:7])
+    placa_ok = ((dos | tres)
+                & _es_mayuscula(codigos[:, 0]) & _es_mayuscula(codigos[:, 1])
+                & (dos | _es_mayuscula(codigos[:, 2]))
+                & (np.where(tres, codigos[:, 3], codigos[:, 2]) == ord('-'))
+                & _es_digito(digitos).all(axis=1))
+    ultimo = (digitos[:, 3].astype(np.int64) - ord('0')).clip(0, 9)
+    exento = np.isin(codigos[:, 1], [ord(c) for c in 'AUZEXM']) | dos
+    return placa_ok, ultimo, exento
+
+def _analizar_fechas(codigos, longitudes):
+    """
+    Valida en bloque fechas AAAA-MM-DD
+     Parámetros
+     ----------
+     codigos: numpy.ndarray n x 10 de enteros
+     longitudes: numpy.ndarray de int
+     Devoluciones
+     -------
+     Tupla de numpy.ndarray (fecha valida, año, dias desde 1970-01-01)
+    """
+    nf = codigos.astype(np.int64) - ord('0')
+    año = nf[:, 0] * 1000 + nf[:, 1] * 100 + nf[:, 2] * 10 + nf[:, 3]
+    mes = nf[:, 5] * 10 + nf[:, 6]
+    dia = nf[:, 8] * 10 + nf[:, 9]
+    fecha_ok = ((longitudes == 10)
+                & _es_digito(codigos[:, [0, 1, 2, 3, 5, 6, 8, 9]]).all(axis=1)
+                & (codigos[:, 4] == ord('-')) & (codigos[:, 7] == ord('-'))
+                & (año >= 1) & (mes >= 1) & (mes <= 12)
+                & (dia >= 1) & (dia <= _dias_del_mes(año, mes)))
+    return fecha_ok, año, _dias_desde_epoca(año, mes, dia)
+
+def _analizar_horas(codigos, longitudes):
+    """
+    Valida en bloque horas HH:MM
+     Parámetros
+     ----------
+     codigos: numpy.ndarray n x 5 de enteros
+     longitudes: numpy.ndarray de int
+     Devoluciones
+     -------
+     Tupla de numpy.ndarray (hora valida, minuto del dia)
+    """
+    nh = codigos.astype(np.int64) - ord('0')
+    hh = nh[:, 0] * 10 + nh[:, 1]
+    mm = nh[:, 3] * 10 + nh[:, 4]
+    hora_ok = ((longitudes == 5)
+               & _es_digito(codigos[:, [0, 1, 3, 4]]).all(axis=1)
+               & (codigos[:, 2] == ord(':'))
+               & (hh <= 23) & (mm <= 59))
+    return hora_ok, hh * 60 + mm
+
+def _feriados_lote(dias, año, valida, enlinea=False):
+    """
+    Marca en bloque las fechas que son feriado para PicoPlaca
+     Parámetros
+     ----------
+     dias: numpy.ndarray de int
+         dias desde 1970-01-01
+     año: numpy.ndarray de int
+         año de cada fecha
+     valida: numpy.ndarray de bool
+         filas que se consultan (las demas quedan en False)
+     enlinea: booleano, opcional
+         si enlinea == True, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+     Devoluciones
+     -------
+     numpy.ndarray de bool
+    """
+    feriado = np.zeros(len(dias), dtype=bool)
+    if not valida.any():
+        return feriado
+    if instrumentacion.activa:
+        instrumentacion.contar('filas_lote', len(dias))
+    with instrumentacion.medir('feriados_lote'):
+        if enlinea:
+            unicos, inversa = np.unique(dias[valida], return_inverse=True)
+            proveedor = proveedor_en_linea()
+            es_feriado = np.array(
+                [proveedor.consultar(datetime.date.fromordinal(d + _ORDINAL_EPOCA).isoformat())
+                 for d in unicos.tolist()], dtype=bool)
+            feriado[valida] = es_feriado[inversa.ravel()]
+        elif (indice_feriados is not None
+              and indice_feriados.cubre(int(año[valida].min()), _PROVINCIA_PICOPLACA)
+              and indice_feriados.cubre(int(año[valida].max()), _PROVINCIA_PICOPLACA)):
+            feriado[valida] = indice_feriados.contiene_lote(dias[valida], _PROVINCIA_PICOPLACA)
+        else:
+            feriados = [d.toordinal() - _ORDINAL_EPOCA
+                        for a in np.unique(año[valida]).tolist()
+                        for d in cache_feriados.obtener(a, _PROVINCIA_PICOPLACA)]
+            feriado[valida] = np.isin(dias[valida], feriados)
+    return feriado
+
+def _nulos_arrow(arreglo):
+    """Devuelve un numpy.ndarray de bool con True en los valores nulos de un pyarrow.Array"""
+    if arreglo.null_count == 0:
+        return np.zeros(len(arreglo), dtype=bool)
+    return arreglo.is_null().to_numpy(zero_copy_only=False)
+
+def _codigos_arrow(arreglo, ancho):
+    """
+    Extrae la matriz de bytes de una columna Arrow de texto leyendo directamente sus buffers
+     Parámetros
+     ----------
+     arreglo: pyarrow.Array de texto
+     ancho: int
+         numero de bytes que se toman de cada cadena (se rellena con ceros)
+     Devoluciones
+     -------
+     Tupla (matriz n x ancho de uint8, longitudes en bytes, nulos)
+    """
+    if isinstance(arreglo, pa.ChunkedArray):
+        arreglo = arreglo.combine_chunks()
+    if pa.types.is_large_string(arreglo.type):
+        tipo = np.int64
+    else:
+        if not pa.types.is_string(arreglo.type):
+            arreglo = arreglo.cast(pa.string())
+        tipo = np.int32
+    n = len(arreglo)
+    codigos = np.zeros((n, ancho), dtype=np.uint8)
+    if n == 0:
+        return codigos, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    _, desplazamientos, datos = arreglo.buffers()
+    desplazamientos = np.frombuffer(desplazamientos, dtype=tipo, count=arreglo.offset + n + 1)[arreglo.offset:]
+    inicio = desplazamientos[:-1]
+    longitudes = (desplazamientos[1:] - inicio).astype(np.int64)
+    if datos is not None and datos.size:
+        datos = np.frombuffer(datos, dtype=np.uint8)
+        for j in range(ancho):
+            columna = datos[np.minimum(inicio + j, len(datos) - 1)]
+            codigos[:, j] = np.where(longitudes > j, columna, 0)
+    return codigos, longitudes, _nulos_arrow(arreglo)
+
+def _valores_arrow(arreglo, tipo):
+    """Devuelve sin copiar los valores de una columna Arrow de ancho fijo como numpy.ndarray"""
+    return np.frombuffer(arreglo.buffers()[1], dtype=tipo, count=arreglo.offset + len(arreglo))[arreglo.offset:]
+
+def _columna_fechas(arreglo):
+    """
+    Lee una columna Arrow de fechas (date32, date64 o texto AAAA-MM-DD)
+     Devoluciones
+     -------
+     Tupla de numpy.ndarray (fecha valida, año, dias desde 1970-01-01)
+    """
+    if isinstance(arreglo, pa.ChunkedArray):
+        arreglo = arreglo.combine_chunks()
+    if pa.types.is_string(arreglo.type) or pa.types.is_large_string(arreglo.type):
+        codigos, longitudes, nulos = _codigos_arrow(arreglo, 10)
+        fecha_ok, año, dias = _analizar_fechas(codigos, longitudes)
+        return fecha_ok & ~nulos, año, dias
+    if pa.types.is_date64(arreglo.type):
+        arreglo = arreglo.cast(pa.date32(), safe=False)
+    elif not pa.types.is_date32(arreglo.type):
+        raise ValueError('La columna de fechas debe ser date32, date64 o texto, no {}'.format(arreglo.type))
+    dias = _valores_arrow(arreglo, np.int32).astype(np.int64)
+    fecha_ok = ~_nulos_arrow(arreglo) & (dias >= _DIAS_MINIMO) & (dias <= _DIAS_MAXIMO)
+    dias = np.where(fecha_ok, dias, 0)
+    año = dias.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+    return fecha_ok, año, dias
+
+# Unidades de time32/time64 por minuto
+_UNIDADES_POR_MINUTO = {'s': 60, 'ms': 60000, 'us': 60000000, 'ns': 60000000000}
+
+def _columna_horas(arreglo):
+    """
+    Lee una columna Arrow de horas (time32, time64 o texto HH:MM)
+     Devoluciones
+     -------
+     Tupla de numpy.ndarray (hora valida, minuto del dia)
+    """
+    if isinstance(arreglo, pa.ChunkedArray):
+        arreglo = arreglo.combine_chunks()
+    if pa.types.is_string(arreglo.type) or pa.types.is_large_string(arreglo.type):
+        codigos, longitudes, nulos = _codigos_arrow(arreglo, 5)
+        hora_ok, minuto = _analizar_horas(codigos, longitudes)
+        return hora_ok & ~nulos, minuto
+    if pa.types.is_time32(arreglo.type):
+        valores = _valores_arrow(arreglo, np.int32)
+    elif pa.types.is_time64(arreglo.type):
+        valores = _valores_arrow(arreglo, np.int64)
+    else:
+        raise ValueError('La columna de horas debe ser time32, time64 o texto, no {}'.format(arreglo.type))
+    minuto = valores // _UNIDADES_POR_MINUTO[arreglo.type.unit]
+    return ~_nulos_arrow(arreglo) & (minuto >= 0) & (minuto < 1440), minuto
+
+if os.environ.get('VACACIONES_INDICE'):
+    activar_indice(os.environ['VACACIONES_INDICE'])
+
+def leer_registros(archivo, formato):
+    """
+    Lee registros (placa, fecha, hora) de un archivo de texto sin cargarlo completo en memoria
+     Parámetros
+     ----------
+     archivo: objeto de archivo de texto
+     formato: calle
+         'csv' (con encabezado placa,fecha,hora) o 'jsonl' (un objeto JSON por linea)
+     Devoluciones
+     -------
+     Generador de diccionarios con al menos las claves placa, fecha y hora
+    """
+    if formato == 'csv':
+        yield from csv.DictReader(archivo)
+    else:
+        yield from _decodificar_jsonl(archivo)
+
+class _RegistroIlegible(dict):
+    """Registro de una linea JSONL que no es un objeto JSON; conserva el texto y el motivo"""
+
+    def __init__(self, linea, error):
+        super().__init__(placa=None, fecha=None, hora=None, linea=linea.rstrip('\r\n'))
+        self.error = error
+
+def _decodificar_jsonl(lineas):
+    """Decodifica las lineas JSONL no vacias; las que no son un objeto JSON se devuelven como _RegistroIlegible"""
+    for linea in lineas:
+        if not linea.strip():
+            continue
+        try:
+            registro = json.loads(linea)
+        except ValueError as error:
+            yield _RegistroIlegible(linea, 'La linea no es JSON valido: {}'.format(error))
+            continue
+        if isinstance(registro, dict):
+            yield registro
+        else:
+            yield _RegistroIlegible(linea, 'La linea no es un objeto JSON')
+
+def _error_registro(registro):
+    """Devuelve el motivo por el que un registro no se puede evaluar (campos ausentes o que no son texto), o None"""
+    if isinstance(registro, _RegistroIlegible):
+        return registro.error
+    for campo in ('placa', 'fecha', 'hora'):
+        valor = registro.get(campo, '')
+        if valor is None:
+            return 'Falta el campo {}'.format(campo)
+        if not isinstance(valor, str):
+            return 'El campo {} debe ser texto'.format(campo)
+    return None
+
+def evaluar_flujo(registros, tamaño_bloque=65536, enlinea=False):
+    """
+    Evalua un flujo de registros por bloques de tamaño fijo usando predecir_lote
+     Parámetros
+     ----------
+     registros: iterable de diccionarios con las claves placa, fecha y hora
+     tamaño_bloque: int, opcional
+         numero de registros evaluados a la vez (el valor predeterminado es 65536)
+     enlinea: booleano, opcional
+         si enlinea == True, se utilizará la API de días festivos abstractos
+     Devoluciones
+     -------
+     Generador de tuplas (registro, resultado, error) en el mismo orden de entrada;
+     resultado es None y error contiene el mensaje si el registro no es valido (formato
+     incorrecto, campo ausente o que no es texto, o linea JSONL ilegible)
+    """
+    registros = iter(registros)
+    while True:
+        bloque = list(itertools.islice(registros, tamaño_bloque))
+        if not bloque:
+            return
+        errores = [_error_registro(r) for r in bloque]
+        validos = [r for r, error in zip(bloque, errores) if error is None]
+        # Las filas validas se evaluan en bloque; solo las que no pasan el analisis vectorizado
+        # se evaluan con la ruta escalar, que da su resultado o su mensaje de error
+        _, _, _, resultados, valida = PicoPlaca._predecir_validas(
+            [r.get('placa', '') for r in validos],
+            [r.get('fecha', '') for r in validos],
+            [r.get('hora', '') for r in validos],
+            enlinea)
+        resultados = iter(zip(resultados.tolist(), valida.tolist()))
+        for r, error in zip(bloque, errores):
+            if error is not None:
+                yield r, None, error
+                continue
+            resultado, es_valida = next(resultados)
+            if es_valida:
+                yield r, resultado, None
+                continue
+            try:
+                resultado = PicoPlaca(r.get('placa', ''), r.get('fecha', ''), r.get('hora', ''),
+                                      enlinea).predecir()
+            except ValueError as error_fila:
+                yield r, None, str(error_fila)
+            else:
+                yield r, resultado, None
+
+def _campos_veredicto(registro):
+    """Columnas de un veredicto: las del registro mas puede_circular y error"""
+    return list(dict(registro, puede_circular=None, error=None))
+
+def escribir_veredictos(veredictos, archivo, formato, encabezado=True, campos=None):
+    """
+    Escribe los veredictos a medida que se producen
+     Parámetros
+     ----------
+     veredictos: iterable de tuplas (registro, resultado, error) como las de evaluar_flujo
+     archivo: objeto de archivo de texto
+     formato: calle
+         'csv' o 'jsonl'
+     encabezado: booleano, opcional
+         si es False no se escribe la linea de encabezado CSV
+     campos: lista de calle, opcional
+         columnas CSV (por defecto las del primer registro mas puede_circular y error);
+         las claves que no estan en campos se omiten
+     Devoluciones
+     -------
+     Devuelve el numero de registros escritos
+    """
+    total = 0
+    escritor = None
+    for registro, resultado, error in veredictos:
+        fila = dict(registro, puede_circular=resultado, error=error)
+        if formato == 'csv':
+            if escritor is None:
+                escritor = csv.DictWriter(archivo, fieldnames=campos or _campos_veredicto(registro),
+                                          extrasaction='ignore')
+                if encabezado:
+                    escritor.writeheader()
+            fila['puede_circular'] = '' if resultado is None else str(resultado).lower()
+            fila['error'] = error or ''
+            escritor.writerow(fila)
+        else:
+            archivo.write(json.dumps(fila, ensure_ascii=False) + '\n')
+        total += 1
+    return total
+
+def leer_arrow(ruta, tamaño_lote=65536, columnas=None):
+    """
+    Lee por lotes un archivo Parquet o Arrow IPC sin cargarlo completo en memoria
+     Parámetros
+     ----------
+     ruta: calle
+         archivo .parquet, o .arrow/.feather (los archivos Arrow se mapean en memoria)
+     tamaño_lote: int, opcional
+         filas por lote de Parquet (el valor predeterminado es 65536)
+     columnas: lista de calle, opcional
+         columnas que se leen (por defecto todas)
+     Devoluciones
+     -------
+     Generador de pyarrow.RecordBatch
+    """
+    _importar_pyarrow()
+    if _formato(ruta, None) == 'parquet':
+        import pyarrow.parquet
+        archivo = pyarrow.parquet.ParquetFile(ruta)
+        try:
+            yield from archivo.iter_batches(batch_size=tamaño_lote, columns=columnas)
+        finally:
+            archivo.close()
+        return
+    with pa.memory_map(ruta) as fuente:
+        try:
+            lector = pa.ipc.open_file(fuente)
+            lotes = (lector.get_batch(i) for i in range(lector.num_record_batches))
+        except pa.ArrowInvalid:
+            fuente.seek(0)
+            lotes = pa.ipc.open_stream(fuente)
+        for lote in lotes:
+            yield lote.select(columnas) if columnas else lote
+
+def evaluar_arrow(lotes, placa='placa', fecha='fecha', hora='hora', enlinea=False):
+    """
+    Evalua lotes Arrow con predecir_arrow y les agrega las columnas del veredicto
+     Parámetros
+     ----------
+     lotes: iterable de pyarrow.RecordBatch
+     placa, fecha, hora: calle, opcional
+         nombres de las columnas de entrada
+     enlinea: booleano, opcional
+         si enlinea == True, se utilizará la API de días festivos abstractos
+     Devoluciones
+     -------
+     Generador de pyarrow.RecordBatch con las columnas originales (sin copiarlas) mas
+     puede_circular (bool) y motivo (diccionario de MOTIVOS)
+    """
+    for lote in lotes:
+        puede_circular, motivo = PicoPlaca.predecir_arrow(
+            lote.column(placa), lote.column(fecha), lote.column(hora), enlinea)
+        yield pa.RecordBatch.from_arrays(lote.columns + [puede_circular, motivo],
+                                         names=lote.schema.names + ['puede_circular', 'motivo'])
+
+def escribir_arrow(lotes, ruta, formato=None):
+    """
+    Escribe lotes Arrow a medida que se producen
+     Parámetros
+     ----------
+     lotes: iterable de pyarrow.RecordBatch con el mismo esquema
+     ruta: calle
+     formato: calle, opcional
+         'parquet' o 'arrow' (por defecto segun la extension)
+     Devoluciones
+     -------
+     Devuelve el numero de filas escritas
+    """
+    _importar_pyarrow()
+    formato = _formato(ruta, formato)
+    total = 0
+    escritor = None
+    try:
+        for lote in lotes:
+            if escritor is None:
+                if formato == 'parquet':
+                    import pyarrow.parquet
+                    escritor = pyarrow.parquet.ParquetWriter(ruta, lote.schema)
+                else:
+                    escritor = pa.ipc.new_file(ruta, lote.schema)
+            escritor.write_batch(lote)
+            total += lote.num_rows
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+# Grupos de un registro de placas: cuantas placas pueden quedar restringidas por cada ultimo
+# digito, cuantas estan exentas por la segunda letra (por letra), cuantas tienen solo dos
+# letras y cuantas no son validas
+GruposPlacas = collections.namedtuple('GruposPlacas', 'digitos exentas dos_letras invalidas')
+
+def _bloques_placas(placas, tamaño_bloque):
+    """Genera (codigos, longitudes, nulos) de un registro de placas por bloques"""
+    # Un arreglo Arrow solo puede existir si pyarrow ya fue importado
+    if 'pyarrow' in sys.modules:
+        _importar_pyarrow()
+    if pa is not None and isinstance(placas, (pa.Array, pa.ChunkedArray)):
+        for inicio in range(0, len(placas), tamaño_bloque):
+            yield _codigos_arrow(placas.slice(inicio, tamaño_bloque), 8)
+        return
+    iterador = None if isinstance(placas, np.ndarray) else iter(placas)
+    inicio = 0
+    while True:
+        if iterador is None:
+            bloque = placas[inicio:inicio + tamaño_bloque].astype(str)
+            inicio += tamaño_bloque
+        else:
+            bloque = np.asarray(list(itertools.islice(iterador, tamaño_bloque)), dtype=str)
+        if not len(bloque):
+            return
+        yield _matriz_codigos(bloque, 8) + (np.zeros(len(bloque), dtype=bool),)
+
+def agrupar_placas(placas, tamaño_bloque=1 << 20):
+    """
+    Agrupa un registro de placas por los datos que usan las reglas de Pico y Placa
+     Parámetros
+     ----------
+     placas: iterable de calle, numpy.ndarray o pyarrow.Array
+         placas en formato XX-YYYY o XXX-YYYY
+     tamaño_bloque: int, opcional
+         placas analizadas a la vez (el valor predeterminado es 1048576)
+     Devoluciones
+     -------
+     GruposPlacas con digitos (lista de 10 cantidades), exentas ({letra: cantidad}),
+     dos_letras e invalidas
+    """
+    _importar_numpy()
+    digitos = np.zeros(10, dtype=np.int64)
+    exentas = collections.Counter()
+    dos_letras = invalidas = 0
+    for codigos, longitudes, nulos in _bloques_placas(placas, tamaño_bloque):
+        valida, ultimo, exento = _analizar_placas(codigos, longitudes)
+        valida &= ~nulos
+        invalidas += int((~valida).sum())
+        dos = valida & (longitudes == 7)
+        dos_letras += int(dos.sum())
+        letra = valida & exento & ~dos
+        for codigo, cantidad in zip(*np.unique(codigos[letra, 1], return_counts=True)):
+            exentas[chr(codigo)] += int(cantidad)
+        digitos += np.bincount(ultimo[valida & ~exento], minlength=10)
+        if instrumentacion.activa:
+            instrumentacion.contar('placas_agrupadas', len(valida))
+    return GruposPlacas(digitos.tolist(), dict(exentas), dos_letras, invalidas)
+
+def contar_restringidos(placas, desde, hasta, intervalo=60):
+    """
+    Cuenta cuantos vehiculos de un registro quedan restringidos en cada intervalo de un rango
+     de fechas. Combina los grupos de agrupar_placas con la tabla compilada de restricciones y
+     el calendario de feriados (sin conexion), asi el costo depende de los grupos por los
+     intervalos y no de las placas por los minutos.
+     Parámetros
+     ----------
+     placas: GruposPlacas o un registro de placas como los que acepta agrupar_placas
+     desde: datetime.date
+         primer dia del rango
+     hasta: datetime.date
+         dia siguiente al ultimo del rango (excluido)
+     intervalo: int, opcional
+         minutos de cada intervalo; debe dividir el dia (el valor predeterminado es 60, 1440 da un conteo por dia)
+     Devoluciones
+     -------
+     Lista de tuplas (inicio del intervalo como datetime.datetime, vehiculos con al menos un
+     minuto restringido en el intervalo)
+     aumenta
+     ------
+     ValueError
+         Si intervalo no divide los 1440 minutos del dia
+    """
+    _importar_numpy()
+    if intervalo < 1 or 1440 % intervalo:
+        raise ValueError('El intervalo debe ser un divisor de 1440 minutos')
+    grupos = placas if isinstance(placas, GruposPlacas) else agrupar_placas(placas)
+    cubetas = 1440 // intervalo
+    tabla = np.frombuffer(PicoPlaca.tabla_restricciones(), dtype=bool).reshape(7, 10, cubetas, intervalo)
+    # Vehiculos restringidos por dia de la semana y por intervalo
+    por_dia_semana = np.einsum('dgc,g->dc', tabla.any(axis=3).astype(np.int64),
+                               np.asarray(grupos.digitos, dtype=np.int64)).tolist()
+    libre = [0] * cubetas
+    pasos = [datetime.timedelta(minutes=c * intervalo) for c in range(cubetas)]
+    resultado = []
+    dia = desde
+    while dia < hasta:
+        if _es_feriado_sin_conexion(dia.year, dia.month, dia.day, dia.toordinal() - _ORDINAL_EPOCA):
+            cantidades = libre
+        else:
+            cantidades = por_dia_semana[dia.weekday()]
+        medianoche = datetime.datetime.combine(dia, datetime.time())
+        resultado.extend(zip((medianoche + paso for paso in pasos), cantidades))
+        dia += datetime.timedelta(days=1)
+    return resultado
+
+# Hora local de Quito (UTC-5, sin horario de verano) para los avistamientos con zona horaria
+_ZONA_ECUADOR = datetime.timezone(datetime.timedelta(hours=-5), 'ECT')
+
+# Infraccion detectada en un flujo de avistamientos: placa, momento del primer avistamiento
+# dentro de la ventana restringida e inicio y fin (excluido) de esa ventana
+Infraccion = collections.namedtuple('Infraccion', 'placa momento inicio fin')
+
+class EvaluadorAvistamientos:
     """
-    Una clase para representar un vehiculo.
-    medida de restriccion (Pico y Placa)
-    - ORDENANZA METROPOLITANA No. 0305
-    http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
-    ...
-    Atributos
-    ----------
-    placa : calle
-        El registro o patente de un veh�culo es una combinaci�n de caracteres alfab�ticos o num�ricos
-        caracteres que identifican e individualizan el veh�culo respecto de los dem�s;
-        
-        El formato utilizado es
-        XX-YYYY o XXX-YYYY,
-        donde X es una letra may�scula e Y es un d�gito.
-    fecha: calle
-        Fecha en la que el veh�culo pretende transitar
-        esta siguiendo el
-        Formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
-    tiempo: calle
-        tiempo en que el veh�culo pretende transitar
-        esta siguiendo el formato
-        HH:MM: por ejemplo, 08:35, 19:30
-    en l�nea: booleano, opcional
-        si en l�nea == Verdadero, se utilizar� la API de d�as festivos abstractos
-    M�todos
-    -------
-    __init__(self, plate, date, time, online=False):
-        Construye todos los atributos necesarios.
-        para el objeto PicoPlaca.
-    plato (uno mismo):
-        Obtiene el valor del atributo de placa
-    placa (auto, valor):
-        Establece el valor del atributo de la placa
-    fecha (uno mismo):
-        Obtiene el valor del atributo de fecha
-    fecha (auto, valor):
-        Establece el valor del atributo de fecha
-    tiempo (uno mismo):
-        Obtiene el valor del atributo de tiempo
-    tiempo (uno mismo, valor):
-        Establece el valor del atributo de tiempo
-    __encontar_dia(yo, fecha):
-        Devuelve el d�a a partir de la fecha: por ejemplo, mi�rcoles
-    __is_forbidden_time(self, check_time):
-        Devuelve True si el tiempo proporcionado est� dentro de las horas pico prohibidas, de lo contrario, False
-    __es_vacaciones:
-        Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un d�a festivo en Ecuador, de lo contrario, False
-    predecir (auto):
-        Devuelve True si el veh�culo con la placa especificada puede estar en la carretera en la fecha y hora especificadas, de lo contrario, False
+    Una clase para detectar infracciones de Pico y Placa en un flujo continuo de avistamientos
+     (placa, momento) a medida que llegan, con memoria acotada.
+     Guarda el estado del dia (dia de la semana y si es feriado) y las ventanas restringidas
+     de la tabla compilada, de modo que cada avistamiento solo valida la placa y consulta la
+     tabla. Los avistamientos repetidos de una placa dentro de la misma ventana restringida
+     producen una sola infraccion; las ventanas se descartan cuando terminan (mas el retraso
+     tolerado), asi la memoria solo crece con las placas vistas en las ventanas en curso.
+     ...
+     Atributos
+     ----------
+     enlinea: booleano
+         si enlinea == True, se utilizará la API de días festivos abstractos (una consulta por dia)
+     retraso: datetime.timedelta
+         tiempo que se conserva una ventana despues de su fin para avistamientos que llegan tarde
+     avistamientos: int
+         avistamientos procesados
+     repetidos: int
+         avistamientos descartados por repetir una infraccion ya emitida
+     invalidos: int
+         avistamientos descartados por tener una placa o un momento no validos
+     Metodos
+     -------
+     procesar(self, placa, momento):
+         Procesa un avistamiento y devuelve la Infraccion nueva o None
+     evaluar(self, eventos):
+         Generador de las infracciones de un iterable de avistamientos
+     evaluar_async(self, eventos):
+         Iterador asincrono de las infracciones de un iterable (sincrono o asincrono) de avistamientos
     """
-    #Days of the week
-    __dias = [
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday"]
 
-    # Dictionary that holds the restrictions inf the form {day: forbidden last digit}
-    __restricciones = {
-            "Monday": [1, 2],
-            "Tuesday": [3, 4],
-            "Wednesday": [5, 6],
-            "Thursday": [7, 8],
-            "Friday": [9, 0],
-            "Saturday": [],
-            "Sunday": []}
+    # Dias cuyo estado (fila de la tabla o feriado) se recuerda a la vez
+    _DIAS_EN_MEMORIA = 8
 
-    def __init__(self, placa, fecha, hora, enlinea=False):
+    def __init__(self, enlinea=False, retraso=datetime.timedelta(minutes=5)):
         """
-        Construye todos los atributos necesarios para el objeto PicoPlaca.
-        
-         Par�metros
+        Construye un evaluador sin estado
+         Parámetros
          ----------
-             placa : calle
-                 El registro o patente de un veh�culo es una combinaci�n de caracteres alfab�ticos o num�ricos
-                 caracteres que identifican e individualizan el veh�culo respecto de los dem�s;
-                 El formato utilizado es AA-YYYY o XXX-YYYY, donde X es una letra may�scula e Y es un d�gito.
-             fecha: calle
-                 Fecha en la que el veh�culo pretende transitar
-                 Sigue el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
-             tiempo: calle
-                 tiempo en que el veh�culo pretende transitar
-                 Sigue el formato HH:MM: por ejemplo, 08:35, 19:30
-             en l�nea: booleano, opcional
-                 si en l�nea == Verdadero, se usar� la API de d�as festivos abstractos (el valor predeterminado es Falso)               
-        """                
-        self.placa = placa
-        self.fecha = fecha
-        self.hora = hora
+         enlinea: booleano, opcional
+             si enlinea == True, se utilizará la API de días festivos abstractos (el valor predeterminado es False)
+         retraso: datetime.timedelta, opcional
+             tolerancia para avistamientos fuera de orden (el valor predeterminado es 5 minutos)
+        """
         self.enlinea = enlinea
+        self.retraso = retraso
+        self.avistamientos = 0
+        self.repetidos = 0
+        self.invalidos = 0
+        self._tabla = None
+        self._filas = {}
+        self._dias = collections.OrderedDict()
+        self._ventanas = {}
+        self._vencimiento = None
 
-    @property
-    def placa(self):
-        """Gets (Obtiene) el valor del atributo placa"""
-        return self._placa
-
-    @placa.setter
-    def placa(self, valor):
+    def __ventanas_fila(self, fila):
         """
-        Sets(Establece) eval�a el atributo placa
-         Par�metros
-         ----------
-         valor: cadena
-        
-         aumenta
-         ------
-         ValorError
-             Si la cadena de valor no tiene el formato
-             XX-YYYY o XXX-YYYY,
-             donde X es una letra may�scula e Y es un d�gito
+        Devuelve, para cada minuto del dia, la ventana restringida (inicio, fin) en minutos
+         que lo contiene o None, para una fila (dia de la semana * 10 + ultimo digito)
         """
-        if not re.match('^[A-Z]{2,3}-[0-9]{4}$', valor):
-            raise ValueError(
-                'La placa debe tener el siguiente formato: XX-YYYY o XXX-YYYY, donde X es una letra may�scula e Y es un d�gito')
-        self._placa = valor
+        tabla = PicoPlaca.tabla_restricciones()
+        if tabla is not self._tabla:
+            # Las reglas cambiaron (configurar_reglas): se descarta lo calculado
+            self._tabla = tabla
+            self._filas = {}
+        ventanas = self._filas.get(fila)
+        if ventanas is None:
+            ventanas = [None] * 1440
+            restringido = tabla[fila * 1440:(fila + 1) * 1440]
+            minuto = restringido.find(1)
+            while minuto >= 0:
+                fin = restringido.find(0, minuto)
+                fin = 1440 if fin < 0 else fin
+                ventanas[minuto:fin] = [(minuto, fin)] * (fin - minuto)
+                minuto = restringido.find(1, fin)
+            self._filas[fila] = ventanas
+        return ventanas
 
-    @property
-    def fecha(self):
-        """Gets(Obtiene) el valor del atributo de fecha"""
-        return self._fecha
+    def __es_feriado(self, dia):
+        """Consulta una vez por dia si es feriado (con la API o sin conexion)"""
+        if self.enlinea:
+            return proveedor_en_linea().consultar(dia.isoformat())
+        return _es_feriado_sin_conexion(dia.year, dia.month, dia.day, dia.toordinal() - _ORDINAL_EPOCA)
 
-    @fecha.setter
-    def fecha(self, valor):
+    def __estado_dia(self, dia, feriado=None):
         """
-        Sets(Establece) el valor del atributo de fecha
-         Par�metros
-         ----------
-         valor: cadena
-        
-         aumenta
-         ------
-         ValorError
-             Si la cadena de valor no tiene el formato AAAA-MM-DD (por ejemplo, 2021-04-02)
+        Devuelve el estado del dia: (medianoche, es feriado), recordando los ultimos dias usados
         """
-        try:
-            if len(valor) != 10:
-                raise ValueError
-            datetime.datetime.strptime(valor, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError(
-                'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)') from None
-        self._fecha = valor
-        
+        estado = self._dias.get(dia)
+        if estado is None:
+            if feriado is None:
+                feriado = self.__es_feriado(dia)
+            estado = (datetime.datetime.combine(dia, datetime.time()), feriado)
+            self._dias[dia] = estado
+            if len(self._dias) > self._DIAS_EN_MEMORIA:
+                self._dias.popitem(last=False)
+        return estado
 
-    @property
-    def hora(self):
-        """Gets (Obtiene) el valor del atributo de tiempo"""
-        return self._hora
+    def __purgar(self, momento):
+        """Descarta las ventanas que terminaron antes de momento menos el retraso tolerado"""
+        if self._vencimiento is None or momento < self._vencimiento:
+            return
+        for clave in [c for c, (fin, _) in self._ventanas.items() if fin + self.retraso <= momento]:
+            del self._ventanas[clave]
+        self._vencimiento = min((fin for fin, _ in self._ventanas.values()), default=None)
+        if self._vencimiento is not None:
+            self._vencimiento += self.retraso
 
-    @hora.setter
-    def hora(self, valor):
+    @staticmethod
+    def __momento(momento):
+        """Convierte el momento a datetime.datetime en hora local de Quito"""
+        if isinstance(momento, str):
+            momento = datetime.datetime.fromisoformat(momento)
+        elif not isinstance(momento, datetime.datetime):
+            raise ValueError('El momento debe ser un datetime.datetime o una cadena ISO 8601')
+        if momento.tzinfo is not None:
+            momento = momento.astimezone(_ZONA_ECUADOR).replace(tzinfo=None)
+        return momento
+
+    def procesar(self, placa, momento, feriado=None):
         """
-        Sets(Establece) el valor del atributo de tiempo
-         Par�metros
+        Procesa un avistamiento
+         Parámetros
          ----------
-         valor: cadena
-        
+         placa: calle
+             placa en formato XX-YYYY o XXX-YYYY
+         momento: datetime.datetime o calle
+             momento del avistamiento (ISO 8601); con zona horaria se convierte a la hora de Quito
+         feriado: booleano, opcional
+             si el dia es feriado; por defecto se consulta (una sola vez por dia)
+         Devoluciones
+         -------
+         Devuelve la Infraccion si es la primera vez que la placa se ve en esa ventana
+         restringida, de lo contrario, None
          aumenta
          ------
-         ValorError
-             Si la cadena de valor no tiene el formato HH:MM (por ejemplo, 08:31, 14:22, 00:01)
+         ValueError
+             Si la placa o el momento no son validos (incluida una placa que no es cadena)
         """
-        if not re.match('^([01][0-9]|2[0-3]):([0-5][0-9]|)$', valor):
-            raise ValueError(
-                'La hora debe tener el siguiente formato: HH:MM (por ejemplo, 08:31, 14:22, 00:01)')
-        self._hora = valor
+        self.avistamientos += 1
+        if not isinstance(placa, str):
+            raise ValueError('La placa debe ser una cadena')
+        momento = self.__momento(momento)
+        self.__purgar(momento)
+        exenta, ultimo = _analizar_placa(placa)
+        if exenta:
+            return None
+        if ultimo is None:
+            ultimo = int(placa[-1])
+        dia = momento.date()
+        medianoche, es_feriado = self.__estado_dia(dia, feriado)
+        if es_feriado:
+            return None
+        ventana = self.__ventanas_fila(dia.weekday() * 10 + ultimo)[momento.hour * 60 + momento.minute]
+        if ventana is None:
+            return None
+        clave = (dia, ventana[0])
+        activa = self._ventanas.get(clave)
+        if activa is None:
+            fin = medianoche + datetime.timedelta(minutes=ventana[1])
+            activa = self._ventanas[clave] = (fin, set())
+            if self._vencimiento is None or fin + self.retraso < self._vencimiento:
+                self._vencimiento = fin + self.retraso
+        if placa in activa[1]:
+            self.repetidos += 1
+            return None
+        activa[1].add(placa)
+        return Infraccion(placa, momento, medianoche + datetime.timedelta(minutes=ventana[0]), activa[0])
 
-    def __encontrar_dia(self, fecha):
+    def __procesar_valido(self, placa, momento, feriado=None):
+        """Igual que procesar, pero cuenta y descarta los avistamientos no validos"""
+        if not isinstance(placa, str) or not _PATRON_PLACA.match(placa):
+            # Placa no valida: se descarta sin pasar por la excepcion de procesar
+            self.avistamientos += 1
+            self.invalidos += 1
+            return None
+        try:
+            return self.procesar(placa, momento, feriado)
+        except ValueError:
+            self.invalidos += 1
+            return None
+
+    def evaluar(self, eventos):
         """
-        Encuentra el d�a a partir de la fecha: por ejemplo, mi�rcoles
-         Par�metros
+        Evalua un flujo de avistamientos
+         Parámetros
          ----------
-         fecha: calle
-             Est� siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
+         eventos: iterable de tuplas (placa, momento)
          Devoluciones
          -------
-         Devuelve el d�a a partir de la fecha como una cadena
-        """        
-        d = datetime.datetime.strptime(fecha, '%Y-%m-%d').weekday()
-        return self.__dias[d]
+         Generador de Infraccion en el orden en que se detectan; los avistamientos
+         no validos se cuentan en invalidos y se omiten
+        """
+        for placa, momento in eventos:
+            infraccion = self.__procesar_valido(placa, momento)
+            if infraccion is not None:
+                yield infraccion
 
-    def __es_tiempo_prohibido(self, check_fecha):
+    async def evaluar_async(self, eventos):
         """
-        Comprueba si el tiempo proporcionado est� dentro de las horas pico prohibidas,
-         donde las horas pico son: 07:00 - 09:30 y 16:00 - 19:30
-         Par�metros
+        Evalua un flujo asincrono de avistamientos; con enlinea == True el feriado de cada
+         dia nuevo se consulta sin bloquear el bucle de eventos
+         Parámetros
          ----------
-         check_time : str
-             Tiempo que se comprobar�. Est� en formato HH:MM: por ejemplo, 08:35, 19:15
+         eventos: iterable o iterable asincrono de tuplas (placa, momento)
          Devoluciones
          -------
-         Devuelve True si el tiempo proporcionado est� dentro de las horas pico prohibidas, de lo contrario, False
-        """           
-        t = datetime.datetime.strptime(check_fecha, '%H:%M').time()
-        return ((t >= datetime.time(7, 0) and t <= datetime.time(9, 30)) or
-                (t >= datetime.time(16, 0) and t <= datetime.time(19, 30)))
+         Iterador asincrono de Infraccion
+        """
+        async def recorrer():
+            if hasattr(eventos, '__aiter__'):
+                async for evento in eventos:
+                    yield evento
+            else:
+                for evento in eventos:
+                    yield evento
 
-    def __es_vacaciones(self, fecha, enlinea):
+        async for placa, momento in recorrer():
+            feriado = None
+            if self.enlinea:
+                # El momento se convierte una sola vez; procesar recibe el datetime ya convertido
+                try:
+                    momento = self.__momento(momento)
+                except ValueError:
+                    pass
+                else:
+                    dia = momento.date()
+                    if dia not in self._dias:
+                        feriado = await proveedor_en_linea().es_feriado(dia.isoformat())
+                        # Se recuerda aunque procesar descarte la placa (exenta) antes de usarlo
+                        self.__estado_dia(dia, feriado)
+            infraccion = self.__procesar_valido(placa, momento, feriado)
+            if infraccion is not None:
+                yield infraccion
+
+# Rango de años del indice de feriados que se construye por defecto
+_AÑO_INDICE_INICIO = 1990
+_AÑO_INDICE_FIN = 2100
+
+# Bytes aproximados de cada tarea de evaluar_paralelo y de lote -p
+_TAMAÑO_FRAGMENTO = 8 << 20
+
+def _fragmentos(ruta, formato, tamaño_fragmento):
+    """
+    Divide un archivo en rangos de bytes alineados a lineas completas sin leerlo entero:
+     solo se lee desde cada punto de corte hasta el siguiente salto de linea
+     Parámetros
+     ----------
+     ruta: calle
+     formato: calle
+         'csv' (la primera linea es el encabezado) o 'jsonl'
+     tamaño_fragmento: int
+         tamaño aproximado en bytes de cada rango
+     Devoluciones
+     -------
+     Tupla (encabezado, lista de (inicio, fin))
+    """
+    with open(ruta, 'rb') as archivo:
+        tamaño = os.fstat(archivo.fileno()).st_size
+        if tamaño == 0:
+            return '', []
+        inicio = 0
+        encabezado = ''
+        if formato == 'csv':
+            encabezado = archivo.readline().decode('utf-8')
+            inicio = archivo.tell()
+        rangos = []
+        while inicio < tamaño:
+            fin = tamaño
+            if inicio + tamaño_fragmento < tamaño:
+                archivo.seek(inicio + tamaño_fragmento)
+                archivo.readline()
+                fin = archivo.tell()
+            rangos.append((inicio, fin))
+            inicio = fin
+    return encabezado, rangos
+
+def _campos_archivo(ruta, formato):
+    """Columnas CSV de los veredictos de un archivo, tomadas de su primer registro como en la ruta secuencial"""
+    with _abrir(ruta, 'r') as entrada:
+        registro = next(leer_registros(entrada, formato), None)
+    return _campos_veredicto(registro) if registro is not None else None
+
+def _iniciar_trabajador(ruta_indice):
+    """Carga una sola vez las tablas de feriados en cada proceso trabajador"""
+    if ruta_indice:
+        activar_indice(ruta_indice)
+    elif indice_feriados is None:
+        activar_indice(IndiceFeriados.construir(_AÑO_INDICE_INICIO, _AÑO_INDICE_FIN))
+
+def _procesar_fragmento(tarea):
+    """
+    Evalua un rango de bytes del archivo dentro de un proceso trabajador
+     Devoluciones
+     -------
+     Si formato_salida es None, una tupla (lineas, ids, resultados, errores) donde ids son los
+     numeros de linea dentro del rango y lineas es el total de lineas del rango; si no, una
+     tupla (registros, texto de los veredictos ya escritos en ese formato)
+    """
+    ruta, formato, encabezado, inicio, fin, formato_salida, con_encabezado, campos, tamaño_bloque, enlinea = tarea
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        lineas = archivo.read(fin - inicio).decode('utf-8').split('\n')
+    if lineas[-1] == '':
+        lineas.pop()
+    total = len(lineas)
+    ids = [k for k, linea in enumerate(lineas) if linea.strip()]
+    lineas = [linea for linea in lineas if linea.strip()]
+    if formato == 'csv':
+        registros = csv.DictReader(lineas, fieldnames=next(csv.reader([encabezado])))
+    else:
+        registros = _decodificar_jsonl(lineas)
+    veredictos = evaluar_flujo(registros, tamaño_bloque, enlinea)
+    if formato_salida is None:
+        _, resultados, errores = zip(*veredictos) if ids else ((), (), ())
+        return total, ids, list(resultados), list(errores)
+    salida = io.StringIO()
+    escritos = escribir_veredictos(veredictos, salida, formato_salida, con_encabezado, campos)
+    return escritos, salida.getvalue()
+
+def _ejecutar_fragmentos(ruta, formato, procesos, ordenado, formato_salida,
+                         tamaño_fragmento, tamaño_bloque, enlinea):
+    """
+    Reparte los fragmentos del archivo en un ProcessPoolExecutor con un numero acotado en vuelo
+     Devoluciones
+     -------
+     Generador de tuplas (numero de fragmento, resultado de _procesar_fragmento)
+    """
+    import concurrent.futures
+    if enlinea and procesos != 1:
+        # Cada trabajador tendria su propio limitador de tasa y su propia cuota, y todos
+        # escribirian el mismo archivo VACACIONES_CACHE
+        raise ValueError('enlinea requiere un solo proceso (procesos=1)')
+    procesos = procesos or os.cpu_count() or 1
+    encabezado, rangos = _fragmentos(ruta, formato, tamaño_fragmento)
+    # Todos los fragmentos escriben las mismas columnas, las que usaria la ruta secuencial
+    campos = _campos_archivo(ruta, formato) if formato_salida == 'csv' and rangos else None
+    tareas = [(ruta, formato, encabezado, inicio, fin, formato_salida, i == 0, campos, tamaño_bloque, enlinea)
+              for i, (inicio, fin) in enumerate(rangos)]
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=procesos, initializer=_iniciar_trabajador,
+            initargs=(os.environ.get('VACACIONES_INDICE'),)) as ejecutor:
+        en_vuelo = collections.deque()
+        numeros = {}
+        for i, tarea in enumerate(tareas):
+            futuro = ejecutor.submit(_procesar_fragmento, tarea)
+            numeros[futuro] = i
+            en_vuelo.append(futuro)
+            while len(en_vuelo) >= 2 * procesos:
+                if ordenado:
+                    futuro = en_vuelo.popleft()
+                    yield numeros.pop(futuro), futuro.result()
+                else:
+                    listos, _ = concurrent.futures.wait(en_vuelo, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for futuro in listos:
+                        en_vuelo.remove(futuro)
+                        yield numeros.pop(futuro), futuro.result()
+        if ordenado:
+            while en_vuelo:
+                futuro = en_vuelo.popleft()
+                yield numeros.pop(futuro), futuro.result()
+        else:
+            for futuro in concurrent.futures.as_completed(en_vuelo):
+                yield numeros.pop(futuro), futuro.result()
+
+def evaluar_paralelo(ruta, formato=None, procesos=None, ordenado=True,
+                     tamaño_fragmento=_TAMAÑO_FRAGMENTO, tamaño_bloque=65536, enlinea=False):
+    """
+    Evalua un archivo CSV o JSONL grande repartiendolo por rangos de bytes entre varios procesos
+     Cada registro debe ocupar una sola linea.
+     Parámetros
+     ----------
+     ruta: calle
+         archivo de entrada
+     formato: calle, opcional
+         'csv' o 'jsonl' (por defecto segun la extension)
+     procesos: int, opcional
+         numero de procesos trabajadores (por defecto el numero de nucleos)
+     ordenado: booleano, opcional
+         si es True los veredictos salen en el orden de entrada; si no, los trabajadores
+         no esperan al fragmento mas lento, pero cada fragmento se entrega cuando ya se
+         conoce su primer numero de fila (cuando terminaron los anteriores)
+     tamaño_fragmento: int, opcional
+         bytes aproximados por tarea (el valor predeterminado es 8 MiB)
+     tamaño_bloque: int, opcional
+         registros evaluados a la vez dentro de cada tarea
+     enlinea: booleano, opcional
+         si enlinea == True, se utilizará la API de días festivos abstractos; solo con procesos=1
+     Devoluciones
+     -------
+     Generador de tuplas (id_fila, resultado, error); id_fila es el numero de linea de
+     datos (desde 0, sin contar el encabezado CSV)
+     aumenta
+     ------
+     ValueError
+         Si enlinea == True y procesos != 1 (al pedir el primer veredicto)
+    """
+    # Cada trabajador cuenta las lineas de su fragmento; el numero global de fila se
+    # corrige al unir los resultados
+    fila = 0
+    siguiente = 0
+    listos = {}
+    for numero, resultado in _ejecutar_fragmentos(
+            ruta, _formato(ruta, formato), procesos, ordenado, None,
+            tamaño_fragmento, tamaño_bloque, enlinea):
+        listos[numero] = resultado
+        while siguiente in listos:
+            lineas, ids, resultados, errores = listos.pop(siguiente)
+            yield from zip((fila + k for k in ids), resultados, errores)
+            fila += lineas
+            siguiente += 1
+
+class ServicioPicoPlaca:
+    """
+    Una clase para representar un servicio HTTP/JSON de larga duracion sobre asyncio.
+     Mantiene en memoria los feriados ya calculados (cache_feriados e indice_feriados),
+     admite conexiones persistentes (keep-alive) y lleva contadores y latencias por ruta.
+     ...
+     Rutas
+     -----
+     GET /predecir?placa=PBX-1234&fecha=2022-05-23&hora=08:00[&enlinea=1]
+         {"placa": ..., "fecha": ..., "hora": ..., "puede_circular": bool}
+     POST /predecir/lote  {"placas": [...], "fechas": [...], "horas": [...], "enlinea": false}
+         {"puede_circular": [bool, ...]}
+     GET /metricas
+         contadores de solicitudes y errores, latencias p50 y p99 en milisegundos
+     GET /metricas/instrumentacion
+         instantanea JSON de la instrumentacion del proceso (ver Instrumentacion)
+     GET /metricas/prometheus
+         lo mismo, mas los contadores por ruta, en el formato de texto de Prometheus
+     Metodos
+     -------
+     iniciar(self):
+         Corrutina que abre el puerto
+     servir(self):
+         Corrutina que atiende solicitudes hasta que se cancela
+     cerrar(self):
+         Corrutina que cierra el puerto
+     metricas(self):
+         Devuelve un diccionario con los contadores y las latencias
+     prometheus(self):
+         Devuelve la instrumentacion y los contadores en el formato de texto de Prometheus
+    """
+    _RUTAS = ('/predecir', '/predecir/lote', '/metricas', '/metricas/instrumentacion', '/metricas/prometheus')
+    _MUESTRAS = 10000
+    _TAMAÑO_MAXIMO = 64 << 20
+    _ESTADOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                408: 'Request Timeout', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+    def __init__(self, host='127.0.0.1', puerto=8080, años=None, tiempo_espera=30.0):
         """
-        Comprueba si la fecha (en formato ISO 8601 AAAA-MM-DD) es un d�a festivo en Ecuador
-         si en l�nea == Verdadero, utilizar� una API REST, de lo contrario, generar� los d�as festivos del a�o examinado
-        
-         Par�metros
+        Construye el servicio
+         Parámetros
          ----------
-         fecha: calle
-             Est� siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
-         en l�nea: booleano, opcional
-             si en l�nea == Verdadero, se utilizar� la API de d�as festivos abstractos
+         host: calle, opcional
+         puerto: int, opcional
+         años: iterable de int, opcional
+             años cuyos feriados se calculan al iniciar
+         tiempo_espera: float, opcional
+             segundos maximos para recibir la siguiente solicitud de una conexion abierta, y
+             luego sus cabeceras y su cuerpo; al agotarse se responde 408 (o se cierra la
+             conexion inactiva) (el valor predeterminado es 30)
+        """
+        self.host = host
+        self.puerto = puerto
+        self.tiempo_espera = tiempo_espera
+        self.años = list(años) if años is not None else []
+        self._servidor = None
+        self._solicitudes = collections.Counter()
+        self._errores = collections.Counter()
+        self._latencias = collections.defaultdict(lambda: collections.deque(maxlen=self._MUESTRAS))
+
+    async def iniciar(self):
+        """Precalienta los feriados y abre el puerto"""
+        import asyncio
+        precalentar(self.años)
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def servir(self):
+        """Atiende solicitudes hasta que la tarea se cancela"""
+        if self._servidor is None:
+            await self.iniciar()
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def cerrar(self):
+        """Cierra el puerto"""
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+
+    def metricas(self):
+        """
+        Devuelve los contadores y latencias por ruta
          Devoluciones
          -------
-         Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un d�a festivo en Ecuador, de lo contrario, False
-        """            
-        y, m, d = fecha.split('-')
+         Diccionario {ruta: {'solicitudes', 'errores', 'p50_ms', 'p99_ms'}}
+        """
+        resultado = {}
+        for ruta, cantidad in self._solicitudes.items():
+            muestras = sorted(self._latencias[ruta])
+            resultado[ruta] = {
+                'solicitudes': cantidad,
+                'errores': self._errores[ruta],
+                'p50_ms': muestras[len(muestras) // 2] * 1000 if muestras else None,
+                'p99_ms': muestras[min(len(muestras) - 1, len(muestras) * 99 // 100)] * 1000 if muestras else None}
+        return resultado
 
-        if enlinea:
-            # API de vacaciones abstractapi, versi�n gratuita: 1000 solicitudes por mes
-             # 1 solicitud por segundo
-             # recuperar la clave API de la variable de entorno
-            key = os.environ.get('VACACIONES_API_KEY')
-            response = requests.get(
-                "https://holidays.abstractapi.com/v1/?api_key={}&country=EC&year={}&month={}&day={}".format(key, y, m, d))
-            if (response.status_code == 401):
-                # Esto significa que falta una clave API
-                raise requests.HTTPError(
-                    'Falta la clave API. Guarde su clave en la variable de entorno HOLIDAYS API_KEY')
-            if response.content == b'[]':  # si no hay vacaciones obtenemos una matriz vac�a
-                return False
-            # Arreglar el Jueves Santo incorrectamente denotado como feriado
-            if json.loads(response.text[1:-1])['nombre'] == 'Maundy Thursday':
-                return False
-            return True
-        else:
-            ecu_holidays = HolidayEcuador(prov='EC-P')
-            return fecha in ecu_holidays
+    def prometheus(self):
+        """Devuelve la instrumentacion del proceso y los contadores por ruta en el formato de Prometheus"""
+        lineas = [instrumentacion.prometheus().rstrip('\n'),
+                  '# TYPE picoplaca_solicitudes_total counter']
+        lineas += ['picoplaca_solicitudes_total{{ruta="{}"}} {}'.format(ruta, cantidad)
+                   for ruta, cantidad in sorted(self._solicitudes.items())]
+        lineas.append('# TYPE picoplaca_errores_total counter')
+        lineas += ['picoplaca_errores_total{{ruta="{}"}} {}'.format(ruta, cantidad)
+                   for ruta, cantidad in sorted(self._errores.items())]
+        return '\n'.join(lineas) + '\n'
+
+    async def _atender(self, lector, escritor):
+        """Atiende todas las solicitudes de una conexion (keep-alive de HTTP/1.1)"""
+        import asyncio
+        try:
+            while True:
+                try:
+                    linea = await asyncio.wait_for(lector.readline(), self.tiempo_espera)
+                except asyncio.TimeoutError:
+                    break  # conexion inactiva
+                if not linea.strip():
+                    break
+                inicio = time.perf_counter()
+                metodo, objetivo, version = linea.decode('latin-1').split(' ', 2)
+                ruta = None
+                try:
+                    cabeceras, cuerpo = await asyncio.wait_for(self._leer_solicitud(lector), self.tiempo_espera)
+                except asyncio.TimeoutError:
+                    cabeceras = {}
+                    estado, respuesta = 408, {'error': 'Se agoto el tiempo de espera de la solicitud'}
+                else:
+                    if cuerpo is None:
+                        estado, respuesta = 413, {'error': 'Solicitud demasiado grande'}
+                    else:
+                        ruta, _, consulta = objetivo.partition('?')
+                        estado, respuesta = await self._despachar(metodo, ruta, consulta, cuerpo)
+                mantener = (cabeceras.get('connection', '').lower() != 'close'
+                            and (version.strip() == 'HTTP/1.1' or cabeceras.get('connection', '').lower() == 'keep-alive')
+                            and estado not in (408, 413))
+                if isinstance(respuesta, str):
+                    datos, tipo = respuesta.encode('utf-8'), 'text/plain; version=0.0.4'
+                else:
+                    datos, tipo = json.dumps(respuesta, ensure_ascii=False).encode('utf-8'), 'application/json'
+                escritor.write('HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n'
+                               'Connection: {}\r\n\r\n'.format(estado, self._ESTADOS[estado], tipo, len(datos),
+                                                               'keep-alive' if mantener else 'close').encode('latin-1')
+                               + datos)
+                await asyncio.wait_for(escritor.drain(), self.tiempo_espera)
+                if ruta is not None:
+                    ruta = ruta if ruta in self._RUTAS else 'otras'
+                    self._solicitudes[ruta] += 1
+                    self._errores[ruta] += estado != 200
+                    self._latencias[ruta].append(time.perf_counter() - inicio)
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            pass
+        finally:
+            escritor.close()
 
-    def predecir(self):
+    async def _leer_solicitud(self, lector):
         """
-        Comprueba si el veh�culo con la placa especificada puede estar en la carretera en la fecha y hora proporcionada seg�n las reglas de Pico y Placa:
-         http://www7.quito.gob.ec/mdmq_ordenanzas/Ordenanzas/ORDENANZAS%20A%C3%91OS%20ANTERIORES/ORDM-305-%20%20CIRCULACION%20VEHICULAR%20PICO%20Y%20PLACA.pdf
+        Lee las cabeceras y el cuerpo de una solicitud
          Devoluciones
          -------
-         Devoluciones
-         Verdadero si el veh�culo con
-         la placa especificada puede estar en el camino
-         en la fecha y hora especificadas, de lo contrario Falso
+         Tupla (cabeceras en minusculas, cuerpo); el cuerpo es None si supera _TAMAÑO_MAXIMO
         """
-        # Comprobar si la fecha es un d�a festivo
-        if self.__es_vacaciones(self.fecha, self.enlinea):
-            return True
+        cabeceras = {}
+        while True:
+            cabecera = await lector.readline()
+            if cabecera in (b'\r\n', b'\n', b''):
+                break
+            nombre, _, valor = cabecera.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        longitud = int(cabeceras.get('content-length', 0))
+        if longitud > self._TAMAÑO_MAXIMO:
+            return cabeceras, None
+        return cabeceras, await lector.readexactly(longitud) if longitud else b''
 
-        # Consultar veh�culos excluidos de la restricci�n seg�n la segunda letra de la placa o si se utilizan s�lo dos letras
-         #https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
-        if self.placa[1] in 'AUZEXM' or len(self.placa.split('-')[0]) == 2:
-            return True
+    @staticmethod
+    def _predecir_lote(cuerpo):
+        """Decodifica el cuerpo de /predecir/lote y evalua el lote (se ejecuta fuera del bucle de eventos)"""
+        datos = json.loads(cuerpo or b'{}')
+        return PicoPlaca.predecir_lote(datos.get('placas', []), datos.get('fechas', []),
+                                       datos.get('horas', []), bool(datos.get('enlinea'))).tolist()
 
-       # Compruebe si el tiempo proporcionado no est� en las horas pico prohibidas
-        if not self.__es_tiempo_prohibido(self.hora):
-            return True
+    async def _despachar(self, metodo, ruta, consulta, cuerpo):
+        """
+        Resuelve una solicitud sin bloquear el bucle de eventos: los feriados en linea se
+         consultan con la corrutina es_feriado y los lotes se evaluan en un hilo aparte
+         Devoluciones
+         -------
+         Tupla (estado HTTP, objeto JSON de respuesta o texto plano)
+        """
+        import asyncio
+        import urllib.parse
+        try:
+            if ruta == '/predecir':
+                if metodo != 'GET':
+                    return 405, {'error': 'Use GET'}
+                parametros = dict(urllib.parse.parse_qsl(consulta))
+                placa, fecha, hora = (parametros.get('placa', ''), parametros.get('fecha', ''),
+                                      parametros.get('hora', ''))
+                enlinea = parametros.get('enlinea', '').lower() in ('1', 'true', 'si')
+                pyp = PicoPlaca(placa, fecha, hora)
+                feriado = await proveedor_en_linea().es_feriado(pyp.fecha) if enlinea else None
+                return 200, {'placa': placa, 'fecha': fecha, 'hora': hora,
+                             'puede_circular': pyp.predecir(feriado)}
+            if ruta == '/predecir/lote':
+                if metodo != 'POST':
+                    return 405, {'error': 'Use POST'}
+                resultado = await asyncio.get_running_loop().run_in_executor(None, self._predecir_lote, cuerpo)
+                return 200, {'puede_circular': resultado}
+            if ruta == '/metricas':
+                return 200, self.metricas()
+            if ruta == '/metricas/instrumentacion':
+                return 200, instrumentacion.instantanea()
+            if ruta == '/metricas/prometheus':
+                return 200, self.prometheus()
+            return 404, {'error': 'Ruta desconocida: {}'.format(ruta)}
+        except (ValueError, AttributeError) as error:
+            return 400, {'error': str(error)}
+        except OSError as error:
+            return 500, {'error': str(error)}
 
-        dia = self.__encontrar_dia(self.fecha) # Encuentra el d�a de la semana a partir de la fecha
-         # Verifique si el �ltimo d�gito de la placa no est� restringido en este d�a en particular
-        if int(self.placa[-1]) not in self.__restricciones[dia]:
-            return True
+def _formato(ruta, formato):
+    """Devuelve el formato indicado o lo deduce de la extension del archivo"""
+    if formato:
+        return formato
+    if ruta.endswith('.parquet'):
+        return 'parquet'
+    if ruta.endswith(('.arrow', '.feather', '.ipc')):
+        return 'arrow'
+    return 'jsonl' if ruta.endswith(('.jsonl', '.ndjson')) else 'csv'
 
-        return False
+def _abrir(ruta, modo):
+    """Abre un archivo de texto; '-' representa la entrada o salida estandar"""
+    if ruta == '-':
+        return contextlib.nullcontext(sys.stdin if 'r' in modo else sys.stdout)
+    return open(ruta, modo, encoding='utf-8', newline='')
 
-if __name__ == '__main__':
-    enlinea=False
+def _consultar(args):
+    """Consulta una sola placa; pide por input() los datos que no se dieron como argumentos"""
     #Ingreso de datos lo que es la placa, fecha y hora... respectando los devidos formatos
-    placa=input("Ingrese la placa por favor, la placa del vehiculo: XXX-YYYY o XX-YYYY, donde X es una letra may�scula e Y es un d�gito: ")
-    fecha=input("Ingrese la fecha por favor, la fecha a comprobar: AAAA-MM-DD: ")
-    hora=input("Ingrese la hora por favor,la hora a comprobar: HH:MM:  ")
+    placa = args.placa or input("Ingrese la placa por favor, la placa del vehiculo: XXX-YYYY o XX-YYYY, donde X es una letra may�scula e Y es un d�gito: ")
+    fecha = args.fecha or input("Ingrese la fecha por favor, la fecha a comprobar: AAAA-MM-DD: ")
+    hora = args.hora or input("Ingrese la hora por favor,la hora a comprobar: HH:MM:  ")
 
-    pyp = PicoPlaca(placa, fecha, hora, enlinea)
+    pyp = PicoPlaca(placa, fecha, hora, args.enlinea)
   #En esta parte se muestra el vehiculo y su placa respectiva la cual puede o no 
   #estar en carretera con fecha y de que hora a que hora 
     if pyp.predecir():
@@ -449,4 +3096,180 @@ if __name__ == '__main__':
             'El vehículo con la placa {} NOPUEDE estra en la carrtera el {} a las {}.'.format(
                 placa,
                 fecha,
-                hora))
\ No newline at end of file
+                hora))
+
+def _lote(args):
+    """Evalua un archivo (o la entrada estandar) de registros y escribe los veredictos en flujo"""
+    inicio = time.perf_counter()
+    formato = _formato(args.entrada, args.formato)
+    formato_salida = _formato(args.salida, args.formato_salida or args.formato)
+    if formato in ('parquet', 'arrow'):
+        # Ruta columnar: lotes Arrow de entrada y salida, sin pasar por cadenas de Python
+        if args.entrada == '-' or formato_salida not in ('parquet', 'arrow') or args.procesos != 1:
+            raise SystemExit('La entrada {} requiere un archivo de entrada, una salida parquet o arrow '
+                             'y un solo proceso'.format(formato))
+        total = escribir_arrow(evaluar_arrow(leer_arrow(args.entrada, args.tamaño_bloque), enlinea=args.enlinea),
+                               args.salida, formato_salida)
+    elif args.procesos != 1:
+        if args.entrada == '-':
+            raise SystemExit('--procesos requiere un archivo de entrada')
+        if args.enlinea:
+            raise SystemExit('--enlinea requiere un solo proceso: la cuota y el limite de la API son por proceso')
+        total = 0
+        with _abrir(args.salida, 'w') as salida:
+            for _, (escritos, texto) in _ejecutar_fragmentos(args.entrada, formato, args.procesos, True,
+                                                             formato_salida, _TAMAÑO_FRAGMENTO, args.tamaño_bloque,
+                                                             args.enlinea):
+                salida.write(texto)
+                total += escritos
+    else:
+        with _abrir(args.entrada, 'r') as entrada, _abrir(args.salida, 'w') as salida:
+            registros = leer_registros(entrada, formato)
+            total = escribir_veredictos(
+                evaluar_flujo(registros, args.tamaño_bloque, args.enlinea), salida, formato_salida)
+    segundos = time.perf_counter() - inicio
+    print('{} registros en {:.2f} s ({:.0f} filas/s)'.format(
+        total, segundos, total / segundos if segundos else 0), file=sys.stderr)
+
+def _vigilar(args):
+    """Detecta infracciones en un flujo de avistamientos y las escribe (JSONL) a medida que llegan"""
+    evaluador = EvaluadorAvistamientos(args.enlinea, datetime.timedelta(minutes=args.retraso))
+    with _abrir(args.entrada, 'r') as entrada, _abrir(args.salida, 'w') as salida:
+        eventos = ((r.get('placa', ''), r.get('momento', '')) for r in leer_registros(entrada, _formato(args.entrada, args.formato)))
+        for infraccion in evaluador.evaluar(eventos):
+            salida.write(json.dumps({'placa': infraccion.placa, 'momento': infraccion.momento.isoformat(),
+                                     'inicio': infraccion.inicio.isoformat(), 'fin': infraccion.fin.isoformat()},
+                                    ensure_ascii=False) + '\n')
+            salida.flush()
+    print('{} avistamientos, {} repetidos, {} no validos'.format(
+        evaluador.avistamientos, evaluador.repetidos, evaluador.invalidos), file=sys.stderr)
+
+def _flota(args):
+    """Cuenta los vehiculos restringidos de un registro de placas por intervalo y escribe un CSV inicio,restringidos"""
+    formato = _formato(args.entrada, args.formato)
+    if formato in ('parquet', 'arrow'):
+        if args.entrada == '-':
+            raise SystemExit('La entrada {} requiere un archivo de entrada'.format(formato))
+        _importar_pyarrow()
+        placas = pa.chunked_array([lote.column(0) for lote in leer_arrow(args.entrada, columnas=['placa'])],
+                                  type=pa.string())
+        grupos = agrupar_placas(placas)
+    else:
+        with _abrir(args.entrada, 'r') as entrada:
+            grupos = agrupar_placas(r.get('placa') or '' for r in leer_registros(entrada, formato))
+    desde = datetime.date.fromisoformat(args.desde)
+    hasta = datetime.date.fromisoformat(args.hasta) + datetime.timedelta(days=1)
+    with _abrir(args.salida, 'w') as salida:
+        escritor = csv.writer(salida, lineterminator='\n')
+        escritor.writerow(('inicio', 'restringidos'))
+        escritor.writerows((inicio.isoformat(timespec='minutes'), cantidad)
+                           for inicio, cantidad in contar_restringidos(grupos, desde, hasta, args.intervalo))
+    print('{} placas con restriccion, {} exentas por letra, {} de dos letras, {} no validas'.format(
+        sum(grupos.digitos), sum(grupos.exentas.values()), grupos.dos_letras, grupos.invalidas), file=sys.stderr)
+
+def _servir(args):
+    """Inicia el servicio HTTP hasta que se interrumpe"""
+    import asyncio
+    servicio = ServicioPicoPlaca(args.host, args.puerto, range(args.desde, args.hasta + 1), args.tiempo_espera)
+    print('Sirviendo en http://{}:{}'.format(args.host, args.puerto), file=sys.stderr)
+    try:
+        asyncio.run(servicio.servir())
+    except KeyboardInterrupt:
+        pass
+
+def _indice(args):
+    """Construye y guarda un indice de feriados"""
+    IndiceFeriados.construir(args.desde, args.hasta, args.provincias).guardar(args.salida)
+
+def main(argv=None):
+    """
+    Punto de entrada de la linea de comandos
+     Parámetros
+     ----------
+     argv: lista de calle, opcional
+         argumentos (por defecto sys.argv[1:]); sin subcomando se consulta una placa de forma interactiva
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='Pico y Placa - Quito (ORDENANZA METROPOLITANA No. 0305)')
+    parser.add_argument('--metricas', choices=('json', 'prometheus'),
+                        help='activa la instrumentacion y escribe las mediciones en la salida de errores al terminar')
+    parser.add_argument('--perfil', action='store_true',
+                        help='perfila el comando con cProfile y escribe el resumen en la salida de errores')
+    subparsers = parser.add_subparsers(dest='comando')
+
+    consultar = subparsers.add_parser('consultar', help='consulta una sola placa')
+    consultar.add_argument('--placa', help='placa en formato XX-YYYY o XXX-YYYY')
+    consultar.add_argument('--fecha', help='fecha en formato AAAA-MM-DD')
+    consultar.add_argument('--hora', help='hora en formato HH:MM')
+    consultar.add_argument('--enlinea', action='store_true', help='usa la API de dias festivos abstractos')
+    consultar.set_defaults(funcion=_consultar)
+
+    lote = subparsers.add_parser('lote', help='evalua registros CSV o JSONL en flujo')
+    lote.add_argument('entrada', nargs='?', default='-', help="archivo de entrada ('-' para la entrada estandar)")
+    lote.add_argument('-o', '--salida', default='-', help="archivo de salida ('-' para la salida estandar)")
+    lote.add_argument('-f', '--formato', choices=('csv', 'jsonl', 'parquet', 'arrow'),
+                      help='formato de entrada (por defecto segun la extension)')
+    lote.add_argument('--formato-salida', choices=('csv', 'jsonl', 'parquet', 'arrow'),
+                      help='formato de salida (por defecto el de entrada)')
+    lote.add_argument('-b', '--tamaño-bloque', type=int, default=65536, help='registros evaluados a la vez')
+    lote.add_argument('--enlinea', action='store_true', help='usa la API de dias festivos abstractos')
+    lote.add_argument('-p', '--procesos', type=int, default=1,
+                      help='procesos en paralelo (0 = todos los nucleos; requiere un archivo de entrada y no admite --enlinea)')
+    lote.set_defaults(funcion=_lote)
+
+    vigilar = subparsers.add_parser('vigilar', help='detecta infracciones en un flujo de avistamientos (placa, momento)')
+    vigilar.add_argument('entrada', nargs='?', default='-', help="archivo de entrada ('-' para la entrada estandar)")
+    vigilar.add_argument('-o', '--salida', default='-', help="archivo JSONL de infracciones ('-' para la salida estandar)")
+    vigilar.add_argument('-f', '--formato', choices=('csv', 'jsonl'), help='formato de entrada (por defecto segun la extension)')
+    vigilar.add_argument('--retraso', type=float, default=5, help='minutos tolerados para avistamientos fuera de orden')
+    vigilar.add_argument('--enlinea', action='store_true', help='usa la API de dias festivos abstractos')
+    vigilar.set_defaults(funcion=_vigilar)
+
+    flota = subparsers.add_parser('flota', help='cuenta los vehiculos restringidos de un registro de placas por intervalo')
+    flota.add_argument('entrada', nargs='?', default='-', help="registro con una columna placa ('-' para la entrada estandar)")
+    flota.add_argument('-o', '--salida', default='-', help="archivo CSV inicio,restringidos ('-' para la salida estandar)")
+    flota.add_argument('-f', '--formato', choices=('csv', 'jsonl', 'parquet', 'arrow'),
+                       help='formato de entrada (por defecto segun la extension)')
+    flota.add_argument('--desde', required=True, help='primer dia, AAAA-MM-DD')
+    flota.add_argument('--hasta', required=True, help='ultimo dia (incluido), AAAA-MM-DD')
+    flota.add_argument('--intervalo', type=int, default=60, help='minutos de cada intervalo (divisor de 1440)')
+    flota.set_defaults(funcion=_flota)
+
+    servir = subparsers.add_parser('servir', help='inicia el servicio HTTP/JSON')
+    servir.add_argument('--host', default='127.0.0.1')
+    servir.add_argument('--puerto', type=int, default=8080)
+    servir.add_argument('--desde', type=int, default=datetime.date.today().year - 1,
+                        help='primer año de feriados que se precalienta')
+    servir.add_argument('--hasta', type=int, default=datetime.date.today().year + 1,
+                        help='ultimo año de feriados que se precalienta')
+    servir.add_argument('--tiempo-espera', type=float, default=30.0,
+                        help='segundos maximos para recibir una solicitud (cabeceras y cuerpo) antes de responder 408')
+    servir.set_defaults(funcion=_servir)
+
+    indice = subparsers.add_parser('indice', help='construye un indice de feriados para VACACIONES_INDICE')
+    indice.add_argument('salida', help='archivo del indice')
+    indice.add_argument('--desde', type=int, default=_AÑO_INDICE_INICIO, help='primer año')
+    indice.add_argument('--hasta', type=int, default=_AÑO_INDICE_FIN, help='ultimo año')
+    indice.add_argument('--provincias', nargs='+', help='codigos de provincia ISO 3166-2')
+    indice.set_defaults(funcion=_indice)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(argv)
+    if args.comando is None:
+        args = parser.parse_args(argv + ['consultar'])
+    if args.perfil:
+        contexto = instrumentacion.perfilar(sys.stderr)
+    else:
+        instrumentacion.activa = instrumentacion.activa or bool(args.metricas)
+        contexto = contextlib.nullcontext()
+    try:
+        with contexto:
+            args.funcion(args)
+    finally:
+        if args.metricas == 'json':
+            print(json.dumps(instrumentacion.instantanea(), indent=2), file=sys.stderr)
+        elif args.metricas == 'prometheus':
+            sys.stderr.write(instrumentacion.prometheus())
+
+if __name__ == '__main__':
+    main()
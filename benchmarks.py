@@ -0,0 +1,371 @@
+"""
+Pruebas de rendimiento de Pico y Placa
+
+ Uso
+ ---
+ python benchmarks.py paralelo --filas 2000000 --procesos 1 2 4 8
+ python benchmarks.py analisis --repeticiones 200000
+ python benchmarks.py arranque --repeticiones 20
+ python benchmarks.py suite -o resultados.json --linea-base linea_base.json --umbral 0.10
+"""
+import argparse
+import asyncio
+import datetime
+import http.server
+import json
+import os
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+except ImportError:
+    pa = None
+
+def generar_csv(ruta, filas, semilla=0):
+    """
+    Escribe un archivo CSV sintetico de avistamientos (placa, fecha, hora)
+     Parámetros
+     ----------
+     ruta: calle
+     filas: int
+     semilla: int, opcional
+    """
+    aleatorio = random.Random(semilla)
+    inicio = datetime.date(2018, 1, 1)
+    letras = 'ABCDEGHIJKLMNOPQRSTUVWXYZ'
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        archivo.write('placa,fecha,hora\n')
+        for _ in range(filas):
+            archivo.write('P{}{}-{:04d},{},{:02d}:{:02d}\n'.format(
+                aleatorio.choice(letras), aleatorio.choice(letras), aleatorio.randrange(10000),
+                inicio + datetime.timedelta(days=aleatorio.randrange(3650)),
+                aleatorio.randrange(24), aleatorio.randrange(60)))
+
+def paralelo(args):
+    """Mide filas/s de evaluar_paralelo para distintos numeros de procesos"""
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'avistamientos.csv')
+        generar_csv(ruta, args.filas)
+        base = None
+        print('procesos  filas/s  aceleracion')
+        for procesos in args.procesos:
+            inicio = time.perf_counter()
+            total = sum(1 for _ in pyp.evaluar_paralelo(ruta, procesos=procesos, ordenado=True))
+            tasa = total / (time.perf_counter() - inicio)
+            base = base or tasa
+            print('{:8d} {:8.0f} {:11.2f}x'.format(procesos, tasa, tasa / base))
+
+# Consulta unica sin conexion, como la hace un script corto o la CLI
+_CONSULTA_UNICA = ("import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp; "
+                   "pyp.PicoPlaca('PBX-1234', '2022-05-23', '08:00').predecir()")
+
+def _arranque(repeticiones):
+    """
+    Mide el arranque en frio de un proceso que hace una consulta unica
+     Parámetros
+     ----------
+     repeticiones: int
+     Devoluciones
+     -------
+     Tupla (segundos de pared, microsegundos de importacion del modulo), medianas
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    paredes, importaciones = [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', _CONSULTA_UNICA], cwd=directorio,
+                                 stderr=subprocess.PIPE, text=True, check=True)
+        paredes.append(time.perf_counter() - inicio)
+        for linea in proceso.stderr.splitlines():
+            if linea.rstrip().endswith('| NRC_6181_AlexandraLaaz_Lab4Unidad1'):
+                importaciones.append(int(linea.split('|')[1]))
+    return statistics.median(paredes), statistics.median(importaciones)
+
+def arranque(args):
+    """Muestra el arranque en frio de una consulta unica y los modulos pesados que carga"""
+    pared, importacion = _arranque(args.repeticiones)
+    print('proceso completo   {:8.1f} ms'.format(pared * 1e3))
+    print('importar el modulo {:8.1f} ms'.format(importacion / 1e3))
+    proceso = subprocess.run([sys.executable, '-c', _CONSULTA_UNICA + "; import sys; print(' '.join(sorted(m for m in "
+                              "('numpy', 'requests', 'holidays', 'dateutil', 'asyncio') if m in sys.modules)))"],
+                             cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, text=True, check=True)
+    print('modulos pesados cargados: {}'.format(proceso.stdout.strip() or 'ninguno'))
+
+def _prediccion_anterior(placa, fecha, hora):
+    """
+    Referencia: analisis de cadenas como lo hacia PicoPlaca antes de la ruta rapida
+     (re.match sin compilar en los setters y strptime en el setter de fecha,
+     __encontrar_dia y __es_tiempo_prohibido), con la misma consulta de feriados
+    """
+    if not re.match('^[A-Z]{2,3}-[0-9]{4}$', placa):
+        raise ValueError
+    if len(fecha) != 10:
+        raise ValueError
+    datetime.datetime.strptime(fecha, "%Y-%m-%d")
+    if not re.match('^([01][0-9]|2[0-3]):([0-5][0-9]|)$', hora):
+        raise ValueError
+    y, m, d = fecha.split('-')
+    if datetime.date(int(y), int(m), int(d)) in pyp.cache_feriados.obtener(int(y), pyp._PROVINCIA_PICOPLACA):
+        return True
+    if placa[1] in 'AUZEXM' or len(placa.split('-')[0]) == 2:
+        return True
+    t = datetime.datetime.strptime(hora, '%H:%M').time()
+    if not ((datetime.time(7, 0) <= t <= datetime.time(9, 30)) or
+            (datetime.time(16, 0) <= t <= datetime.time(19, 30))):
+        return True
+    dia = datetime.datetime.strptime(fecha, '%Y-%m-%d').weekday()
+    return int(placa[-1]) not in ([1, 2], [3, 4], [5, 6], [7, 8], [9, 0], [], [])[dia]
+
+def analisis(args):
+    """Compara el costo por prediccion de la ruta rapida con el analisis anterior"""
+    casos = [('PBC-{:04d}'.format(i % 10000), '2022-05-{:02d}'.format(i % 28 + 1), '08:{:02d}'.format(i % 60))
+             for i in range(1000)]
+    pyp.precalentar([2022])
+    vueltas = max(1, args.repeticiones // len(casos))
+    tiempos = {}
+    for nombre, funcion in (('anterior', _prediccion_anterior),
+                            ('actual', lambda p, f, h: pyp.PicoPlaca(p, f, h).predecir())):
+        inicio = time.perf_counter()
+        for _ in range(vueltas):
+            for caso in casos:
+                funcion(*caso)
+        tiempos[nombre] = (time.perf_counter() - inicio) / (vueltas * len(casos)) * 1e6
+        print('{:9s} {:7.2f} us/prediccion'.format(nombre, tiempos[nombre]))
+    print('mejora    {:7.2f}x'.format(tiempos['anterior'] / tiempos['actual']))
+
+class _ApiSimulada(http.server.BaseHTTPRequestHandler):
+    """Servidor local que imita la API de dias festivos abstractapi usando HolidayEcuador"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        consulta = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+        año = int(consulta['year'])
+        feriados = [{'name': nombre, 'date': fecha.strftime('%m/%d/%Y')}
+                    for fecha, nombre in pyp._calcular_feriados(año, pyp._PROVINCIA_PICOPLACA).items()
+                    if 'day' not in consulta or (fecha.month, fecha.day) == (int(consulta['month']), int(consulta['day']))]
+        cuerpo = json.dumps(feriados).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+def _medir(funcion, repeticiones):
+    """
+    Ejecuta funcion varias veces
+     Devoluciones
+     -------
+     Tupla (mediana de segundos por llamada, pico de memoria en bytes segun tracemalloc)
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    # La memoria se mide en una ejecucion aparte para no alterar los tiempos
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return statistics.median(tiempos), pico
+
+def _columnas(filas, semilla=0):
+    """Columnas sinteticas (placas, fechas, horas) para predecir_lote"""
+    aleatorio = random.Random(semilla)
+    inicio = datetime.date(2018, 1, 1)
+    placas = ['P{}{}-{:04d}'.format(aleatorio.choice('BCDGHJKLNOPRSTVWY'), aleatorio.choice('BCDGHJKL'),
+                                    aleatorio.randrange(10000)) for _ in range(min(filas, 100000))]
+    fechas = [(inicio + datetime.timedelta(days=aleatorio.randrange(3650))).isoformat()
+              for _ in range(min(filas, 100000))]
+    horas = ['{:02d}:{:02d}'.format(aleatorio.randrange(24), aleatorio.randrange(60)) for _ in range(min(filas, 100000))]
+    repetir = -(-filas // len(placas))
+    import numpy as np
+    return [np.array(c * repetir, dtype=str)[:filas] for c in (placas, fechas, horas)]
+
+def _pruebas(tamaños, repeticiones):
+    """
+    Ejecuta todas las pruebas de la suite
+     Devoluciones
+     -------
+     Diccionario {nombre: {'valor', 'unidad', 'mayor_es_mejor', 'memoria_pico'}}
+    """
+    resultados = {}
+
+    def registrar(nombre, segundos, pico, unidad='s', mayor_es_mejor=False):
+        resultados[nombre] = {'valor': segundos, 'unidad': unidad,
+                              'mayor_es_mejor': mayor_es_mejor, 'memoria_pico': pico}
+
+    pyp.activar_indice(None)
+
+    # Arranque en frio de una consulta unica en un proceso nuevo
+    registrar('arranque_consulta', _arranque(max(3, repeticiones // 2))[0], 0)
+
+    # predecir con la tabla de feriados fria (cache vacia) y caliente
+    def predecir_frio():
+        pyp.cache_feriados.limpiar()
+        pyp.PicoPlaca('PBC-1231', '2022-05-23', '08:00').predecir()
+    registrar('predecir_frio', *_medir(predecir_frio, repeticiones))
+    pyp.precalentar([2022])
+    registrar('predecir_caliente', *_medir(lambda: pyp.PicoPlaca('PBC-1231', '2022-05-23', '08:00').predecir(),
+                                           repeticiones * 100))
+    pyp.instrumentacion.activa = True
+    try:
+        registrar('predecir_instrumentado', *_medir(
+            lambda: pyp.PicoPlaca('PBC-1231', '2022-05-23', '08:00').predecir(), repeticiones * 100))
+    finally:
+        pyp.instrumentacion.activa = False
+        pyp.instrumentacion.reiniciar()
+
+    # Reglas de HolidayEcuador por año (_calcular_feriados) y _populate completo sin cache
+    registrar('calcular_feriados_año', *_medir(lambda: pyp._calcular_feriados(2022, 'EC-P'), repeticiones * 10))
+    registrar('calcular_feriados_todas', *_medir(lambda: pyp._motor_feriados.calcular(2022),
+                                                  repeticiones * 10))
+    def poblar():
+        pyp.cache_feriados.limpiar()
+        pyp.HolidayEcuador(years=2022, provincia='EC-P')
+    registrar('populate_año', *_medir(poblar, repeticiones * 10))
+
+    # Rendimiento de predecir_lote
+    pyp.precalentar(range(2018, 2029))
+    for filas in tamaños:
+        placas, fechas, horas = _columnas(filas)
+        segundos, pico = _medir(lambda: pyp.PicoPlaca.predecir_lote(placas, fechas, horas),
+                                max(3, repeticiones // max(1, filas // 100000)))
+        registrar('lote_{}_filas'.format(filas), filas / segundos, pico, 'filas/s', True)
+        if pa is not None:
+            # Las mismas filas como columnas Arrow (texto, date32 y time32)
+            placas, fechas, horas = (pa.array(placas), pa.array(fechas.astype('datetime64[D]')),
+                                     pa.compute.strptime(pa.array(horas), '%H:%M', 's').cast(pa.time32('s')))
+            segundos, pico = _medir(lambda: pyp.PicoPlaca.predecir_arrow(placas, fechas, horas),
+                                    max(3, repeticiones // max(1, filas // 100000)))
+            registrar('arrow_{}_filas'.format(filas), filas / segundos, pico, 'filas/s', True)
+        del placas, fechas, horas
+
+    # Flujo de avistamientos (un avistamiento cada 2 s de 500 placas durante un dia)
+    placas = ['PBC-{:04d}'.format(i) for i in range(500)]
+    eventos = [(placas[i % 500], datetime.datetime(2022, 5, 16) + datetime.timedelta(seconds=2 * i))
+               for i in range(43200)]
+    segundos, pico = _medir(lambda: sum(1 for _ in pyp.EvaluadorAvistamientos().evaluar(eventos)), repeticiones)
+    registrar('flujo_avistamientos', len(eventos) / segundos, pico, 'eventos/s', True)
+
+    # Flota: agrupar un registro de 2e6 placas y contar los restringidos por hora durante un mes
+    registro = _columnas(2000000)[0]
+    segundos, pico = _medir(lambda: pyp.agrupar_placas(registro), max(3, repeticiones // 10))
+    registrar('flota_agrupar_2000000', len(registro) / segundos, pico, 'placas/s', True)
+    grupos = pyp.agrupar_placas(registro)
+    del registro
+    registrar('flota_contar_mes', *_medir(
+        lambda: pyp.contar_restringidos(grupos, datetime.date(2022, 5, 1), datetime.date(2022, 6, 1)), repeticiones))
+
+    # Modo en linea contra una API local simulada
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ApiSimulada)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/v1/'.format(servidor.server_address[1])
+    try:
+        def en_linea_frio():
+            proveedor = pyp.ProveedorFeriadosEnLinea(clave='prueba', url=url, tasa=1e6)
+            proveedor.consultar('2022-05-23')
+            proveedor.cerrar()
+        registrar('en_linea_frio', *_medir(en_linea_frio, repeticiones))
+        proveedor = pyp.ProveedorFeriadosEnLinea(clave='prueba', url=url, tasa=1e6)
+        proveedor.consultar('2022-05-23')
+        registrar('en_linea_caliente', *_medir(lambda: proveedor.consultar('2022-05-24'), repeticiones * 100))
+        registrar('en_linea_async_lote_365', *_medir(
+            lambda: asyncio.run(proveedor.es_feriado_lote(
+                [(datetime.date(2022, 1, 1) + datetime.timedelta(days=i)).isoformat() for i in range(365)])),
+            repeticiones))
+        proveedor.cerrar()
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    return resultados
+
+def _regresiones(resultados, linea_base, umbral):
+    """
+    Compara los resultados con una linea base
+     Devoluciones
+     -------
+     Lista de mensajes, uno por cada prueba que empeoro mas que el umbral (fraccion)
+    """
+    mensajes = []
+    for nombre, actual in resultados.items():
+        base = linea_base.get(nombre)
+        if not base:
+            continue
+        if actual['mayor_es_mejor']:
+            empeoro = actual['valor'] < base['valor'] * (1 - umbral)
+        else:
+            empeoro = actual['valor'] > base['valor'] * (1 + umbral)
+        if empeoro:
+            mensajes.append('{}: {:.6g} {} frente a {:.6g} en la linea base'.format(
+                nombre, actual['valor'], actual['unidad'], base['valor']))
+    return mensajes
+
+def suite(args):
+    """Ejecuta la suite, guarda los resultados en JSON y falla si hay regresiones"""
+    resultados = _pruebas(args.tamaños, args.repeticiones)
+    for nombre, r in resultados.items():
+        print('{:26s} {:14.6g} {:8s} {:10.1f} KiB'.format(nombre, r['valor'], r['unidad'], r['memoria_pico'] / 1024))
+    print('memoria maxima del proceso: {} KiB'.format(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'python': sys.version.split()[0], 'resultados': resultados}, archivo, indent=2)
+    if args.linea_base:
+        with open(args.linea_base, encoding='utf-8') as archivo:
+            linea_base = json.load(archivo)['resultados']
+        mensajes = _regresiones(resultados, linea_base, args.umbral)
+        for mensaje in mensajes:
+            print('REGRESION ' + mensaje, file=sys.stderr)
+        return 1 if mensajes else 0
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pruebas de rendimiento de Pico y Placa')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    par = subparsers.add_parser('paralelo', help='escalamiento de evaluar_paralelo con el numero de procesos')
+    par.add_argument('--filas', type=int, default=2000000)
+    par.add_argument('--procesos', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    par.set_defaults(funcion=paralelo)
+
+    ana = subparsers.add_parser('analisis', help='costo por prediccion de PicoPlaca(...).predecir()')
+    ana.add_argument('--repeticiones', type=int, default=200000)
+    ana.set_defaults(funcion=analisis)
+
+    arr = subparsers.add_parser('arranque', help='arranque en frio de una consulta unica sin conexion')
+    arr.add_argument('--repeticiones', type=int, default=20)
+    arr.set_defaults(funcion=arranque)
+
+    sui = subparsers.add_parser('suite', help='suite completa con salida JSON y comparacion con una linea base')
+    sui.add_argument('-o', '--salida', help='archivo JSON de resultados')
+    sui.add_argument('--linea-base', help='archivo JSON de resultados anteriores para comparar')
+    sui.add_argument('--umbral', type=float, default=0.10,
+                     help='empeoramiento relativo tolerado antes de fallar (el valor predeterminado es 0.10)')
+    sui.add_argument('--tamaños', type=int, nargs='+', default=[1000, 1000000, 10000000],
+                     help='filas de las pruebas de predecir_lote')
+    sui.add_argument('--repeticiones', type=int, default=20)
+    sui.set_defaults(funcion=suite)
+
+    args = parser.parse_args(argv)
+    return args.funcion(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
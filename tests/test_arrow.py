@@ -0,0 +1,108 @@
+"""Pruebas de PicoPlaca.predecir_arrow contra predecir fila por fila"""
+import datetime
+import unittest
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+from tests.test_predecir_lote import _filas
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _esperado(placa, fecha, hora):
+    """Veredicto y motivo de una fila segun predecir, o (None, None) si la fila no es valida"""
+    if placa is None or fecha is None or hora is None:
+        return None, None
+    try:
+        puede = pyp.PicoPlaca(placa, fecha, hora).predecir()
+    except ValueError:
+        return None, None
+    dia = datetime.date.fromisoformat(fecha)
+    minuto = int(hora[:2]) * 60 + int(hora[3:5])
+    if dia in pyp.cache_feriados.obtener(dia.year, 'EC-P'):
+        motivo = 'feriado'
+    elif placa[2] == '-' or placa[1] in 'AUZEXM':
+        motivo = 'exenta'
+    elif not (420 <= minuto <= 570 or 960 <= minuto <= 1170):
+        motivo = 'fuera_de_pico'
+    else:
+        motivo = 'digito_permitido' if puede else 'restringido'
+    return puede, motivo
+
+
+@unittest.skipIf(pa is None, 'requiere pyarrow')
+class PruebasPredecirArrow(unittest.TestCase):
+
+    def comparar(self, placas, fechas, horas, esperado):
+        puede, motivo = pyp.PicoPlaca.predecir_arrow(placas, fechas, horas)
+        self.assertIsInstance(motivo, pa.DictionaryArray)
+        self.assertEqual(motivo.dictionary.to_pylist(), list(pyp.MOTIVOS))
+        self.assertEqual(list(zip(puede.to_pylist(), motivo.to_pylist())), esperado)
+
+    def test_coincide_con_predecir(self):
+        placas, fechas, horas = _filas(20000)
+        esperado = [_esperado(*fila) for fila in zip(placas, fechas, horas)]
+        self.comparar(pa.array(placas), pa.array(fechas), pa.array(horas), esperado)
+        # Columnas tipadas: date32/date64 y time32/time64
+        dias = pa.array([datetime.date.fromisoformat(f) for f in fechas])
+        tiempos = pa.array([datetime.time.fromisoformat(h) for h in horas], pa.time32('s'))
+        self.comparar(pa.array(placas), dias, tiempos, esperado)
+        self.comparar(pa.array(placas, pa.large_string()), dias.cast(pa.date64()),
+                      tiempos.cast(pa.time64('us')), esperado)
+
+    def test_motivos(self):
+        filas = [
+            ('PBC-1231', '2022-05-23', '08:00', (True, 'feriado')),
+            ('PBC-1239', '2022-04-15', '08:00', (True, 'feriado')),
+            ('PBC-1237', '2022-04-14', '08:00', (False, 'restringido')),
+            ('PAC-1231', '2022-05-30', '08:00', (True, 'exenta')),
+            ('PB-1231', '2022-05-30', '08:00', (True, 'exenta')),
+            ('PBC-1231', '2022-05-30', '06:59', (True, 'fuera_de_pico')),
+            ('PBC-1231', '2022-05-30', '09:31', (True, 'fuera_de_pico')),
+            ('PBC-1231', '2022-05-30', '07:00', (False, 'restringido')),
+            ('PBC-1231', '2022-05-30', '19:30', (False, 'restringido')),
+            ('PBC-1233', '2022-05-30', '08:00', (True, 'digito_permitido')),
+            ('PBC-1231', '2022-06-04', '08:00', (True, 'digito_permitido')),
+        ]
+        placas, fechas, horas, esperado = zip(*filas)
+        self.assertEqual([_esperado(*f[:3]) for f in filas], list(esperado))
+        self.comparar(pa.array(placas), pa.array(fechas), pa.array(horas), list(esperado))
+
+    def test_filas_nulas_y_no_validas(self):
+        filas = [
+            (None, '2022-05-30', '08:00'), ('PBC-1231', None, '08:00'), ('PBC-1231', '2022-05-30', None),
+            ('pbc-1231', '2022-05-30', '08:00'), ('PBC1231', '2022-05-30', '08:00'),
+            ('PBCD-1231', '2022-05-30', '08:00'), ('PBC-12345', '2022-05-30', '08:00'),
+            ('PBC-1231\n', '2022-05-30', '08:00'), ('PBÑ-1231', '2022-05-30', '08:00'), ('', '2022-05-30', '08:00'),
+            ('PBC-1231', '2022-02-30', '08:00'), ('PBC-1231', '30/05/2022', '08:00'),
+            ('PBC-1231', '2022-05-30', '25:00'), ('PBC-1231', '2022-05-30', '08:'),
+            ('PBC-1231', '2022-05-30', '08:00'),
+        ]
+        placas, fechas, horas = (list(c) for c in zip(*filas))
+        esperado = [(None, None)] * (len(filas) - 1) + [(False, 'restringido')]
+        self.assertEqual([_esperado(*f) for f in filas], esperado)
+        self.comparar(pa.array(placas), pa.array(fechas), pa.array(horas), esperado)
+
+    def test_columnas_recortadas(self):
+        placas, fechas, horas = _filas(3000, semilla=1)
+        placas[100:110] = [None, 'pbc-1231', 'PBC1231'] + placas[103:110]
+        esperado = [_esperado(*fila) for fila in zip(placas, fechas, horas)]
+        columnas = pa.array(placas), pa.array(fechas), pa.array(horas)
+        for inicio, cantidad in ((0, 3000), (1, 2999), (97, 1000), (2999, 1), (1500, 0)):
+            with self.subTest(inicio=inicio):
+                self.comparar(*(c.slice(inicio, cantidad) for c in columnas), esperado[inicio:inicio + cantidad])
+        # Desfases distintos en cada columna y arreglos por trozos
+        self.comparar(pa.concat_arrays([pa.array(['x'] * 5), columnas[0]]).slice(5), columnas[1],
+                      pa.chunked_array([columnas[2].slice(0, 1000), columnas[2].slice(1000)]).combine_chunks(),
+                      esperado)
+
+    def test_longitudes_distintas(self):
+        with self.assertRaises(ValueError):
+            pyp.PicoPlaca.predecir_arrow(pa.array(['PBC-1231']), pa.array(['2022-05-30'] * 2),
+                                         pa.array(['08:00']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Pruebas de EvaluadorAvistamientos: repetidos, avistamientos no validos y evaluar frente a evaluar_async"""
+import asyncio
+import datetime
+import random
+import unittest
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+
+def _eventos(cantidad, semilla=0):
+    """Avistamientos en orden de llegada de pocas placas, para que se repitan dentro de las ventanas"""
+    aleatorio = random.Random(semilla)
+    placas = ['PBC-12{:02d}'.format(i) for i in range(30)] + ['PA-1231', 'PEA-1232', 'GMA-1233']
+    momento = datetime.datetime(2022, 5, 20, 6, 0)  # incluye el feriado del lunes 23 de mayo
+    eventos = []
+    for _ in range(cantidad):
+        momento += datetime.timedelta(seconds=aleatorio.randrange(240))
+        eventos.append((aleatorio.choice(placas), momento))
+    return eventos
+
+
+async def _recolectar(evaluador, eventos):
+    return [infraccion async for infraccion in evaluador.evaluar_async(eventos)]
+
+
+async def _asincrono(eventos):
+    for evento in eventos:
+        await asyncio.sleep(0)
+        yield evento
+
+
+class _ProveedorSinConexion:
+    """Proveedor en linea falso que responde con el calendario sin conexion y cuenta las consultas"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def consultar(self, fecha):
+        self.consultas.append(('consultar', fecha))
+        dia = datetime.date.fromisoformat(fecha)
+        return pyp._es_feriado_sin_conexion(dia.year, dia.month, dia.day, dia.toordinal() - pyp._ORDINAL_EPOCA)
+
+    async def es_feriado(self, fecha):
+        self.consultas.append(('es_feriado', fecha))
+        dia = datetime.date.fromisoformat(fecha)
+        return pyp._es_feriado_sin_conexion(dia.year, dia.month, dia.day, dia.toordinal() - pyp._ORDINAL_EPOCA)
+
+
+class PruebasEvaluadorAvistamientos(unittest.TestCase):
+
+    def test_una_infraccion_por_ventana(self):
+        evaluador = pyp.EvaluadorAvistamientos()
+        lunes = datetime.datetime(2022, 5, 30)
+        eventos = [('PBC-1231', lunes.replace(hour=7)), ('PBC-1231', lunes.replace(hour=8, minute=15)),
+                   ('PBC-1231', lunes.replace(hour=9, minute=30)), ('PBC-1231', lunes.replace(hour=9, minute=31)),
+                   ('PBC-1232', lunes.replace(hour=8)), ('PBC-1233', lunes.replace(hour=8)),
+                   ('PBC-1231', lunes.replace(hour=17)), ('PBC-1231', lunes.replace(hour=19))]
+        infracciones = list(evaluador.evaluar(eventos))
+        self.assertEqual(infracciones, [
+            pyp.Infraccion('PBC-1231', lunes.replace(hour=7), lunes.replace(hour=7), lunes.replace(hour=9, minute=31)),
+            pyp.Infraccion('PBC-1232', lunes.replace(hour=8), lunes.replace(hour=7), lunes.replace(hour=9, minute=31)),
+            pyp.Infraccion('PBC-1231', lunes.replace(hour=17), lunes.replace(hour=16),
+                           lunes.replace(hour=19, minute=31)),
+        ])
+        self.assertEqual((evaluador.avistamientos, evaluador.repetidos, evaluador.invalidos), (8, 3, 0))
+
+    def test_coincide_con_predecir(self):
+        eventos = _eventos(6000)
+        evaluador = pyp.EvaluadorAvistamientos()
+        obtenido = list(evaluador.evaluar(eventos))
+        esperado, vistas, repetidos = [], set(), 0
+        for placa, momento in eventos:
+            if pyp.PicoPlaca(placa, momento.date().isoformat(), momento.strftime('%H:%M')).predecir():
+                continue
+            clave = (placa, momento.date(), momento.hour < 12)
+            if clave in vistas:
+                repetidos += 1
+            else:
+                vistas.add(clave)
+                esperado.append((placa, momento))
+        self.assertEqual([(i.placa, i.momento) for i in obtenido], esperado)
+        self.assertEqual(evaluador.repetidos, repetidos)
+        self.assertFalse([i for i in obtenido if i.momento.date() == datetime.date(2022, 5, 23)])
+
+    def test_avistamiento_tardio(self):
+        evaluador = pyp.EvaluadorAvistamientos(retraso=datetime.timedelta(minutes=10))
+        martes = datetime.datetime(2022, 5, 31)
+        self.assertIsNotNone(evaluador.procesar('PBC-1233', martes.replace(hour=9, minute=20)))
+        self.assertIsNone(evaluador.procesar('PBC-1234', martes.replace(hour=9, minute=38)))
+        # Dentro del retraso tolerado la ventana sigue en memoria y el avistamiento tardio es repetido
+        self.assertIsNone(evaluador.procesar('PBC-1233', martes.replace(hour=9, minute=25)))
+        self.assertEqual(evaluador.repetidos, 1)
+
+    def test_zona_horaria(self):
+        evaluador = pyp.EvaluadorAvistamientos()
+        infraccion = evaluador.procesar('PBC-1231', '2022-05-30T13:00:00+00:00')
+        self.assertEqual(infraccion.momento, datetime.datetime(2022, 5, 30, 8, 0))
+
+    def test_avistamientos_no_validos(self):
+        evaluador = pyp.EvaluadorAvistamientos()
+        eventos = [(1231, '2022-05-30T08:00'), (None, '2022-05-30T08:00'), ('pbc-1231', '2022-05-30T08:00'),
+                   ('PBC-1231', '2022-13-01T08:00'), ('PBC-1231', 5), ('PBC-1231', '2022-05-30T08:00')]
+        self.assertEqual(len(list(evaluador.evaluar(eventos))), 1)
+        self.assertEqual((evaluador.avistamientos, evaluador.invalidos), (6, 5))
+        with self.assertRaises(ValueError):
+            evaluador.procesar(None, '2022-05-30T08:00')
+
+    def test_async_coincide_con_sincrono(self):
+        eventos = _eventos(3000, semilla=1)
+        eventos[10:10] = [(None, eventos[9][1]), ('PBC-1231', 'no es fecha')]
+        for entrada in (lambda: eventos, lambda: _asincrono(eventos)):
+            sincrono = pyp.EvaluadorAvistamientos()
+            asincrono = pyp.EvaluadorAvistamientos()
+            esperado = list(sincrono.evaluar(eventos))
+            self.assertEqual(asyncio.run(_recolectar(asincrono, entrada())), esperado)
+            self.assertEqual((asincrono.avistamientos, asincrono.repetidos, asincrono.invalidos),
+                             (sincrono.avistamientos, sincrono.repetidos, sincrono.invalidos))
+
+    def test_async_en_linea(self):
+        proveedor = _ProveedorSinConexion()
+        pyp.activar_proveedor_en_linea(proveedor)
+        self.addCleanup(pyp.activar_proveedor_en_linea, None)
+        eventos = _eventos(3000, semilla=2)
+        esperado = list(pyp.EvaluadorAvistamientos().evaluar(eventos))
+        self.assertEqual(list(pyp.EvaluadorAvistamientos(enlinea=True).evaluar(eventos)), esperado)
+        dias = len({m.date() for _, m in eventos})
+        self.assertEqual([c for c, _ in proveedor.consultas], ['consultar'] * dias)
+        proveedor.consultas.clear()
+        self.assertEqual(asyncio.run(_recolectar(pyp.EvaluadorAvistamientos(enlinea=True), eventos)), esperado)
+        # Una sola consulta por dia, sin bloquear el bucle de eventos
+        self.assertEqual([c for c, _ in proveedor.consultas], ['es_feriado'] * dias)
+
+
+if __name__ == '__main__':
+    unittest.main()
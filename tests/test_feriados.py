@@ -0,0 +1,78 @@
+"""Pruebas del calendario de feriados (_REGLAS_FERIADOS / _MotorFeriados) con fechas conocidas"""
+import datetime
+import unittest
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+# Feriados de Quito (EC-P) por año, con los traslados de la LOSEP, de Difuntos/Cuenca y de Quito
+FERIADOS_QUITO = {
+    2016: ['2016-01-01', '2016-02-08', '2016-02-09', '2016-03-25', '2016-03-27', '2016-05-02', '2016-05-23',
+           '2016-08-12', '2016-10-10', '2016-11-03', '2016-11-04', '2016-12-05', '2016-12-25'],
+    2019: ['2019-01-01', '2019-03-04', '2019-03-05', '2019-04-19', '2019-04-21', '2019-05-03', '2019-05-24',
+           '2019-08-09', '2019-10-11', '2019-11-01', '2019-11-04', '2019-12-06', '2019-12-25'],
+    2020: ['2020-01-01', '2020-02-24', '2020-02-25', '2020-04-10', '2020-04-12', '2020-05-01', '2020-05-25',
+           '2020-08-10', '2020-10-09', '2020-11-02', '2020-11-03', '2020-12-07', '2020-12-25'],
+    2022: ['2022-01-01', '2022-02-28', '2022-03-01', '2022-04-15', '2022-04-17', '2022-05-02', '2022-05-23',
+           '2022-08-12', '2022-10-10', '2022-11-03', '2022-11-04', '2022-12-05', '2022-12-25'],
+    2023: ['2023-01-01', '2023-02-20', '2023-02-21', '2023-04-07', '2023-04-09', '2023-05-01', '2023-05-26',
+           '2023-08-11', '2023-10-09', '2023-11-02', '2023-11-03', '2023-12-08', '2023-12-25'],
+    2024: ['2024-01-01', '2024-02-12', '2024-02-13', '2024-03-29', '2024-03-31', '2024-05-03', '2024-05-24',
+           '2024-08-09', '2024-10-11', '2024-11-01', '2024-11-04', '2024-12-06', '2024-12-25'],
+}
+
+# Fundacion de Quito (6 de diciembre, con su traslado) solo es feriado en Pichincha
+FUNDACION_QUITO = {2016: '2016-12-05', 2019: '2019-12-06', 2020: '2020-12-07',
+                   2022: '2022-12-05', 2023: '2023-12-08', 2024: '2024-12-06'}
+
+
+def _fechas(feriados):
+    return sorted(d.isoformat() for d in feriados)
+
+
+class PruebasFeriados(unittest.TestCase):
+
+    def test_fechas_de_quito(self):
+        for año, esperado in FERIADOS_QUITO.items():
+            with self.subTest(año=año):
+                self.assertEqual(_fechas(pyp._calcular_feriados(año, 'EC-P')), esperado)
+                self.assertEqual(_fechas(pyp.HolidayEcuador(years=año, prov='EC-P')), esperado)
+
+    def test_guayaquil_sin_fundacion_de_quito(self):
+        for año, esperado in FERIADOS_QUITO.items():
+            with self.subTest(año=año):
+                guayaquil = [f for f in esperado if f != FUNDACION_QUITO[año]]
+                self.assertEqual(_fechas(pyp._calcular_feriados(año, 'EC-G')), guayaquil)
+                self.assertEqual(_fechas(pyp.HolidayEcuador(years=año, provincia='EC-G')), guayaquil)
+
+    def test_motor_calcula_todas_las_provincias(self):
+        feriados = pyp._motor_feriados.calcular(2022)
+        self.assertEqual(set(feriados) - {None}, set(pyp._PROVINCIAS))
+        for provincia in pyp._PROVINCIAS:
+            self.assertEqual(_fechas(feriados[provincia]) == FERIADOS_QUITO[2022], provincia == 'EC-P')
+
+    def test_pascua_y_carnaval(self):
+        for año, pascua in ((2016, '2016-03-27'), (2019, '2019-04-21'), (2024, '2024-03-31'),
+                            (2025, '2025-04-20'), (2038, '2038-04-25'), (2285, '2285-03-22')):
+            with self.subTest(año=año):
+                fecha = pyp._pascua(año)
+                self.assertEqual(fecha.isoformat(), pascua)
+                feriados = pyp._calcular_feriados(año, 'EC-P')
+                for dias in (-48, -47, -2, 0):
+                    self.assertIn(fecha + datetime.timedelta(days=dias), feriados)
+                self.assertNotIn(fecha - datetime.timedelta(days=3), feriados)  # Jueves Santo
+
+    def test_nombres(self):
+        feriados = pyp.HolidayEcuador(years=2022, prov='EC-P')
+        self.assertIn('Fundaci', feriados[datetime.date(2022, 12, 5)])
+        self.assertIn('Pichincha', feriados[datetime.date(2022, 5, 23)])
+
+    def test_picoplaca_usa_los_feriados_de_quito(self):
+        # Lunes 2022-12-05 (Fundacion de Quito): el digito 1 no tiene restriccion
+        self.assertTrue(pyp.PicoPlaca('PBC-1231', '2022-12-05', '08:00').predecir())
+        self.assertFalse(pyp.PicoPlaca('PBC-1231', '2022-12-12', '08:00').predecir())
+        self.assertEqual(pyp.PicoPlaca.predecir_lote(['PBC-1231'] * 2, ['2022-12-05', '2022-12-12'],
+                                                     ['08:00'] * 2).tolist(), [True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
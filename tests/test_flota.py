@@ -0,0 +1,104 @@
+"""Pruebas de agrupar_placas y contar_restringidos contra la evaluacion placa por placa"""
+import datetime
+import random
+import unittest
+
+import numpy as np
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _registro(cantidad, semilla=0):
+    """Placas de tres letras, de dos letras, exentas por la segunda letra y no validas"""
+    aleatorio = random.Random(semilla)
+    letras = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    placas = []
+    for i in range(cantidad):
+        tipo = aleatorio.random()
+        if tipo < 0.1:
+            placas.append('{}{}-{:04d}'.format(aleatorio.choice(letras), aleatorio.choice(letras),
+                                               aleatorio.randrange(10000)))
+        elif tipo < 0.15:
+            placas.append(aleatorio.choice(['PBC1231', 'pbc-1231', 'PBCD-1231', '', 'PBC-12345']))
+        else:
+            placas.append('{}-{:04d}'.format(''.join(aleatorio.choice(letras) for _ in range(3)),
+                                             aleatorio.randrange(10000)))
+    return placas
+
+
+class PruebasFlota(unittest.TestCase):
+
+    def test_agrupar_placas(self):
+        placas = _registro(2000)
+        grupos = pyp.agrupar_placas(placas)
+        digitos = [0] * 10
+        exentas = {}
+        dos_letras = invalidas = 0
+        for placa in placas:
+            if not pyp._PATRON_PLACA.match(placa):
+                invalidas += 1
+            elif placa[2] == '-':
+                dos_letras += 1
+            elif placa[1] in 'AUZEXM':
+                exentas[placa[1]] = exentas.get(placa[1], 0) + 1
+            else:
+                digitos[int(placa[-1])] += 1
+        self.assertEqual(grupos, pyp.GruposPlacas(digitos, exentas, dos_letras, invalidas))
+        self.assertEqual(pyp.agrupar_placas(placas, tamaño_bloque=77), grupos)
+        self.assertEqual(pyp.agrupar_placas(np.array(placas)), grupos)
+        self.assertEqual(pyp.agrupar_placas(np.repeat(placas, 2)[::2]), grupos)
+        self.assertEqual(pyp.agrupar_placas(iter(placas)), grupos)
+
+    @unittest.skipIf(pa is None, 'requiere pyarrow')
+    def test_agrupar_placas_arrow(self):
+        placas = _registro(500, semilla=1)
+        grupos = pyp.agrupar_placas(placas)
+        columna = pa.array(placas + [None])
+        self.assertEqual(pyp.agrupar_placas(columna), grupos._replace(invalidas=grupos.invalidas + 1))
+        self.assertEqual(pyp.agrupar_placas(columna.slice(10), tamaño_bloque=64),
+                         pyp.agrupar_placas(placas[10:] + [None]))
+
+    def test_placas_que_no_son_cadenas(self):
+        grupos = pyp.agrupar_placas([1231, None, 12.5, 'PBC-1231'])
+        self.assertEqual(grupos.invalidas, 3)
+        self.assertEqual(grupos.digitos, [0, 1, 0, 0, 0, 0, 0, 0, 0, 0])
+        evaluador = pyp.EvaluadorAvistamientos()
+        eventos = [(1231, '2022-05-24T08:00'), (None, '2022-05-24T08:00'), ('PBC-1233', '2022-05-24T08:00')]
+        self.assertEqual(len(list(evaluador.evaluar(eventos))), 1)
+        self.assertEqual(evaluador.invalidos, 2)
+
+    def test_contar_restringidos(self):
+        placas = _registro(300, semilla=2)
+        desde, hasta = datetime.date(2022, 4, 12), datetime.date(2022, 4, 19)  # incluye el Viernes Santo
+        intervalos = [pyp.PicoPlaca.intervalos_restringidos(p, datetime.datetime.combine(desde, datetime.time()),
+                                                            datetime.datetime.combine(hasta, datetime.time()))
+                      for p in placas if pyp._PATRON_PLACA.match(p)]
+        for minutos in (1440, 60, 30, 180):
+            with self.subTest(intervalo=minutos):
+                paso = datetime.timedelta(minutes=minutos)
+                conteo = pyp.contar_restringidos(placas, desde, hasta, minutos)
+                self.assertEqual(len(conteo), 7 * 1440 // minutos)
+                for inicio, cantidad in conteo:
+                    esperado = sum(any(a < inicio + paso and inicio < b for a, b in ventanas)
+                                   for ventanas in intervalos)
+                    self.assertEqual(cantidad, esperado, inicio)
+        viernes_santo = [c for i, c in pyp.contar_restringidos(placas, desde, hasta) if i.date().day == 15]
+        self.assertEqual(viernes_santo, [0] * 24)
+
+    def test_contar_restringidos_con_grupos(self):
+        grupos = pyp.agrupar_placas(_registro(300))
+        desde, hasta = datetime.date(2022, 6, 6), datetime.date(2022, 6, 8)
+        self.assertEqual(pyp.contar_restringidos(grupos, desde, hasta),
+                         pyp.contar_restringidos(_registro(300), desde, hasta))
+        self.assertEqual(pyp.contar_restringidos(grupos, hasta, desde), [])
+        with self.assertRaises(ValueError):
+            pyp.contar_restringidos(grupos, desde, hasta, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Pruebas de lote -p N y evaluar_paralelo frente a la ruta secuencial"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+# Registros JSONL con claves distintas, lineas ilegibles y lineas en blanco
+LINEAS = [
+    {'placa': 'PBC-1231', 'fecha': '2022-05-24', 'hora': '08:00'},
+    {'camara': 'C4', 'placa': 'PBC-1234', 'fecha': '2022-05-24', 'hora': '08:00'},
+    'oops',
+    '',
+    {'placa': 'PBC-1233', 'fecha': '2022-05-24', 'hora': '08:00', 'carril': 2},
+    [1, 2],
+    {'placa': 1231, 'fecha': '2022-05-24', 'hora': '08:00'},
+    {'fecha': '2022-05-24', 'hora': '17:00', 'placa': 'PB-1234'},
+    {'placa': 'PBC-1234', 'fecha': '2022-02-30', 'hora': '08:00'},
+] * 5
+
+
+class PruebasParalelo(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.entrada = self.ruta('avistamientos.jsonl')
+        with open(self.entrada, 'w', encoding='utf-8') as archivo:
+            for linea in LINEAS:
+                archivo.write((linea if isinstance(linea, str) else json.dumps(linea)) + '\n')
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio.name, nombre)
+
+    def lote(self, procesos, formato_salida):
+        salida = self.ruta('salida_{}.{}'.format(procesos, formato_salida))
+        # Fragmentos de pocos bytes para que cada trabajador reciba registros distintos
+        with mock.patch.object(pyp, '_TAMAÑO_FRAGMENTO', 150):
+            pyp.main(['lote', self.entrada, '-o', salida, '-p', str(procesos), '--formato-salida', formato_salida])
+        with open(salida, encoding='utf-8') as archivo:
+            return archivo.read()
+
+    def test_lote_paralelo_igual_al_secuencial(self):
+        for formato_salida in ('csv', 'jsonl'):
+            secuencial = self.lote(1, formato_salida)
+            self.assertEqual(self.lote(3, formato_salida), secuencial)
+            self.assertEqual(len(secuencial.splitlines()), 40 + (formato_salida == 'csv'))
+
+    def test_ids_de_fila(self):
+        with open(self.entrada, encoding='utf-8') as archivo:
+            esperado = [(i, resultado, error) for i, (_, resultado, error) in
+                        zip((i for i, linea in enumerate(LINEAS) if linea != ''),
+                            pyp.evaluar_flujo(pyp.leer_registros(archivo, 'jsonl')))]
+        for ordenado in (True, False):
+            obtenido = list(pyp.evaluar_paralelo(self.entrada, procesos=2, ordenado=ordenado,
+                                                 tamaño_fragmento=100))
+            self.assertEqual(obtenido, esperado)
+
+    def test_fragmentos_alineados_a_lineas(self):
+        encabezado, rangos = pyp._fragmentos(self.entrada, 'jsonl', 100)
+        with open(self.entrada, 'rb') as archivo:
+            datos = archivo.read()
+        self.assertEqual(encabezado, '')
+        self.assertEqual(b''.join(datos[inicio:fin] for inicio, fin in rangos), datos)
+        self.assertTrue(all(datos[fin - 1:fin] == b'\n' for _, fin in rangos))
+        self.assertGreater(len(rangos), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Pruebas de equivalencia entre PicoPlaca.predecir_lote y predecir fila por fila"""
+import datetime
+import random
+import unittest
+
+import numpy as np
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+
+def _filas(cantidad, semilla=0):
+    """Placas, fechas y horas aleatorias, con exentas, de dos letras, feriados y bordes de horas pico"""
+    aleatorio = random.Random(semilla)
+    letras = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    bordes = ['06:59', '07:00', '09:30', '09:31', '15:59', '16:00', '19:30', '19:31', '00:00', '23:59']
+    inicio = datetime.date(2015, 1, 1)
+    placas, fechas, horas = [], [], []
+    for _ in range(cantidad):
+        prefijo = ''.join(aleatorio.choice(letras) for _ in range(aleatorio.choice((2, 3, 3, 3))))
+        placas.append('{}-{:04d}'.format(prefijo, aleatorio.randrange(10000)))
+        fechas.append((inicio + datetime.timedelta(days=aleatorio.randrange(4000))).isoformat())
+        horas.append(aleatorio.choice(bordes) if aleatorio.random() < 0.3
+                     else '{:02d}:{:02d}'.format(aleatorio.randrange(24), aleatorio.randrange(60)))
+    return placas, fechas, horas
+
+
+class PruebasPredecirLote(unittest.TestCase):
+
+    def test_coincide_con_predecir(self):
+        placas, fechas, horas = _filas(20000)
+        esperado = [pyp.PicoPlaca(p, f, h).predecir() for p, f, h in zip(placas, fechas, horas)]
+        self.assertEqual(pyp.PicoPlaca.predecir_lote(placas, fechas, horas).tolist(), esperado)
+
+    def test_coincide_en_feriados(self):
+        fechas = [d.isoformat() for año in (2020, 2022, 2023)
+                  for d in pyp.cache_feriados.obtener(año, 'EC-P')]
+        for digito in range(10):
+            placas = ['PBC-123{}'.format(digito)] * len(fechas)
+            horas = ['08:00'] * len(fechas)
+            esperado = [pyp.PicoPlaca(p, f, h).predecir() for p, f, h in zip(placas, fechas, horas)]
+            self.assertEqual(pyp.PicoPlaca.predecir_lote(placas, fechas, horas).tolist(), esperado)
+            self.assertTrue(all(esperado))
+
+    def test_columnas_numpy_no_contiguas(self):
+        placas, fechas, horas = (np.array(c) for c in _filas(1000, semilla=1))
+        esperado = pyp.PicoPlaca.predecir_lote(placas, fechas, horas)[::3]
+        self.assertEqual(pyp.PicoPlaca.predecir_lote(placas[::3], fechas[::3], horas[::3]).tolist(),
+                         esperado.tolist())
+
+    def test_fila_no_valida_lanza_el_mismo_error(self):
+        for placa, fecha, hora in (('PB-12345', '2022-05-23', '08:00'), ('PBC-1234', '2022-02-30', '08:00'),
+                                   ('PBC-1234', '2022-05-23', '24:00')):
+            with self.assertRaises(ValueError) as escalar:
+                pyp.PicoPlaca(placa, fecha, hora).predecir()
+            with self.assertRaises(ValueError) as lote:
+                pyp.PicoPlaca.predecir_lote(['PBC-1231', placa], ['2022-05-23', fecha], ['08:00', hora])
+            self.assertEqual(str(lote.exception), str(escalar.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+"""Pruebas de ProveedorFeriadosEnLinea contra un servidor HTTP local que reemplaza a abstractapi"""
+import asyncio
+import http.server
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+CLAVE = 'clave-de-prueba'
+
+# Feriados que responde el servidor local; el Jueves Santo viene marcado como en la API real
+FERIADOS = {
+    (2022, 1, 1): "New Year's Day",
+    (2022, 4, 14): 'Maundy Thursday',
+    (2022, 4, 15): 'Good Friday',
+}
+
+
+class _ApiLocal(http.server.BaseHTTPRequestHandler):
+    """Imita la API de dias festivos: consultas por año o por dia, clave y estado configurable"""
+    protocol_version = 'HTTP/1.1'
+    solicitudes = []
+    estado = 200
+    demora = 0.0
+
+    def do_GET(self):
+        consulta = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+        type(self).solicitudes.append(consulta)
+        time.sleep(self.demora)
+        if consulta.get('api_key') != CLAVE:
+            self.__responder(401, [])
+        elif self.estado != 200:
+            self.__responder(self.estado, [])
+        else:
+            año = int(consulta['year'])
+            if 'day' in consulta:
+                fechas = [(año, int(consulta['month']), int(consulta['day']))]
+            else:
+                fechas = [f for f in FERIADOS if f[0] == año]
+            self.__responder(200, [{'name': FERIADOS[f], 'date': '{1:02d}/{2:02d}/{0}'.format(*f)}
+                                   for f in fechas if f in FERIADOS])
+
+    def __responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+class PruebasProveedorEnLinea(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ApiLocal)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = 'http://127.0.0.1:{}/v1/'.format(cls.servidor.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        _ApiLocal.solicitudes = []
+        _ApiLocal.estado = 200
+        _ApiLocal.demora = 0.0
+        self.directorio = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def proveedor(self, **opciones):
+        opciones = dict({'clave': CLAVE, 'url': self.url, 'tasa': 1000}, **opciones)
+        proveedor = pyp.ProveedorFeriadosEnLinea(**opciones)
+        self.addCleanup(proveedor.cerrar)
+        return proveedor
+
+    def test_cache_en_memoria_durante_el_ttl(self):
+        proveedor = self.proveedor()
+        self.assertTrue(proveedor.consultar('2022-01-01'))
+        self.assertFalse(proveedor.consultar('2022-03-01'))
+        self.assertEqual(len(_ApiLocal.solicitudes), 1)
+
+    def test_cache_expira_con_el_ttl(self):
+        proveedor = self.proveedor(ttl=0)
+        proveedor.consultar('2022-01-01')
+        proveedor.consultar('2022-01-01')
+        self.assertEqual(len(_ApiLocal.solicitudes), 2)
+
+    def test_cache_en_disco_se_recarga(self):
+        ruta = os.path.join(self.directorio.name, 'feriados.json')
+        primero = self.proveedor(ruta_cache=ruta)
+        self.assertTrue(primero.consultar('2022-04-15'))
+        primero.cerrar()
+        recargado = self.proveedor(ruta_cache=ruta)
+        self.assertTrue(recargado.consultar('2022-04-15'))
+        self.assertFalse(recargado.consultar('2022-04-16'))
+        self.assertEqual(len(_ApiLocal.solicitudes), 1)
+        self.assertEqual(recargado.cuota_restante, 999)
+
+    def test_consultas_concurrentes_comparten_una_solicitud(self):
+        _ApiLocal.demora = 0.1
+        for por_año in (True, False):
+            _ApiLocal.solicitudes = []
+            proveedor = self.proveedor(por_año=por_año)
+
+            async def consultar():
+                return await asyncio.gather(*(proveedor.es_feriado('2022-01-01') for _ in range(20)))
+
+            self.assertEqual(asyncio.run(consultar()), [True] * 20)
+            self.assertEqual(len(_ApiLocal.solicitudes), 1)
+
+    def test_consultas_sincronas_concurrentes_comparten_una_solicitud(self):
+        _ApiLocal.demora = 0.2
+        proveedor = self.proveedor()
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(proveedor.consultar('2022-04-15')))
+                 for _ in range(10)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(resultados, [True] * 10)
+        self.assertEqual(len(_ApiLocal.solicitudes), 1)
+
+    def test_consultar_y_es_feriado_comparten_una_solicitud(self):
+        _ApiLocal.demora = 0.2
+        proveedor = self.proveedor()
+        resultados = []
+
+        async def consultar():
+            hilo = threading.Thread(target=lambda: resultados.append(proveedor.consultar('2022-01-01')))
+            primera = asyncio.ensure_future(proveedor.es_feriado('2022-01-01'))
+            await asyncio.sleep(0.05)
+            hilo.start()
+            resultados.append(await primera)
+            await asyncio.get_running_loop().run_in_executor(None, hilo.join)
+
+        asyncio.run(consultar())
+        self.assertEqual(resultados, [True, True])
+        self.assertEqual(len(_ApiLocal.solicitudes), 1)
+
+    def test_cache_en_disco_agrupa_escrituras(self):
+        ruta = os.path.join(self.directorio.name, 'feriados.json')
+        proveedor = self.proveedor(ruta_cache=ruta, por_año=False, intervalo_guardado=60)
+
+        def guardados():
+            with open(ruta, encoding='utf-8') as archivo:
+                return sorted(json.load(archivo)['feriados'])
+
+        for fecha in ('2022-03-01', '2022-03-02', '2022-03-03'):
+            proveedor.consultar(fecha)
+        self.assertEqual(guardados(), ['2022-03-01'])
+        asyncio.run(proveedor.es_feriado('2022-03-04'))
+        self.assertEqual(guardados(), ['2022-03-01'])
+        proveedor.cerrar()
+        self.assertEqual(guardados(), ['2022-03-01', '2022-03-02', '2022-03-03', '2022-03-04'])
+        self.assertEqual(os.listdir(self.directorio.name), ['feriados.json'])
+
+    def test_cubeta_de_fichas_espera_entre_solicitudes(self):
+        proveedor = self.proveedor(tasa=5, por_año=False)
+        inicio = time.monotonic()
+        for fecha in ('2022-03-01', '2022-03-02', '2022-03-03'):
+            proveedor.consultar(fecha)
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.35)
+        self.assertEqual(len(_ApiLocal.solicitudes), 3)
+
+    def test_cuota_agotada_responde_sin_conexion(self):
+        proveedor = self.proveedor(cuota_mensual=1, por_año=False)
+        self.assertFalse(proveedor.consultar('2022-03-01'))
+        self.assertTrue(proveedor.consultar('2022-04-15'))
+        self.assertFalse(proveedor.consultar('2022-04-16'))
+        self.assertEqual(len(_ApiLocal.solicitudes), 1)
+        self.assertEqual(proveedor.cuota_restante, 0)
+
+    def test_cuota_agotada_sin_respaldo_lanza(self):
+        proveedor = self.proveedor(cuota_mensual=0, respaldo_sin_conexion=False)
+        with self.assertRaises(pyp.CuotaAgotada):
+            proveedor.consultar('2022-04-15')
+        self.assertEqual(_ApiLocal.solicitudes, [])
+
+    def test_429_responde_sin_conexion(self):
+        _ApiLocal.estado = 429
+        proveedor = self.proveedor()
+        self.assertTrue(proveedor.consultar('2022-04-15'))
+        self.assertFalse(proveedor.consultar('2022-04-14'))
+        self.assertTrue(asyncio.run(proveedor.es_feriado('2022-04-15')))
+
+    def test_401_lanza(self):
+        proveedor = self.proveedor(clave='otra')
+        with self.assertRaises(pyp.requests.HTTPError):
+            proveedor.consultar('2022-04-15')
+        with self.assertRaises(pyp.requests.HTTPError):
+            asyncio.run(proveedor.es_feriado('2022-04-15'))
+
+    def test_jueves_santo_no_es_feriado(self):
+        for por_año in (True, False):
+            proveedor = self.proveedor(por_año=por_año)
+            self.assertFalse(proveedor.consultar('2022-04-14'))
+            self.assertTrue(proveedor.consultar('2022-04-15'))
+            self.assertFalse(asyncio.run(proveedor.es_feriado('2022-04-14')))
+
+    def test_picoplaca_en_linea(self):
+        pyp.activar_proveedor_en_linea(self.proveedor())
+        self.addCleanup(pyp.activar_proveedor_en_linea, None)
+        # Jueves Santo: el digito 7 sigue restringido; Viernes Santo: feriado
+        self.assertFalse(pyp.PicoPlaca('PBC-1237', '2022-04-14', '08:00', True).predecir())
+        self.assertTrue(pyp.PicoPlaca('PBC-1239', '2022-04-15', '08:00', True).predecir())
+        self.assertEqual(pyp.PicoPlaca.predecir_lote(['PBC-1237', 'PBC-1239'], ['2022-04-14', '2022-04-15'],
+                                                     ['08:00', '08:00'], True).tolist(), [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Pruebas de tabla_restricciones, intervalos_restringidos y proxima_hora_permitida contra predecir minuto a minuto"""
+import datetime
+import unittest
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+MINUTO = datetime.timedelta(minutes=1)
+
+
+def _restringido(placa, momento):
+    return not pyp.PicoPlaca(placa, momento.date().isoformat(), momento.strftime('%H:%M')).predecir()
+
+
+def _intervalos(placa, desde, hasta):
+    """Intervalos [inicio, fin) unidos de los minutos en los que predecir devuelve False"""
+    intervalos = []
+    momento = desde
+    while momento < hasta:
+        if _restringido(placa, momento):
+            if intervalos and intervalos[-1][1] == momento:
+                intervalos[-1][1] = momento + MINUTO
+            else:
+                intervalos.append([momento, momento + MINUTO])
+        momento += MINUTO
+    return [tuple(i) for i in intervalos]
+
+
+class PruebasRestricciones(unittest.TestCase):
+
+    def test_tabla_restricciones(self):
+        tabla = pyp.PicoPlaca.tabla_restricciones()
+        self.assertEqual(len(tabla), 7 * 10 * 1440)
+        lunes = datetime.datetime(2022, 6, 6)  # semana sin feriados
+        for dia in range(7):
+            for digito in range(10):
+                placa = 'PBC-123{}'.format(digito)
+                for minuto in range(0, 1440):
+                    momento = lunes + datetime.timedelta(days=dia, minutes=minuto)
+                    self.assertEqual(bool(tabla[(dia * 10 + digito) * 1440 + minuto]),
+                                     _restringido(placa, momento), (dia, digito, minuto))
+
+    def test_intervalos_restringidos(self):
+        # Semana Santa 2022 (Viernes Santo feriado), con extremos a mitad de una ventana
+        desde = datetime.datetime(2022, 4, 11, 8, 15)
+        hasta = datetime.datetime(2022, 4, 19, 17, 3)
+        for placa in ('PBC-1231', 'PBC-1234', 'PBC-1239', 'PBC-1230'):
+            with self.subTest(placa=placa):
+                self.assertEqual(pyp.PicoPlaca.intervalos_restringidos(placa, desde, hasta),
+                                 _intervalos(placa, desde, hasta))
+
+    def test_intervalos_de_placas_exentas(self):
+        desde, hasta = datetime.datetime(2022, 6, 6), datetime.datetime(2022, 6, 13)
+        self.assertEqual(pyp.PicoPlaca.intervalos_restringidos('PAC-1231', desde, hasta), [])
+        self.assertEqual(pyp.PicoPlaca.intervalos_restringidos('PB-1231', desde, hasta), [])
+        self.assertEqual(pyp.PicoPlaca.intervalos_restringidos('PBC-1231', hasta, desde), [])
+        with self.assertRaises(ValueError):
+            pyp.PicoPlaca.intervalos_restringidos('PBC1231', desde, hasta)
+
+    def test_proxima_hora_permitida(self):
+        inicio = datetime.datetime(2022, 4, 14, 6, 0, 30)  # jueves antes del Viernes Santo
+        for placa in ('PBC-1237', 'PBC-1238', 'PBC-1233', 'PAC-1237'):
+            for paso in range(0, 3 * 1440, 7):
+                momento = inicio + datetime.timedelta(minutes=paso)
+                with self.subTest(placa=placa, momento=momento):
+                    minuto = momento.replace(second=0)
+                    while _restringido(placa, minuto):
+                        minuto += MINUTO
+                    esperado = momento if minuto == momento.replace(second=0) else minuto
+                    self.assertEqual(pyp.PicoPlaca.proxima_hora_permitida(placa, momento), esperado)
+
+    def test_proxima_hora_permitida_fin_de_ventana(self):
+        momento = datetime.datetime(2022, 6, 6, 8, 0)
+        self.assertEqual(pyp.PicoPlaca.proxima_hora_permitida('PBC-1231', momento),
+                         datetime.datetime(2022, 6, 6, 9, 31))
+
+    def test_proxima_hora_permitida_restringida_todo_el_horizonte(self):
+        restricciones = pyp.PicoPlaca._PicoPlaca__restricciones
+        horas_pico = pyp.PicoPlaca._PicoPlaca__horas_pico
+        self.addCleanup(pyp.PicoPlaca.configurar_reglas, restricciones, horas_pico)
+        pyp.PicoPlaca.configurar_reglas({dia: range(10) for dia in restricciones}, [(0, 1439)])
+        momento = datetime.datetime(2022, 6, 6, 8, 0)
+        self.assertIsNone(pyp.PicoPlaca.proxima_hora_permitida('PBC-1231', momento, horizonte=3))
+        # El primer feriado corta la restriccion: Batalla de Pichincha, lunes 2022-05-23
+        self.assertEqual(pyp.PicoPlaca.proxima_hora_permitida('PBC-1231', datetime.datetime(2022, 5, 20, 8, 0)),
+                         datetime.datetime(2022, 5, 23))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Pruebas de ServicioPicoPlaca con conexiones de socket reales"""
+import asyncio
+import json
+import socket
+import threading
+import time
+import unittest
+
+import NRC_6181_AlexandraLaaz_Lab4Unidad1 as pyp
+
+
+class PruebasServicio(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servicio = pyp.ServicioPicoPlaca(puerto=0, tiempo_espera=0.3)
+        listo = threading.Event()
+
+        def correr():
+            async def principal():
+                await cls.servicio.iniciar()
+                listo.set()
+                await cls.servicio.servir()
+            asyncio.run(principal())
+
+        threading.Thread(target=correr, daemon=True).start()
+        listo.wait(10)
+
+    def conectar(self):
+        conexion = socket.create_connection(('127.0.0.1', self.servicio.puerto), timeout=5)
+        self.addCleanup(conexion.close)
+        return conexion
+
+    @staticmethod
+    def leer_todo(conexion):
+        datos = b''
+        while True:
+            parte = conexion.recv(65536)
+            if not parte:
+                return datos
+            datos += parte
+
+    def test_predecir(self):
+        conexion = self.conectar()
+        conexion.sendall(b'GET /predecir?placa=PBC-1233&fecha=2022-05-24&hora=08:00 HTTP/1.1\r\n'
+                         b'Connection: close\r\n\r\n')
+        cabeza, _, cuerpo = self.leer_todo(conexion).partition(b'\r\n\r\n')
+        self.assertTrue(cabeza.startswith(b'HTTP/1.1 200'))
+        self.assertFalse(json.loads(cuerpo)['puede_circular'])
+
+    def test_cuerpo_incompleto_responde_408_y_cierra(self):
+        conexion = self.conectar()
+        inicio = time.monotonic()
+        conexion.sendall(b'POST /predecir/lote HTTP/1.1\r\nContent-Length: 100\r\n\r\n{"placas": [')
+        respuesta = self.leer_todo(conexion)
+        self.assertTrue(respuesta.startswith(b'HTTP/1.1 408'))
+        self.assertIn(b'Connection: close', respuesta)
+        self.assertLess(time.monotonic() - inicio, 3)
+
+    def test_cabeceras_incompletas_responde_408(self):
+        conexion = self.conectar()
+        conexion.sendall(b'GET /metricas HTTP/1.1\r\nHost: x\r\n')
+        self.assertTrue(self.leer_todo(conexion).startswith(b'HTTP/1.1 408'))
+
+    def test_conexion_inactiva_se_cierra(self):
+        conexion = self.conectar()
+        inicio = time.monotonic()
+        self.assertEqual(self.leer_todo(conexion), b'')
+        self.assertLess(time.monotonic() - inicio, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()